@@ -0,0 +1,166 @@
+# Function:
+# To generate a synthetic OSPF neighbor log capture of any size for the benchmarks,
+# in the Junos RPD_OSPF_NBR format, the Cisco %OSPF-5-ADJCHG format or both mixed.
+# Like a real PuTTY capture of "show log messages | match RPD_OSPF_", the file starts with
+# the PuTTY banner and has "---(more)---" pager lines, "user@host>" prompt lines and
+# UI_CMDLINE_READ_LINE lines in between, which the cleaner has to drop.
+#
+# Every flap is a DOWN transition, the intermediate states and the UP transition of one
+# neighbor, a few milliseconds to a few minutes apart. The flaps of all the neighbors
+# together happen flap_rate times per neighbor per day on average.
+# The timestamps stay within 2019 (the clock starts over on 1-Jan when the year is full),
+# so no "Feb 29" is ever written.
+# Usage:
+# python benchmark/log_generator.py [output] [--size 2G] [--neighbors 500] [--flap-rate 4] [--vendor junos|cisco|mixed]
+
+import os
+import random
+import argparse
+import datetime
+
+default_output = os.path.join(os.path.dirname(os.path.abspath(__file__)), "synthetic_logfile.txt")
+
+junos_hostname_list = ["jkf-mayb-switch1", "hkg-core-switch2", "sg1-edge-switch1", "bkk-dist-switch3"]
+
+# (from state, to state, reason) of the Junos transitions of one flap.
+junos_down_list = [
+    ("Full", "Init", "1WayRcvd (event reason: neighbor is in one-way mode)"),
+    ("Full", "Down", "InActiveTimer (event reason: BFD session timed out and neighbor was declared dead)"),
+]
+junos_up_list = [
+    [("Init", "ExStart", "2WayRcvd (event reason: neighbor detected this router)"),
+     ("Exchange", "Full", "ExchangeDone (event reason: DBD exchange of master completed)")],
+    [("Init", "ExStart", "2WayRcvd (event reason: initial DBD packet was received)"),
+     ("Loading", "Full", "LoadDone (event reason: OSPF loading completed)")],
+]
+cisco_down_list = [("FULL", "DOWN", "Neighbor Down: Dead timer expired"),
+                   ("FULL", "DOWN", "Neighbor Down: Interface down or detached")]
+cisco_up_list = [[("LOADING", "FULL", "Loading Done")]]
+
+year_start = datetime.datetime(2019, 1, 1)
+year_seconds = 365 * 86400
+
+def parse_size(size_str):
+    # "500M", "2G", "64K" or a number of bytes.
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    size_str = size_str.strip().upper()
+    if size_str[-1:] in units:
+        return int(float(size_str[:-1]) * units[size_str[-1]])
+    return int(size_str)
+
+def syslog_time(seconds):
+    # e.g. "Jan  5 11:48:14.571"
+    timestamp = year_start + datetime.timedelta(seconds=seconds)
+    return f"{timestamp:%b} {timestamp.day:>2} {timestamp:%H:%M:%S}.{timestamp.microsecond // 1000:03d}"
+
+def junos_line(seconds, hostname, neighborIP, interface, transition):
+    from_state, to_state, reason = transition
+    kind = "RPD_OSPF_NBRDOWN" if from_state == "Full" else "RPD_OSPF_NBRUP"
+    return (f"{syslog_time(seconds)}  {hostname} rpd[1307]: {kind}: OSPF neighbor {neighborIP} "
+            f"(realm ospf-v2 {interface} area 0.0.0.0) state changed from {from_state} to {to_state} due to {reason}\n")
+
+def cisco_line(seconds, hostname, neighborIP, interface, transition):
+    from_state, to_state, reason = transition
+    return (f"{syslog_time(seconds)} SGT: %OSPF-5-ADJCHG: Process 200, Nbr {neighborIP} on {interface} "
+            f"from {from_state} to {to_state}, {reason}\n")
+
+def noise_line(rng, hostname):
+    kind = rng.randrange(3)
+    if kind == 0:
+        return f"---(more {rng.randrange(1, 100)}%)---\n"
+    if kind == 1:
+        return f"eric.leung@{hostname}> show log messages | match RPD_OSPF_ | no-more\n"
+    return (f"{syslog_time(rng.randrange(year_seconds))}  {hostname} mgd[35226]: UI_CMDLINE_READ_LINE: "
+            f"User 'eric.leung', command 'show log messages | match RPD_OSPF_ | no-more '\n")
+
+def neighbor_list(neighbor_count, vendor):
+    # (vendor, hostname, neighborIP, interface) of every neighbor.
+    neighbors = []
+    for n in range(neighbor_count):
+        if vendor == "mixed":
+            neighbor_vendor = "cisco" if n % 2 else "junos"
+        else:
+            neighbor_vendor = vendor
+        if neighbor_vendor == "junos":
+            hostname = junos_hostname_list[n % len(junos_hostname_list)]
+            interface = f"vlan.{500 + n}"
+        else:
+            hostname = "fnlr-sg1-bursa2"
+            interface = f"Tunnel{n}"
+        neighborIP = f"10.{132 + n // 65536}.{n // 256 % 256}.{n % 256}"
+        neighbors.append((neighbor_vendor, hostname, neighborIP, interface))
+    return neighbors
+
+def generate_logfile(filename, size, neighbor_count=500, flap_rate=4.0, vendor="junos", noise_rate=0.02, seed=0):
+    # Write a capture of about size bytes and return what was written:
+    # {"bytes": .., "lines": .., "flaps": .., "noise_lines": .., "ospf_lines": ..}
+    rng = random.Random(seed)
+    neighbors = neighbor_list(neighbor_count, vendor)
+    mean_gap = 86400.0 / (flap_rate * neighbor_count)
+
+    stat = {"bytes": 0, "lines": 0, "flaps": 0, "noise_lines": 0, "ospf_lines": 0}
+    clock = rng.uniform(0, 86400)
+    buffer = []
+
+    def write(line):
+        buffer.append(line)
+        stat["bytes"] += len(line)
+        stat["lines"] += 1
+
+    with open(filename, "w", newline="\n") as f:
+        write("=~=~=~=~=~=~=~=~=~=~=~= PuTTY log 2019.01.26 10:43:48 =~=~=~=~=~=~=~=~=~=~=~=\n")
+        write("\n")
+
+        while stat["bytes"] < size:
+            neighbor_vendor, hostname, neighborIP, interface = rng.choice(neighbors)
+            if neighbor_vendor == "junos":
+                format_line, down_list, up_list = junos_line, junos_down_list, junos_up_list
+            else:
+                format_line, down_list, up_list = cisco_line, cisco_down_list, cisco_up_list
+
+            # Start the year over instead of letting a flap run into 2020.
+            clock += rng.expovariate(1.0 / mean_gap)
+            if clock > year_seconds - 3600:
+                clock = rng.uniform(0, 60)
+
+            # DOWN, then the way back up: a few milliseconds to a few minutes later.
+            seconds = clock
+            write(format_line(seconds, hostname, neighborIP, interface, rng.choice(down_list)))
+            for transition in rng.choice(up_list):
+                seconds += rng.choice((rng.uniform(0.01, 0.5), rng.uniform(1, 180)))
+                write(format_line(seconds, hostname, neighborIP, interface, transition))
+            stat["flaps"] += 1
+
+            while rng.random() < noise_rate:
+                write(noise_line(rng, hostname))
+                stat["noise_lines"] += 1
+
+            if len(buffer) >= 10000:
+                f.write("".join(buffer))
+                buffer.clear()
+
+        # A real capture ends with the prompt the capture was stopped at, without a newline.
+        buffer.append(f"eric.leung@{neighbors[0][1]}>")
+        f.write("".join(buffer))
+
+    stat["ospf_lines"] = stat["lines"] - stat["noise_lines"] - 2
+    return stat
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic OSPF neighbor log capture")
+    parser.add_argument("output", nargs="?", default=default_output)
+    parser.add_argument("--size", default="100M", help="approximate file size, e.g. 500M or 2G")
+    parser.add_argument("--neighbors", type=int, default=500)
+    parser.add_argument("--flap-rate", type=float, default=4.0, help="flaps per neighbor per day")
+    parser.add_argument("--vendor", choices=["junos", "cisco", "mixed"], default="junos")
+    parser.add_argument("--noise-rate", type=float, default=0.02, help="chance of a noise line after each flap")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stat = generate_logfile(args.output, parse_size(args.size), args.neighbors, args.flap_rate,
+                            args.vendor, args.noise_rate, args.seed)
+    print(f"{args.output}: {stat['bytes']:,} bytes, {stat['lines']:,} lines, "
+          f"{stat['flaps']:,} flaps, {stat['noise_lines']:,} noise lines")
+
+if __name__ == '__main__':
+    main()
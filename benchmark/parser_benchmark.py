@@ -0,0 +1,105 @@
+# Function:
+# To compare the parse throughput (lines/sec) of the compiled single-pass regex parser
+# against the original split-chain parser.
+# The cleaned lines of logfile.txt are scaled up 1000x by default.
+# Usage:
+# python benchmark/parser_benchmark.py [--scale 1000] [--logfile logfile.txt]
+
+import re
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from junos_ospf_log import logfile_reader, junos_ospf_log_reader, junos_ospf_log_regex, location_determinator, str_to_time
+
+def split_chain_ospf_log_reader(log_lines):
+    # The original split-chain parser, kept here as the benchmark reference.
+    log_dict = {}
+    for line in log_lines:
+        neighborIP = (line.split("ospf neighbor ")[1]).split(" (realm")[0]
+
+        timestamp_regex = r'[a-z][a-z][a-z]\s.\d\s[0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]{3}'
+        raw_timestamp = re.findall(timestamp_regex, line)[0]
+
+        hostname = line.split(raw_timestamp)[1].split("rpd[")[0].strip()
+
+        timestamp = raw_timestamp[4:6].strip()+"-"+raw_timestamp[0:3].capitalize()+" "+raw_timestamp[7:]
+
+        location = location_determinator(hostname)
+
+        time_object = str_to_time(timestamp, location)
+
+        interface = (line.split("ospf-v2 ")[1]).split("area")[0].strip()
+
+        statusword = line.split("state changed from ")
+        if re.search(r'\bfull to \b', statusword[1]):
+            status = "DOWN"
+        elif re.search(r'\bto full \b', statusword[1]):
+            status = "UP"
+        else:
+            continue
+
+        log_item = [time_object, status, hostname, interface]
+        log_dict.setdefault(neighborIP, []).append(log_item)
+    return log_dict
+
+def split_chain_fields(log_lines):
+    # Only the field extraction of the split-chain parser, on every line.
+    fields = []
+    for line in log_lines:
+        neighborIP = (line.split("ospf neighbor ")[1]).split(" (realm")[0]
+        raw_timestamp = re.findall(r'[a-z][a-z][a-z]\s.\d\s[0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]{3}', line)[0]
+        hostname = line.split(raw_timestamp)[1].split("rpd[")[0].strip()
+        interface = (line.split("ospf-v2 ")[1]).split("area")[0].strip()
+        statusword = line.split("state changed from ")[1]
+        fields.append((neighborIP, raw_timestamp, hostname, interface, statusword))
+    return fields
+
+def regex_fields(log_lines):
+    # Only the field extraction of the compiled regex, on every line.
+    match_line = junos_ospf_log_regex.match
+    fields = []
+    for line in log_lines:
+        match = match_line(line)
+        fields.append((match["neighbor"], match["time"], match["hostname"], match["interface"], match["from_state"]))
+    return fields
+
+def run(name, reader, log_lines):
+    start = time.perf_counter()
+    log_dict = reader(log_lines)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<20} {elapsed:>8.3f} s \t {len(log_lines) / elapsed:>12,.0f} lines/sec")
+    return log_dict, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the OSPF log parser")
+    parser.add_argument("--logfile", default="logfile.txt")
+    parser.add_argument("--scale", type=int, default=1000)
+    args = parser.parse_args()
+
+    bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+    log_lines = list(logfile_reader(args.logfile, bad_word_list)) * args.scale
+    print(f"{len(log_lines):,} lines ({args.logfile} x {args.scale})")
+
+    # The per line extraction cost alone, on every line, without the UP/DOWN filter
+    # and without the timestamp conversion.
+    print("Field extraction only:")
+    split_chain_fields_time = run("split-chain", split_chain_fields, log_lines)[1]
+    regex_fields_time = run("compiled regex", regex_fields, log_lines)[1]
+    print(f"Speedup: {split_chain_fields_time / regex_fields_time:.2f}x")
+
+    # The whole parser: the regex parser also drops the transitions that are neither
+    # UP nor DOWN before converting their timestamp.
+    print("Whole parser:")
+    split_chain_dict, split_chain_time = run("split-chain", split_chain_ospf_log_reader, log_lines)
+    regex_dict, regex_time = run("compiled regex", junos_ospf_log_reader, log_lines)
+
+    print(f"Speedup: {split_chain_time / regex_time:.2f}x")
+    if split_chain_dict != regex_dict:
+        print("WARNING: the two parsers returned different results")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+# Function:
+# To time every stage of the log analysis on its own, on a synthetic capture from
+# log_generator.py (or any log file), and to keep the results in a JSON history so a
+# slower stage shows up as a regression against the previous run of the same input.
+#
+# Stages:
+#   read                    reading and lowercasing the raw lines
+#   log_cleaner             dropping the noise lines from the read lines
+#   log_cleaner_allow_list  the same with the ospf_allow_list fast path
+#   logfile_reader          read + log_cleaner, as the scripts use it
+#   mmap_logfile_reader     the mmap marker scan + log_cleaner
+#   junos_ospf_log_reader   parsing the cleaned lines
+#   neighbor_date_stat, neighbor_date_total_stat, neighbor_downtime_stat
+#   file_output             writing the report (into a temporary directory)
+#
+# Every stage is given the materialized output of the stage before it, so the input
+# must fit in memory.
+# Usage:
+# python benchmark/pipeline_benchmark.py [--logfile FILE | --size 500M] [--vendor junos] [--history benchmark/history.json]
+
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import platform
+import tempfile
+import subprocess
+
+benchmark_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(benchmark_dir, ".."))
+
+from junos_ospf_log import (log_cleaner, ospf_allow_list, logfile_reader, mmap_logfile_reader, junos_ospf_log_reader,
+                            neighbor_date_stat, neighbor_date_total_stat, neighbor_downtime_stat, file_output)
+from log_generator import generate_logfile, parse_size, default_output
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+default_history = os.path.join(benchmark_dir, "history.json")
+
+def read_lines(filename):
+    with open(filename) as f:
+        return [line.lower() for line in f]
+
+def timed(stage_dict, name, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    stage_dict[name] = time.perf_counter() - start
+    return result
+
+def run_stages(filename, hostname=None):
+    # Return ({stage : seconds}, {"lines": .., "clean_lines": .., "events": ..}).
+    stage_dict = {}
+    raw_lines = timed(stage_dict, "read", read_lines, filename)
+    clean_lines = timed(stage_dict, "log_cleaner", lambda: list(log_cleaner(raw_lines, bad_word_list)))
+    timed(stage_dict, "log_cleaner_allow_list", lambda: list(log_cleaner(raw_lines, bad_word_list, ospf_allow_list)))
+    timed(stage_dict, "logfile_reader", lambda: list(logfile_reader(filename, bad_word_list)))
+    timed(stage_dict, "mmap_logfile_reader", lambda: list(mmap_logfile_reader(filename, bad_word_list)))
+
+    ospf_log_dict = timed(stage_dict, "junos_ospf_log_reader", junos_ospf_log_reader, clean_lines, None, hostname)
+    neighbor_date_stat_dict = timed(stage_dict, "neighbor_date_stat", neighbor_date_stat, ospf_log_dict)
+    neighbor_date_total_stat_dict = timed(stage_dict, "neighbor_date_total_stat", neighbor_date_total_stat,
+                                          neighbor_date_stat_dict)
+    neighbor_downtime_stat_dict = timed(stage_dict, "neighbor_downtime_stat", neighbor_downtime_stat, ospf_log_dict)
+
+    # file_output writes into ./log_result, so run it in a temporary directory.
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as output_dir:
+        os.chdir(output_dir)
+        try:
+            timed(stage_dict, "file_output", file_output, ospf_log_dict, neighbor_date_stat_dict,
+                  neighbor_date_total_stat_dict, neighbor_downtime_stat_dict, "ospf-log.txt")
+        finally:
+            os.chdir(cwd)
+
+    count_dict = {
+        "lines": len(raw_lines),
+        "clean_lines": len(clean_lines),
+        "events": sum(len(log_items) for log_items in ospf_log_dict.values()),
+    }
+    return stage_dict, count_dict
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=benchmark_dir,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_history(history_path):
+    if not os.path.exists(history_path):
+        return []
+    with open(history_path) as f:
+        return json.load(f)
+
+def save_history(history_path, history):
+    with open(history_path + ".tmp", "w") as f:
+        json.dump(history, f, indent=1)
+    os.replace(history_path + ".tmp", history_path)
+
+def find_regressions(run, history, threshold):
+    # Compare the stages with the last run of the same input:
+    # return [(stage, previous seconds, seconds)] of the stages more than threshold slower.
+    previous_runs = [previous for previous in history if previous["input"] == run["input"]]
+    if not previous_runs:
+        return []
+    previous = previous_runs[-1]
+    regressions = []
+    for stage, seconds in run["stages"].items():
+        previous_seconds = previous["stages"].get(stage)
+        if previous_seconds and seconds > previous_seconds * (1 + threshold):
+            regressions.append((stage, previous_seconds, seconds))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every stage of the OSPF log analysis")
+    parser.add_argument("--logfile", help="log file to use instead of a generated one")
+    parser.add_argument("--size", default="50M", help="size of the generated log file")
+    parser.add_argument("--neighbors", type=int, default=500)
+    parser.add_argument("--flap-rate", type=float, default=4.0)
+    parser.add_argument("--vendor", choices=["junos", "cisco", "mixed"], default="junos")
+    parser.add_argument("--history", default=default_history, help="JSON file to append the results to")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    args = parser.parse_args()
+
+    if args.logfile:
+        filename = args.logfile
+        input_dict = {"logfile": os.path.basename(filename), "bytes": os.path.getsize(filename)}
+    else:
+        filename = default_output
+        input_dict = {"size": args.size, "neighbors": args.neighbors, "flap_rate": args.flap_rate, "vendor": args.vendor}
+        generate_logfile(filename, parse_size(args.size), args.neighbors, args.flap_rate, args.vendor)
+
+    hostname = "fnlr-sg1-bursa2" if args.vendor != "junos" else None
+    stage_dict, count_dict = run_stages(filename, hostname)
+
+    run = {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "input": input_dict,
+        "counts": count_dict,
+        "stages": stage_dict,
+    }
+
+    print(f"{filename}: {count_dict['lines']:,} lines, {count_dict['clean_lines']:,} clean, {count_dict['events']:,} events")
+    for stage, seconds in stage_dict.items():
+        print(f"{stage:<26} {seconds:>9.3f} s")
+
+    history = load_history(args.history)
+    regressions = find_regressions(run, history, args.threshold)
+    for stage, previous_seconds, seconds in regressions:
+        print(f"REGRESSION: {stage} {previous_seconds:.3f} s -> {seconds:.3f} s")
+
+    history.append(run)
+    save_history(args.history, history)
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# Function:
+# To compare the pure-Python neighbor_date_stat / neighbor_downtime_stat with the
+# NumPy backend in ospf_numpy_stat.py on a synthetic OspfEventStore,
+# and to check that both give the same numbers.
+# Usage:
+# python benchmark/stat_benchmark.py [--events 10000000] [--neighbors 1000]
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from junos_ospf_log import neighbor_date_stat, neighbor_downtime_stat
+from ospf_event_store import OspfEventStore, event_downtime
+from ospf_numpy_stat import numpy_date_stat, numpy_downtime_stat
+
+def synthetic_store(event_count, neighbor_count, seed=0):
+    # Every neighbor gets a time-ordered series of DOWN/UP events starting on 1-Jan-2019,
+    # a few seconds to a few hours apart.
+    rng = np.random.default_rng(seed)
+    store = OspfEventStore()
+    hostname_id = store.intern_hostname("jkf-mayb-switch1")
+    per_neighbor = event_count // neighbor_count
+
+    for n in range(neighbor_count):
+        events = store.neighbor_events(f"10.{n // 65536}.{n // 256 % 256}.{n % 256}")
+        gaps = rng.integers(1000000, 4 * 3600 * 1000000, size=per_neighbor, dtype=np.int64)
+        timestamps = 1546300800 * 1000000 + np.cumsum(gaps)
+        status_codes = rng.integers(0, 2, size=per_neighbor, dtype=np.uint8)
+
+        events.timestamp_array.frombytes(timestamps.tobytes())
+        events.status_array.frombytes(status_codes.tobytes())
+        events.hostname_array.frombytes(np.full(per_neighbor, hostname_id, dtype=np.uint32).tobytes())
+        events.interface_array.frombytes(np.full(per_neighbor, store.intern_interface(f"vlan.{n}"), dtype=np.uint32).tobytes())
+    return store
+
+def report_lookup(store, neighbor_downtime_stat_dict):
+    # Look up the downtime of every event, as the reports do.
+    return [[event_downtime(neighbor_downtime_stat_dict[neighborIP], event) for event in events]
+            for neighborIP, events in store.items()]
+
+def timed(name, function, store):
+    start = time.perf_counter()
+    result = function(store)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {elapsed:>8.3f} s")
+    return result, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NumPy statistics backend")
+    parser.add_argument("--events", type=int, default=10000000)
+    parser.add_argument("--neighbors", type=int, default=1000)
+    args = parser.parse_args()
+
+    store = synthetic_store(args.events, args.neighbors)
+    print(f"{sum(len(events) for events in store.values()):,} events, {len(store):,} neighbors")
+
+    python_date, python_date_time = timed("neighbor_date_stat", neighbor_date_stat, store)
+    numpy_date, numpy_date_time = timed("numpy_date_stat", numpy_date_stat, store)
+    python_downtime, python_downtime_time = timed("neighbor_downtime_stat", neighbor_downtime_stat, store)
+    numpy_downtime, numpy_downtime_time = timed("numpy_downtime_stat", numpy_downtime_stat, store)
+
+    # The report consumes the downtime of every event the same way for both backends.
+    python_lookup, python_lookup_time = timed("report lookup (python)", lambda s: report_lookup(s, python_downtime), store)
+    numpy_lookup, numpy_lookup_time = timed("report lookup (numpy)", lambda s: report_lookup(s, numpy_downtime), store)
+    python_downtime_time += python_lookup_time
+    numpy_downtime_time += numpy_lookup_time
+
+    print(f"Speedup: date {python_date_time / numpy_date_time:.1f}x, downtime with lookups {python_downtime_time / numpy_downtime_time:.1f}x")
+    if python_date != numpy_date or python_downtime != numpy_downtime or python_lookup != numpy_lookup:
+        print("WARNING: the two backends returned different results")
+
+if __name__ == '__main__':
+    main()
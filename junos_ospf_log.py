@@ -5,36 +5,338 @@
 # Output:
 # A list of downtime will be shown based on the ospf neighbor IP
 # downtime will be shown for each incident
+# Optional packages (pip install ...), used when installed:
+#   pyahocorasick:  faster bad word filtering of long word lists (see word_matcher)
+#   numpy:          --numpy statistics (ospf_numpy_stat.py)
+#   pyarrow:        Parquet export (ospf_export.py)
 
 import re
+import array
 import datetime
 import pytz
 import os
+import sys
+import argparse
+import mmap
+import itertools
+import concurrent.futures
+import gzip
+import bz2
+import lzma
+import queue
+import threading
+import cProfile
 from pprint import pprint
 
-def logfile_reader(filename, bad_word_list):
-    log_list = []
-    with open(filename) as f:
-        for line in f:
-            log_list.append(line.lower())
-    f.close()
-    log_list = log_cleaner(log_list, bad_word_list)
-    return log_list
-
-def log_cleaner(log_lines, bad_word_list):
-    clean_log_lines = []
-    dirty_log_lines = []
-    bad_word_list = [x.lower() for x in bad_word_list]
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+from ospf_event_store import OspfEventStore, EventStatus, epoch_us_to_date, event_downtime, no_downtime
+import ospf_numpy_stat
+import ospf_cache
+from ospf_profile import PipelineProfile, profile_dump_path
+
+# The compressed log files are read as they are decompressed, without a decompressed copy on disk.
+# {compression : (magic bytes at the start of the file, module with the open function)}
+compression_dict = {
+    "gzip": (b"\x1f\x8b", gzip),
+    "bz2": (b"BZh", bz2),
+    "xz": (b"\xfd7zXZ\x00", lzma),
+}
+
+# Size of the blocks the compressed log files are decompressed in.
+decompress_block_size = 1024 * 1024
+
+def detect_compression(filename):
+    # Return the compression of the log file ("gzip", "bz2" or "xz") from its magic bytes,
+    # or None for a plain text file.
+    with open(filename, "rb") as f:
+        head = f.read(6)
+    for compression, (magic, module) in compression_dict.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+def open_logfile(filename):
+    # Open the log file as text, decompressing it on the fly if it is compressed.
+    compression = detect_compression(filename)
+    if compression is None:
+        return open(filename)
+    return compression_dict[compression][1].open(filename, "rt")
+
+def threaded_iter(iterable, queue_size=8):
+    # Run the iterable in a separate thread, up to queue_size items ahead of the consumer.
+    # The exception of the iterable, if any, is raised in the consumer.
+    item_queue = queue.Queue(queue_size)
+    stop_event = threading.Event()
+    done = object()
+
+    def put(item):
+        # Give up when the consumer has stopped reading.
+        while not stop_event.is_set():
+            try:
+                item_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put((done, None))
+        except BaseException as error:
+            put((done, error))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = item_queue.get()
+            if type(item) is tuple and len(item) == 2 and item[0] is done:
+                if item[1] is not None:
+                    raise item[1]
+                return
+            yield item
+    finally:
+        stop_event.set()
+        thread.join()
+
+def decompressed_blocks(filename, compression, decompress_thread=False, block_size=None):
+    # Yield the decompressed bytes of the log file in blocks of block_size (decompress_block_size).
+    # With decompress_thread, the blocks are decompressed in a separate thread; zlib, bz2
+    # and lzma release the GIL while they work, so decompressing and parsing overlap.
+    if decompress_thread:
+        yield from threaded_iter(decompressed_blocks(filename, compression, False, block_size))
+        return
+    block_size = block_size or decompress_block_size
+    with compression_dict[compression][1].open(filename, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            yield block
+
+def logfile_reader(filename, bad_word_list, allow_list=None):
+    # Lazily read the log file, one lowercased line at a time, and pass it
+    # through the cleaner so that the whole file is never held in memory.
+    # A compressed log file is decompressed as it is read.
+    with open_logfile(filename) as f:
+        yield from log_cleaner((line.lower() for line in f), bad_word_list, allow_list)
+
+# The lowercased markers of the OSPF neighbor log lines, for the allow_list of log_cleaner.
+ospf_allow_list = ['rpd_ospf_nbr', '%ospf-5-adjchg']
+
+# From this many words on, a word list is matched with an Aho-Corasick automaton
+# (if pyahocorasick is installed), which scans a line once whatever the number of words.
+# Below it, the C level substring searches of the words are faster.
+aho_corasick_min_words = 16
+
+# {tuple of words : matcher}
+word_matcher_cache = {}
+
+def word_matcher(word_list):
+    # Return a function telling whether a line contains any of the (lowercased) words,
+    # built once per word list; None for an empty list.
+    key = tuple(word_list)
+    if key in word_matcher_cache:
+        return word_matcher_cache[key]
+
+    words = sorted({word.lower() for word in word_list})
+    if not words:
+        matcher = None
+    elif ahocorasick is not None and len(words) >= aho_corasick_min_words:
+        automaton = ahocorasick.Automaton()
+        for word in words:
+            automaton.add_word(word, word)
+        automaton.make_automaton()
+        matcher = lambda line: next(automaton.iter(line), None) is not None
+    else:
+        matcher = lambda line: any(word in line for word in words)
+    word_matcher_cache[key] = matcher
+    return matcher
+
+def log_cleaner(log_lines, bad_word_list, allow_list=None):
+    # Drop the lines containing any of the bad words, and the empty lines.
+    # With an allow_list (e.g. ospf_allow_list), the lines without any of its words are
+    # dropped first, so the noise of a capture never reaches the bad word search.
+    has_bad_word = word_matcher(bad_word_list)
+    is_allowed = word_matcher(allow_list) if allow_list else None
+
+    if is_allowed is not None:
+        log_lines = filter(is_allowed, log_lines)
+    if has_bad_word is not None:
+        log_lines = itertools.filterfalse(has_bad_word, log_lines)
 
     for line in log_lines:
-        if not any(bad_word in line for bad_word in bad_word_list):
-            if len(line.strip()) > 0:
-                clean_log_lines.append(line.strip())
-        else:
-            dirty_log_lines.append(line)
-    return clean_log_lines
-
-def junos_ospf_log_reader(log_lines):
+        line = line.strip()
+        if len(line) > 0:
+            yield line
+
+# The month of the timestamps; any other word makes the line unparsed.
+month_pattern = r'(?P<month>jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)'
+
+# A single anchored pattern to pick up every useful field from the lowercased log line.
+junos_ospf_log_regex = re.compile(
+    month_pattern + r'\s+(?P<day>\d{1,2})\s+(?P<time>\d{2}:\d{2}:\d{2}\.\d{3})\s+'
+    r'(?P<hostname>\S+)\s+rpd\[\d+\]:\s+rpd_ospf_nbr\w*:\s+'
+    r'ospf neighbor\s+(?P<neighbor>\S+)\s+'
+    r'\(realm\s+(?P<realm>\S+)\s+(?P<interface>.+?)\s+area\s+(?P<area>[^)\s]+)\)\s+'
+    r'state changed from\s+(?P<from_state>\S+)\s+to\s+(?P<to_state>\S+)'
+    r'(?:\s+due to\s+(?P<reason>.*))?$'
+)
+
+# The Cisco IOS counterpart, e.g.
+# 'jan  8 13:34:28.703 sgt: %ospf-5-adjchg: process 200, nbr 10.132.1.106 on tunnel1 from full to down, neighbor down: dead timer expired'
+# The timezone and the hostname are only there if the device logs them
+# (service timestamps ... show-timezone, logging origin-id hostname).
+cisco_ospf_log_regex = re.compile(
+    r'(?:\d+:\s+)?[*.]?' + month_pattern + r'\s+(?P<day>\d{1,2})\s+(?P<time>\d{2}:\d{2}:\d{2}\.\d{3})'
+    r'(?:\s+(?P<timezone>[a-z]{2,5}))?:\s+(?:(?P<hostname>\S+):\s+)?'
+    r'%ospf-5-adjchg:\s+process\s+(?P<process>\d+),\s+nbr\s+(?P<neighbor>\S+)\s+'
+    r'on\s+(?P<interface>\S+)\s+'
+    r'from\s+(?P<from_state>\S+)\s+to\s+(?P<to_state>[^,\s]+)'
+    r'(?:,\s*(?P<reason>.*))?$'
+)
+
+# The location of the Cisco timezone abbreviations, used when the log line has no hostname.
+timezone_abbreviation_dict = {'hkt': 'hk', 'sgt': 'sg', 'ict': 'bk', 'wib': 'jk',
+                              'aest': 'sy', 'aedt': 'sy', 'utc': 'utc', 'gmt': 'utc'}
+
+def junos_line_source(match, hostname):
+    # Return (hostname, location) of a Junos log line.
+    hostname = match["hostname"]
+    return hostname, location_determinator(hostname)
+
+def cisco_line_source(match, hostname):
+    # Return (hostname, location) of a Cisco log line.
+    # A Cisco log line rarely has the hostname, so the hostname given for the file is used,
+    # and the location is taken from the timezone abbreviation when there is one.
+    hostname = match["hostname"] or hostname or "unknown"
+    location = timezone_abbreviation_dict.get(match["timezone"]) or location_determinator(hostname)
+    return hostname, location
+
+# The parser registry: {name : (marker, regex, line_source)}
+#   marker:         a lowercased text every log line of the format contains
+#   regex:          the named-group pattern of the log line, with at least the
+#                   month, day, time, neighbor, interface, from_state and to_state groups
+#   line_source:    function(match, hostname) returning the (hostname, location) of the line
+ospf_parser_registry = {}
+
+def register_ospf_parser(name, marker, regex, line_source):
+    ospf_parser_registry[name] = (marker, regex, line_source)
+
+register_ospf_parser("junos", "rpd_ospf_nbr", junos_ospf_log_regex, junos_line_source)
+register_ospf_parser("cisco", "%ospf-5-adjchg", cisco_ospf_log_regex, cisco_line_source)
+
+def detect_log_format(log_lines, max_lines=1000):
+    # Return the name of the parser of the first matching line within the first
+    # max_lines lines, or None if none of them matches.
+    for count, line in enumerate(log_lines):
+        if count >= max_lines:
+            break
+        for name, (marker, regex, line_source) in ospf_parser_registry.items():
+            if marker in line and regex.match(line):
+                return name
+    return None
+
+# The markers of the OSPF neighbor log lines: Junos RPD_OSPF_NBR and Cisco %OSPF-5-ADJCHG,
+# as logged by the device and as already lowercased.
+ospf_marker_list = [b'RPD_OSPF_NBR', b'rpd_ospf_nbr', b'%OSPF-5-ADJCHG', b'%ospf-5-adjchg']
+
+def mmap_marker_lines(filename, start=0, end=None, decompress_thread=False, scan_stat=None):
+    # Memory-map the log file and scan the raw bytes for the OSPF markers.
+    # Only the lines containing a marker are decoded and lowercased; every other line
+    # is skipped without being copied.
+    # With a byte range, only the lines starting within [start, end) are read.
+    # A compressed log file cannot be memory-mapped nor split into byte ranges: it is
+    # scanned block by block as it is decompressed, by the range starting at 0.
+    # With a scan_stat dict, the lines of the range are counted in scan_stat["scanned"].
+    compression = detect_compression(filename)
+    if compression is not None:
+        if start == 0:
+            yield from compressed_marker_lines(filename, compression, decompress_thread, scan_stat)
+        return
+    with open(filename, "rb") as f:
+        # An empty file cannot be memory-mapped.
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from buffer_marker_lines(mm, start, end, scan_stat)
+
+def compressed_marker_lines(filename, compression, decompress_thread=False, scan_stat=None):
+    # mmap_marker_lines for a compressed log file: every decompressed block is scanned
+    # up to its last complete line, and the rest of the block is carried to the next one.
+    rest = b""
+    for block in decompressed_blocks(filename, compression, decompress_thread):
+        buffer = rest + block
+        line_end = buffer.rfind(b"\n") + 1
+        yield from buffer_marker_lines(buffer, 0, line_end, scan_stat)
+        rest = buffer[line_end:]
+    if rest:
+        yield from buffer_marker_lines(rest, scan_stat=scan_stat)
+
+def buffer_marker_lines(mm, start=0, end=None, scan_stat=None):
+    # The marker scan of mmap_marker_lines, on any bytes-like buffer with find and rfind.
+    size = len(mm)
+    if end is None:
+        end = size
+
+    # A line crossing the start of the range belongs to the previous range.
+    position = 0
+    if start > 0:
+        position = mm.find(b"\n", start - 1) + 1
+        if position == 0:
+            return
+    if scan_stat is not None:
+        scan_stat["scanned"] = scan_stat.get("scanned", 0) + count_line_starts(mm, position, min(end, size))
+
+    # The next hit of each marker, found with the C level bytes search.
+    # A marker that does not show up again is parked at the end of the file.
+    next_hit_list = [size] * len(ospf_marker_list)
+    for index, marker in enumerate(ospf_marker_list):
+        hit = mm.find(marker, position)
+        if hit != -1:
+            next_hit_list[index] = hit
+
+    while position < end:
+        hit = min(next_hit_list)
+        if hit >= size:
+            break
+
+        line_start = mm.rfind(b"\n", position, hit) + 1 or position
+        if line_start >= end:
+            break
+        line_end = mm.find(b"\n", hit)
+        if line_end == -1:
+            line_end = size
+
+        yield mm[line_start:line_end].decode().lower()
+        position = line_end + 1
+
+        for index, marker in enumerate(ospf_marker_list):
+            if next_hit_list[index] < position:
+                hit = mm.find(marker, position)
+                next_hit_list[index] = size if hit == -1 else hit
+
+def count_line_starts(mm, start, end, block_size=1024 * 1024):
+    # The number of lines starting within [start, end) of the buffer, start being the start of a line.
+    # Counted block by block, as a slice of an mmap is a copy.
+    if start >= end:
+        return 0
+    count = 1
+    for block_start in range(start, end - 1, block_size):
+        count += mm[block_start:min(block_start + block_size, end - 1)].count(b"\n")
+    return count
+
+def mmap_logfile_reader(filename, bad_word_list, start=0, end=None, decompress_thread=False):
+    yield from log_cleaner(mmap_marker_lines(filename, start, end, decompress_thread), bad_word_list)
+
+def ospf_event_stream(log_lines, parse_stat=None, hostname=None, parsers=None, profile=None, year_resolver=None):
     #   Convert the log lines into easier managable data structure.
     #   E.g.
     #   'jan  5 11:48:14.571  jkf-mayb-switch1 rpd[1307]: rpd_ospf_nbrdown: ospf neighbor 10.132.43.105 (realm ospf-v2 vlan.514 area 0.0.0.0) state changed from full to init due to 1wayrcvd (event reason: neighbor is in one-way mode)'
@@ -50,53 +352,217 @@ def junos_ospf_log_reader(log_lines):
     #   Data Structure:
     #   {NeighborIP1 : [log_item_1,log_item_2....], NeighborIP2: [log_item_1,log_item_2....] ... }
 
-    log_dict = {}
-    for line in log_lines:
-        neighborIP = ""
-        timestamp = ""
-        status = ""
-        hostname = ""
-        interface = ""
-
-        # print(line)
-
-        neighborIP = (line.split("ospf neighbor ")[1]).split(" (realm")[0]
-        # print(neighborIP)
-
-        timestamp_regex = r'[a-z][a-z][a-z]\s.\d\s[0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]{3}'
-        raw_timestamp = re.findall(timestamp_regex, line)[0]
-        #print(timestamp)
-        #print(time_object)
-
-        hostname = line.split(raw_timestamp)[1].split("rpd[")[0].strip()
-        # print(hostname)
-
-        timestamp = raw_timestamp[4:6].strip()+"-"+raw_timestamp[0:3].capitalize()+" "+raw_timestamp[7:]
+    #   The parsed events are yielded one at a time as (NeighborIP, log_item),
+    #   in the same order as the log lines.
+    #   Lines not matching the log format, or with a date that does not exist (e.g. feb 30),
+    #   are skipped. If a parse_stat dict is given, the number of "parsed", "unparsed" and
+    #   "skipped" (neither UP nor DOWN) lines is counted in it.
+    #
+    #   Every line is handed to the registered parser whose marker it contains, so a file
+    #   with the logs of several vendors is parsed in one pass. The parser of the last
+    #   matching line is tried first, which makes a single vendor file cost one marker test per line.
+    #   hostname is the device of the file, for the formats without the hostname in the line (Cisco).
+    #   parsers limits the registered parsers used, e.g. ["junos"].
+    #   With a PipelineProfile, the timestamp conversion is timed as a stage of its own.
+    #   The log lines have no year: year_resolver (a YearResolver, by default anchored at
+    #   today) infers it line by line, e.g. YearResolver.from_logfile(filename) for a log file.
+    if parse_stat is None:
+        parse_stat = {}
+    for key in ("parsed", "unparsed", "skipped"):
+        parse_stat.setdefault(key, 0)
+    convert_time = str_to_time if profile is None else profile.timed("timestamp", str_to_time)
+    if year_resolver is None:
+        year_resolver = YearResolver()
+    resolve_year = year_resolver.resolve
+
+    for match, line_source in ospf_match_stream(log_lines, parse_stat, parsers):
+        status = match_status(match)
+        if status is None:
+            parse_stat["skipped"] += 1
+            continue
 
-        location = location_determinator(hostname)
+        line_hostname, location = line_source(match, hostname)
+        try:
+            time_object = convert_time(match_timestamp(match), location, resolve_year(match["month"], match["day"]))
+        except ValueError:
+            parse_stat["unparsed"] += 1
+            continue
+        parse_stat["parsed"] += 1
 
-        time_object = str_to_time(timestamp, location)
+        log_item = [time_object, status, line_hostname, match["interface"]]
+        yield match["neighbor"], log_item
 
-        interface = (line.split("ospf-v2 ")[1]).split("area")[0].strip()
-        # print(interface)
+def ospf_match_stream(log_lines, parse_stat, parsers=None):
+    # Yield (match, line_source) for every line matching one of the registered parsers,
+    # counting the other lines as "unparsed" in parse_stat.
+    if parsers is None:
+        parsers = list(ospf_parser_registry)
+    parser_list = [(marker, regex.match, line_source)
+                   for marker, regex, line_source in (ospf_parser_registry[name] for name in parsers)]
+    parse_stat.setdefault("unparsed", 0)
 
-        statusword = line.split("state changed from ")
-        # print(statusword)
-        if re.search(r'\bfull to \b', statusword[1]):
-            status = "DOWN"
-        elif re.search(r'\bto full \b', statusword[1]):
-            status = "UP"
-        else:
+    for line in log_lines:
+        match = None
+        for position, (marker, match_line, line_source) in enumerate(parser_list):
+            if marker in line:
+                match = match_line(line)
+                if position:
+                    parser_list.insert(0, parser_list.pop(position))
+                break
+        if match is None:
+            parse_stat["unparsed"] += 1
             continue
-        # print(status)
+        yield match, line_source
+
+def match_status(match):
+    # Status:   full to xxx -> DOWN,   xxx to full -> UP,   None for the other transitions
+    if match["from_state"] == "full":
+        return "DOWN"
+    if match["to_state"] == "full":
+        return "UP"
+    return None
+
+def match_timestamp(match):
+    # timestamp example: 5-Jan 11:48:14.571
+    return match["day"]+"-"+match["month"].capitalize()+" "+match["time"]
+
+def ospf_transition_stream(log_lines, parse_stat=None, hostname=None, parsers=None, year_resolver=None):
+    # Every state change of the log lines, not only the UP and DOWN events, with all
+    # the fields of the line: yield (NeighborIP, timestamp, status, hostname, match),
+    # where status is None for the transitions that are neither UP nor DOWN
+    # and match has the named groups of the parser (area, from_state, to_state, reason, ...).
+    if parse_stat is None:
+        parse_stat = {}
+    for key in ("parsed", "unparsed", "skipped"):
+        parse_stat.setdefault(key, 0)
+    if year_resolver is None:
+        year_resolver = YearResolver()
+    resolve_year = year_resolver.resolve
+
+    for match, line_source in ospf_match_stream(log_lines, parse_stat, parsers):
+        status = match_status(match)
+        line_hostname, location = line_source(match, hostname)
+        try:
+            time_object = str_to_time(match_timestamp(match), location, resolve_year(match["month"], match["day"]))
+        except ValueError:
+            parse_stat["unparsed"] += 1
+            continue
+        parse_stat["parsed" if status is not None else "skipped"] += 1
+        yield match["neighbor"], time_object, status, line_hostname, match
+
+def collect_events(transition_stream, log_dict):
+    # Pass the transitions of ospf_transition_stream through, collecting the UP and DOWN
+    # events into a log_dict or an OspfEventStore on the way, so one parse can feed both.
+    for item in transition_stream:
+        neighborIP, timestamp, status, hostname, match = item
+        if status is not None:
+            log_item = [timestamp, status, hostname, match["interface"]]
+            if isinstance(log_dict, OspfEventStore):
+                log_dict.append(neighborIP, log_item)
+            else:
+                log_dict.setdefault(neighborIP, []).append(log_item)
+        yield item
 
-        log_item = [time_object, status, hostname, interface]
+def junos_ospf_event_stream(log_lines, parse_stat=None):
+    # ospf_event_stream with the Junos parser only.
+    return ospf_event_stream(log_lines, parse_stat, parsers=["junos"])
+
+def junos_ospf_log_reader(log_lines, parse_stat=None, hostname=None, profile=None, year_resolver=None):
+    # Collect the streamed events into the per neighbor data structure:
+    # {NeighborIP1 : [log_item_1,log_item_2....], NeighborIP2: [log_item_1,log_item_2....] ... }
+    # All the registered log formats are read, not only Junos.
+    log_dict = {}
+    for neighborIP, log_item in ospf_event_stream(log_lines, parse_stat, hostname, profile=profile,
+                                                  year_resolver=year_resolver):
         log_dict.setdefault(neighborIP, []).append(log_item)
     # pprint.pprint(log_dict)
     return log_dict
 
+def junos_ospf_event_store(log_lines, parse_stat=None, hostname=None, profile=None, year_resolver=None):
+    # Same as junos_ospf_log_reader, but the events are kept in a compact OspfEventStore.
+    store = OspfEventStore()
+    for neighborIP, log_item in ospf_event_stream(log_lines, parse_stat, hostname, profile=profile,
+                                                  year_resolver=year_resolver):
+        store.append(neighborIP, log_item)
+    return store
+
+def junos_ospf_chunk_reader(chunk):
+    # Worker of the process pool: parse one byte range of the log file.
+    # The years are inferred from start_date, the date of the first event of the range as
+    # resolved by the parent; the date of the last event is returned for the next range.
+    filename, start, end, bad_word_list, compact, hostname, reference_date, start_date = chunk
+    parse_stat = {}
+    year_resolver = YearResolver(reference_date, start_date)
+    log_lines = mmap_logfile_reader(filename, bad_word_list, start, end)
+    if compact:
+        log_dict = junos_ospf_event_store(log_lines, parse_stat, hostname, year_resolver=year_resolver)
+    else:
+        log_dict = junos_ospf_log_reader(log_lines, parse_stat, hostname, year_resolver=year_resolver)
+    return log_dict, parse_stat, year_resolver.last_date
+
+def chunk_first_date_key(filename, start, end):
+    # The (month, day) of the first OSPF line of the byte range, None if it has none.
+    with open(filename, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for match, line_source in ospf_match_stream(buffer_marker_lines(mm, start, end), {}):
+                return match["month"], match["day"]
+    return None
+
+def chunk_start_date(reference_date, last_date, first_key):
+    # The date of the first event of a range, after a range ending at last_date.
+    if first_key is None:
+        return last_date
+    return YearResolver(reference_date, last_date).resolve_date(*first_key)
+
+def parallel_ospf_log_reader(filename, bad_word_list, workers, parse_stat=None, compact=False, hostname=None):
+    # Split the log file into byte-range chunks and parse them in a process pool.
+    # Each worker only reads the lines starting within its chunk.
+    # The chunks are merged back in file order, so each neighbor's events come
+    # out in the same (timestamp) order as junos_ospf_log_reader would give.
+    # The year of the first event of every chunk is inferred from the first lines of the
+    # chunks before it. Should a chunk then start in another year than the previous chunk
+    # ended in (more than a year of log between two chunk starts), it is parsed again.
+    if parse_stat is None:
+        parse_stat = {}
+
+    # More chunks than workers, so that a slow chunk does not hold up the others.
+    file_size = os.path.getsize(filename)
+    chunk_count = max(1, workers * 4)
+    chunk_size = max(1, -(-file_size // chunk_count))
+    range_list = [(start, min(start + chunk_size, file_size)) for start in range(0, file_size, chunk_size)]
+
+    reference_date = logfile_reference_date(filename)
+    first_key_list = [chunk_first_date_key(filename, start, end) for start, end in range_list]
+    start_date_list = []
+    last_date = None
+    for first_key in first_key_list:
+        last_date = chunk_start_date(reference_date, last_date, first_key)
+        start_date_list.append(last_date)
+    chunks = [(filename, start, end, bad_word_list, compact, hostname, reference_date, start_date)
+              for (start, end), start_date in zip(range_list, start_date_list)]
+
+    log_dict = OspfEventStore() if compact else {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        last_date = None
+        for chunk, first_key, result in zip(chunks, first_key_list, executor.map(junos_ospf_chunk_reader, chunks)):
+            start_date = chunk_start_date(reference_date, last_date, first_key)
+            if start_date != chunk[-1]:
+                result = junos_ospf_chunk_reader(chunk[:-1] + (start_date,))
+            chunk_log_dict, chunk_parse_stat, last_date = result
+            if compact:
+                log_dict.extend(chunk_log_dict)
+            else:
+                for neighborIP, log_items in chunk_log_dict.items():
+                    log_dict.setdefault(neighborIP, []).extend(log_items)
+            for key, count in chunk_parse_stat.items():
+                parse_stat[key] = parse_stat.get(key, 0) + count
+    return log_dict
+
 def neighbor_date_stat(log_dict):
 
+    if isinstance(log_dict, OspfEventStore):
+        return store_date_stat(log_dict)
+
     neighbor_date_stat_dict = {}
 
     for log_entries in log_dict.items():
@@ -115,6 +581,54 @@ def neighbor_date_stat(log_dict):
     #print(neighbor_date_stat_dict)
     return neighbor_date_stat_dict
 
+def parse_logfile(filename, bad_word_list, workers=1, compact=False, parse_stat=None, hostname=None, profile=None,
+                  decompress_thread=False):
+    # Parse a log file into a log_dict, or an OspfEventStore if compact,
+    # with a process pool if more than one worker is given.
+    # hostname is the device of the file, for the log formats without the hostname in the line.
+    # With a PipelineProfile, reading, cleaning, timestamp conversion and parsing are timed
+    # as separate stages (the process pool is timed as a whole by the caller).
+    # A compressed log file cannot be split into byte ranges, so it is always parsed in
+    # this process, decompressed by a separate thread if decompress_thread is set.
+    # The years of the events are inferred from the date of the file (logfile_reference_date).
+    if workers > 1 and detect_compression(filename) is None:
+        return parallel_ospf_log_reader(filename, bad_word_list, workers, parse_stat, compact, hostname)
+    year_resolver = YearResolver.from_logfile(filename)
+    if profile is None:
+        log_lines = mmap_logfile_reader(filename, bad_word_list, decompress_thread=decompress_thread)
+    else:
+        # The read stage is given every line of the file and only passes the OSPF lines on.
+        scan_stat = {}
+        log_lines = profile.stage_iter("read", mmap_marker_lines(filename, decompress_thread=decompress_thread,
+                                                                 scan_stat=scan_stat))
+        log_lines = profile.stage_iter("log_cleaner", log_cleaner(log_lines, bad_word_list), upstream="read")
+    if compact:
+        log_dict = junos_ospf_event_store(log_lines, parse_stat, hostname, profile, year_resolver)
+    else:
+        log_dict = junos_ospf_log_reader(log_lines, parse_stat, hostname, profile, year_resolver)
+    if profile is not None:
+        profile.record("read")["lines_in"] = scan_stat.get("scanned", 0)
+    return log_dict
+
+def store_date_stat(store):
+    # neighbor_date_stat working on the arrays of an OspfEventStore.
+    neighbor_date_stat_dict = {}
+    date_cache = {}
+    down = EventStatus.DOWN
+
+    for neighborIP, events in store.items():
+        date_dict = {}
+        for timestamp_us, status_code in zip(events.timestamp_array, events.status_array):
+            day = timestamp_us // 86400000000
+            date = date_cache.get(day)
+            if date is None:
+                date = date_cache[day] = epoch_us_to_date(timestamp_us)
+            date_dict.setdefault(date,0)
+            if status_code == down:
+                date_dict[date] += 1
+        neighbor_date_stat_dict[neighborIP] = date_dict
+    return neighbor_date_stat_dict
+
 def neighbor_date_total_stat(neighbor_date_stat_dict):
 
     neighbor_date_total_stat_dict = {}
@@ -124,51 +638,137 @@ def neighbor_date_total_stat(neighbor_date_stat_dict):
 
     return neighbor_date_total_stat_dict
 
-def str_to_time(timestamp_str,timezone_str):
+# The timezone of each location, built once when the module is loaded.
+timezone_dict = {
+    'hk': pytz.timezone('Asia/Hong_Kong'),
+    'sg': pytz.timezone('Asia/Singapore'),
+    'bk': pytz.timezone('Asia/Bangkok'),
+    'jk': pytz.timezone('Asia/Jakarta'),
+    'mu': pytz.timezone('Etc/GMT+10'),
+    'sy': pytz.timezone('Australia/Sydney'),
+    'utc': pytz.utc,
+}
+
+month_dict = {datetime.date(2000, month, 1).strftime('%b'): month for month in range(1, 13)}
+
+# Syslog timestamps of the same day repeat heavily, so the decoded date prefix is
+# memoized per (date prefix, location, year) as the UTC time of the local midnight.
+# {("5-Jan", "jk", 2019) : (local_midnight, utc_midnight, sourcetimezone)}
+date_prefix_cache = {}
+
+# The PuTTY session log header, e.g. "=~=~=~=~=~=~=~=~=~=~=~= PuTTY log 2019.01.26 10:43:48 =~=~=~=~=~=~=~=~=~=~=~="
+putty_header_regex = re.compile(rb'putty log (\d{4})\.(\d{2})\.(\d{2})', re.IGNORECASE)
+
+def logfile_reference_date(filename, header_size=4096):
+    # The date the log file was captured: the date of its PuTTY header, else the date it was last modified.
+    compression = detect_compression(filename)
+    opener = open if compression is None else compression_dict[compression][1].open
+    with opener(filename, "rb") as f:
+        header = f.read(header_size)
+    match = putty_header_regex.search(header)
+    if match:
+        return datetime.date(*map(int, match.groups()))
+    return datetime.date.fromtimestamp(os.path.getmtime(filename))
+
+class YearResolver:
+    # The syslog timestamps have no year, so it is inferred line by line, in one pass:
+    # the first event gets the latest year not putting it more than slack after
+    # reference_date (when the log was captured, by default today); every next event the
+    # earliest year not putting it more than slack before the event before it. The year so
+    # rolls over when the month wraps from Dec to Jan, and a line slightly out of order
+    # (e.g. of another device) does not move it.
+    # last_date continues the inference after an event already resolved, e.g. in another chunk.
+    slack = datetime.timedelta(days=31)
+
+    def __init__(self, reference_date=None, last_date=None):
+        self.reference_date = reference_date or datetime.date.today()
+        self.last_date = last_date
+        # The (month, day) of the last event and its year, as the events of a day come together.
+        self.last_key = None
+        self.last_year = None
+
+    @classmethod
+    def from_logfile(cls, filename):
+        return cls(logfile_reference_date(filename))
+
+    def resolve(self, month, day):
+        # The year of an event, from the month and day of its log line, e.g. ("jan", "5").
+        key = (month, day)
+        if key != self.last_key:
+            self.last_year = self.resolve_date(month, day).year
+            self.last_key = key
+        return self.last_year
+
+    def resolve_date(self, month, day):
+        month = month_dict[month.capitalize()]
+        day = int(day)
+        if self.last_date is None:
+            latest = self.reference_date + self.slack
+            date = max((date for date in candidate_dates(month, day, self.reference_date.year) if date <= latest),
+                       default=None)
+        else:
+            earliest = self.last_date - self.slack
+            date = min((date for date in candidate_dates(month, day, self.last_date.year) if date >= earliest),
+                       default=None)
+        if date is None:
+            # Not a date in any year: left to str_to_time to reject.
+            return datetime.date(self.reference_date.year, 1, 1)
+        self.last_date = date
+        return date
+
+def candidate_dates(month, day, year):
+    # The dates of month and day in the years around year (Feb 29 only in the leap years).
+    for candidate_year in range(year - 4, year + 5):
+        try:
+            yield datetime.date(candidate_year, month, day)
+        except ValueError:
+            pass
+
+def get_timezone(timezone_str):
+    return timezone_dict[timezone_str.lower()]
+
+def decode_date_prefix(date_str, timezone_str, year=None):
+    #date_str example: 5-Jan
+    day, month = date_str.split("-")
+    sourcetimezone = get_timezone(timezone_str)
+    if year is None:
+        year = datetime.datetime.now().year
+    date_time_obj = datetime.datetime(year, month_dict[month.capitalize()], int(day))
+
+    # The UTC offset can be reused for the whole day unless the day has a DST change,
+    # in which case every timestamp of that day is localized on its own.
+    day_start = sourcetimezone.localize(date_time_obj)
+    day_end = sourcetimezone.localize(date_time_obj + datetime.timedelta(days=1))
+    if day_start.utcoffset() != day_end.utcoffset():
+        return date_time_obj, None, sourcetimezone
+
+    return date_time_obj, day_start.astimezone(pytz.utc), sourcetimezone
+
+def str_to_time(timestamp_str,timezone_str,year=None):
     #timestamp_str example: 5-Jan 11:48:14.571
+    #year: the year of the timestamp (see YearResolver), the current year if not given
+    date_str, time_str = timestamp_str.split(" ")
 
-    hk = pytz.timezone('Asia/Hong_Kong')
-    sg = pytz.timezone('Asia/Singapore')
-    bk = pytz.timezone('Asia/Bangkok')
-    jk = pytz.timezone('Asia/Jakarta')
-    mu = pytz.timezone('Etc/GMT+10')
-    utc = pytz.utc
+    key = (date_str, timezone_str, year)
+    cached = date_prefix_cache.get(key)
+    if cached is None:
+        cached = date_prefix_cache[key] = decode_date_prefix(date_str, timezone_str, year)
+    local_midnight, utc_midnight, sourcetimezone = cached
 
-    timezone_dict = {'hk': hk, 'sg': sg, 'bk': bk, 'jk': jk, "mu": mu, 'utc': utc}
+    #time_str example: 11:48:14.571
+    seconds = int(time_str[0:2]) * 3600 + int(time_str[3:5]) * 60 + int(time_str[6:8])
+    microseconds = int(time_str[9:].ljust(6, "0"))
+    time_of_day = datetime.timedelta(0, seconds, microseconds)
 
-    sourcetimezone = [value for (key, value) in timezone_dict.items() if key == timezone_str.lower()][0]
-    #print(sourcetimezone)
-
-    date_time_obj = datetime.datetime.strptime(timestamp_str, '%d-%b %H:%M:%S.%f')
-    date_time_obj = date_time_obj.replace(year=datetime.datetime.now().year)
-
-    # Create the timestamp with the local timezone.
-    date_time_obj = sourcetimezone.localize(date_time_obj)
+    if utc_midnight is None:
+        # Create the timestamp with the local timezone, then convert it to UTC time.
+        return sourcetimezone.localize(local_midnight + time_of_day).astimezone(pytz.utc)
 
     # Convert the timestamp with UTC time.
-    date_time_obj = date_time_obj.astimezone(utc)
-    #print(date_time_obj)
-    #print('Date:', date_time_obj.date())
-    #print('Time:', date_time_obj.time())
-    #print('Date-time:', date_time_obj)
-
-    return date_time_obj
+    return utc_midnight + time_of_day
 
 def utc_to_localtime(timeobject,timezone_str):
-    hk = pytz.timezone('Asia/Hong_Kong')
-    sg = pytz.timezone('Asia/Singapore')
-    bk = pytz.timezone('Asia/Bangkok')
-    jk = pytz.timezone('Asia/Jakarta')
-    mu = pytz.timezone('Etc/GMT+10')
-    utc = pytz.utc
-
-    timezone_dict = {'hk': hk, 'sg': sg, 'bk': bk, 'jk': jk, "mu": mu, 'utc': utc}
-
-    sourcetimezone = [value for (key, value) in timezone_dict.items() if key == timezone_str.lower()][0]
-
-    date_time_obj = timeobject.astimezone(sourcetimezone)
-
-    return date_time_obj
+    return timeobject.astimezone(get_timezone(timezone_str))
 
 def neighbor_downtime_stat(log_dict):
     # This function is to calculate the downtime of each incident
@@ -177,10 +777,14 @@ def neighbor_downtime_stat(log_dict):
     # {"neighborIP" : {"timestamp" : downtime }
     neighbor_downtime_stat_dict = {}
 
+    if isinstance(log_dict, OspfEventStore):
+        return store_downtime_stat(log_dict)
+
     # Iterate the log entries from the given input log_dict
     for log_entries in log_dict.items():
 
         downtime_dict = {}
+        start_time = None
         #print(log_entries[0])
 
         for event in log_entries[1]:
@@ -194,13 +798,70 @@ def neighbor_downtime_stat(log_dict):
                 start_time = timestamp
             # if the event is a up event, the timestamp is the incident end time
             # downtime = end time - start time
-            elif status == "UP":
+            # The incident is closed by its first UP event, as in neighbor_stream_stat.
+            elif status == "UP" and start_time is not None:
                 downtime_dict[timestamp] = timestamp - start_time
+                start_time = None
         #print(date_dict)
         neighbor_downtime_stat_dict[log_entries[0]] = downtime_dict
     #pprint(neighbor_downtime_stat_dict)
     return neighbor_downtime_stat_dict
 
+def store_downtime_stat(store):
+    # neighbor_downtime_stat working on the arrays of an OspfEventStore.
+    # Instead of a {timestamp : downtime} dict, the downtime of each neighbor is an array
+    # with the downtime of every event in microseconds (no_downtime if it has none),
+    # so no datetime is created until the report is formatted (see event_downtime).
+    # {"neighborIP" : array of downtime}
+    neighbor_downtime_stat_dict = {}
+    down = EventStatus.DOWN
+    up = EventStatus.UP
+
+    for neighborIP, events in store.items():
+        downtime_array = array.array("q")
+        start_us = None
+        for timestamp_us, status_code in zip(events.timestamp_array, events.status_array):
+            if status_code == down:
+                downtime_array.append(no_downtime)
+                start_us = timestamp_us
+            elif status_code == up and start_us is not None:
+                downtime_array.append(timestamp_us - start_us)
+                start_us = None
+            else:
+                downtime_array.append(no_downtime)
+        neighbor_downtime_stat_dict[neighborIP] = downtime_array
+    return neighbor_downtime_stat_dict
+
+def neighbor_stream_stat(event_stream, neighbor_date_stat_dict, start_time_dict=None):
+    # Streaming counterpart of neighbor_date_stat and neighbor_downtime_stat.
+    # Only the start time of the open incident is kept for each neighbor,
+    # so the memory used depends on the number of neighbors, not the number of events.
+    # The daily DOWN counts are accumulated into the given neighbor_date_stat_dict,
+    # and the start times of the open incidents into start_time_dict, so that a stream can be resumed.
+    # An incident is closed by its first UP event; a later UP without a new DOWN has no downtime.
+    # Yield: (neighborIP, log_item, downtime)
+    if start_time_dict is None:
+        start_time_dict = {}
+
+    for neighborIP, log_item in event_stream:
+        timestamp = log_item[0]
+        status = log_item[1]
+        downtime = 0
+
+        date_dict = neighbor_date_stat_dict.setdefault(neighborIP, {})
+        date = timestamp.date()
+        date_dict.setdefault(date,0)
+
+        # if the event is a down event, the timestamp is the incident start time
+        if status == "DOWN":
+            date_dict[date] += 1
+            start_time_dict[neighborIP] = timestamp
+        # if the event is a up event, the timestamp is the incident end time
+        elif status == "UP" and neighborIP in start_time_dict:
+            downtime = timestamp - start_time_dict.pop(neighborIP)
+
+        yield neighborIP, log_item, downtime
+
 def location_determinator(hostname):
     # To determine the location of the log based on the device hostname
     # A two-character location abbreviation will be returned.
@@ -216,132 +877,272 @@ def location_determinator(hostname):
         location = "mu"
     elif ("au" in hostname) or ("-sy" in hostname):
         location = "sy"
+    else:
+        location = "utc"
 
     return location
 
-def print_output(ospf_log_dict,neighbor_date_stat_dict,neighbor_date_total_stat_dict,neighbor_downtime_stat_dict):
+# {(location, UTC year, month, day, hour, minute) : ("2019-01-05 11:48:", "+0800")}
+local_minute_cache = {}
+
+def format_localtime(timestamp, location):
+    # Same as utc_to_localtime(timestamp,location).strftime('%Y-%m-%d %H:%M:%S.%f %z'),
+    # but the local date, hour, minute and UTC offset are only worked out once per minute,
+    # as the timezone offsets are whole minutes.
+    key = (location, timestamp.year, timestamp.month, timestamp.day, timestamp.hour, timestamp.minute)
+    cached = local_minute_cache.get(key)
+    if cached is None:
+        local_minute = utc_to_localtime(timestamp.replace(second=0, microsecond=0), location)
+        cached = local_minute_cache[key] = (local_minute.strftime('%Y-%m-%d %H:%M:'), local_minute.strftime('%z'))
+    return f"{cached[0]}{timestamp.second:02d}.{timestamp.microsecond:06d} {cached[1]}"
+
+def render_neighbor_section(neighborIP, log_lines, date_stat_dict, date_total, downtime_stat, location_dict):
+    # The report of one neighbor, as a single string.
+    # location_dict caches the location of each hostname across the neighbors.
+    interface = log_lines[0][3]
+    section = [
+        f"OSPF Neighbor IP: {neighborIP} \tInterface: {interface}\n",
+        "=" * 90 + "\n",
+        "Timestamp \t\t\t\t\t\t\t\t\t Status \t\t Downtime\n",
+        "=" * 90 + "\n",
+    ]
+
+    for log in log_lines:
+        timestamp   = log[0]
+        status      = log[1]
+        hostname    = log[2]
+        location    = location_dict.get(hostname)
+        if location is None:
+            location = location_dict[hostname] = location_determinator(hostname)
+        downtime    = event_downtime(downtime_stat, log)
+
+        formatted_timestamp = format_localtime(timestamp, location)
+
+        if downtime == 0:
+            section.append(f"{formatted_timestamp} \t\t\t {status}\n")
+        else:
+            section.append(f"{formatted_timestamp} \t\t\t {status}  \t\t\t ({downtime})\n")
+
+    section.append("=" * 90 + "\n")
+    section.append("Number of Downtime Incidents\n")
+    section.append("=" * 90 + "\n")
+    for date, downtime in date_stat_dict.items():
+        section.append(f"{date}: {downtime}\n")
+    section.append("-" * 90 + "\n")
+    section.append(f"Total: {date_total}\n\n")
+    return "".join(section)
+
+def report_hostname_list(ospf_log_dict):
+    # The devices of the events, in the order they first show up.
+    if isinstance(ospf_log_dict, OspfEventStore):
+        return list(ospf_log_dict.hostname_list)
+    return list(dict.fromkeys(log[2] for log_lines in ospf_log_dict.values() for log in log_lines))
+
+def report_output(ospf_log_dict,neighbor_date_stat_dict,neighbor_date_total_stat_dict,neighbor_downtime_stat_dict,
+                  filename=None, to_stdout=True, output_path="log_result"):
+    # Render the report once and write it to stdout and/or to <output_path>/<filename>-<time>.txt.
+    # The title names every device of the events (it used to be the device of the last neighbor).
+    # Each neighbor section is formatted once into a string and written to both outputs
+    # in one call, instead of line by line.
+    # The stdout report keeps its original layout: a blank line after the title and
+    # one more blank line after each neighbor.
     now = datetime.datetime.now()
-    for neighborIP, log_lines in ospf_log_dict.items():
-        hostname = log_lines[0][2]
-        continue
 
-    print(f"OSPF Log Analysis for {hostname} \n")
-    print(f"Creation time: {now}\n")
+    hostname = ", ".join(report_hostname_list(ospf_log_dict))
 
-    for neighborIP, log_lines in ospf_log_dict.items():
-        interface = log_lines[0][3]
-        print(f"OSPF Neighbor IP: {neighborIP} \tInterface: {interface}")
-        print(f"=" * 90)
-        print(f"Timestamp \t\t\t\t\t\t\t\t\t Status \t\t Downtime")
-        print(f"=" * 90)
+    f = None
+    if filename is not None:
+        filename = filename.split(".txt")[0]+"-"+now.strftime("%Y%m%d-%H%M%S")+".txt"
 
-        for log in log_lines:
-            timestamp   = log[0]
-            status      = log[1]
-            hostname     = log[2]
-            location    = location_determinator(hostname)
-            interface   = log[3]
-            downtime    = neighbor_downtime_stat_dict[neighborIP][timestamp]
+        if not os.path.exists(output_path):
+            os.makedirs(output_path)
 
-            formatted_timestamp = utc_to_localtime(timestamp,location).strftime('%Y-%m-%d %H:%M:%S.%f %z')
+        wholepath = os.path.join(output_path, filename)
 
-            if downtime == 0:
-                print(f"{formatted_timestamp} \t\t\t {status}")
-            else:
-                print(f"{formatted_timestamp} \t\t\t {status}  \t\t\t ({downtime})")
+        f = open(wholepath, "w+")
 
-        print(f"=" *90)
+    try:
+        if to_stdout:
+            sys.stdout.write(f"OSPF Log Analysis for {hostname} \n\nCreation time: {now}\n\n")
+        if f is not None:
+            f.write(f"OSPF Log Analysis for {hostname} \nCreation time: {now}\n\n")
 
-        print(f"Number of Downtime Incidents")
-        print(f"=" * 90)
-        for date, downtime in neighbor_date_stat_dict[neighborIP].items():
-            print(f"{date}: {downtime}")
-        print(f"-" * 90)
-        print(f"Total: {neighbor_date_total_stat_dict[neighborIP]}")
-        print(f"\n")
+        location_dict = {}
+        for neighborIP, log_lines in ospf_log_dict.items():
+            section = render_neighbor_section(neighborIP, log_lines, neighbor_date_stat_dict[neighborIP],
+                                              neighbor_date_total_stat_dict[neighborIP],
+                                              neighbor_downtime_stat_dict[neighborIP], location_dict)
+            if to_stdout:
+                sys.stdout.write(section + "\n")
+            if f is not None:
+                f.write(section)
+    finally:
+        if f is not None:
+            f.close()
+    return wholepath if f is not None else None
 
-def file_output(ospf_log_dict,neighbor_date_stat_dict,neighbor_date_total_stat_dict,neighbor_downtime_stat_dict,filename):
-    now = datetime.datetime.now()
-
-    filename = filename.split(".txt")[0]+"-"+now.strftime("%Y%m%d-%H%M%S")+".txt"
-
-    if not os.path.exists("log_result"):
-        os.makedirs("log_result")
+def print_output(ospf_log_dict,neighbor_date_stat_dict,neighbor_date_total_stat_dict,neighbor_downtime_stat_dict):
+    report_output(ospf_log_dict,neighbor_date_stat_dict,neighbor_date_total_stat_dict,neighbor_downtime_stat_dict)
 
-    output_path = "./log_result/"
+def file_output(ospf_log_dict,neighbor_date_stat_dict,neighbor_date_total_stat_dict,neighbor_downtime_stat_dict,filename):
+    report_output(ospf_log_dict,neighbor_date_stat_dict,neighbor_date_total_stat_dict,neighbor_downtime_stat_dict,
+                  filename, to_stdout=False)
 
-    wholepath = os.path.join(output_path, filename)
+def stream_event_output(neighborIP, interface, log, downtime):
+    timestamp   = log[0]
+    status      = log[1]
+    location    = location_determinator(log[2])
 
-    f = open(wholepath, "w+")
+    formatted_timestamp = utc_to_localtime(timestamp,location).strftime('%Y-%m-%d %H:%M:%S.%f %z')
 
-    for neighborIP, log_lines in ospf_log_dict.items():
-        hostname = log_lines[0][2]
-        continue
+    if downtime == 0:
+        print(f"{neighborIP} \t {interface} \t {formatted_timestamp} \t\t\t {status}")
+    else:
+        print(f"{neighborIP} \t {interface} \t {formatted_timestamp} \t\t\t {status}  \t\t\t ({downtime})")
 
-    f.write(f"OSPF Log Analysis for {hostname} \n")
-    f.write(f"Creation time: {now}\n")
-    f.write(f"\n")
+def stream_summary_output(neighbor_date_stat_dict, interface_dict):
+    neighbor_date_total_stat_dict = neighbor_date_total_stat(neighbor_date_stat_dict)
+    for neighborIP, date_dict in neighbor_date_stat_dict.items():
+        print(f"Number of Downtime Incidents for {neighborIP} \tInterface: {interface_dict[neighborIP]}")
+        print(f"=" * 90)
+        for date, downtime in date_dict.items():
+            print(f"{date}: {downtime}")
+        print(f"-" * 90)
+        print(f"Total: {neighbor_date_total_stat_dict[neighborIP]}")
+        print(f"\n")
 
-    for neighborIP, log_lines in ospf_log_dict.items():
-        interface = log_lines[0][3]
-        f.write(f"OSPF Neighbor IP: {neighborIP} \tInterface: {interface}\n")
-        f.write(f"=" * 90)
-        f.write("\n")
-        f.write(f"Timestamp \t\t\t\t\t\t\t\t\t Status \t\t Downtime\n")
-        f.write(f"=" * 90)
-        f.write("\n")
+def stream_output(event_stream):
+    # Print each event as soon as it is parsed, followed by the downtime incident
+    # counts of each neighbor once the whole log has been read.
+    neighbor_date_stat_dict = {}
+    interface_dict = {}
 
-        for log in log_lines:
-            timestamp   = log[0]
-            status      = log[1]
-            hostname     = log[2]
-            location    = location_determinator(hostname)
-            interface   = log[3]
-            downtime    = neighbor_downtime_stat_dict[neighborIP][timestamp]
+    print(f"Creation time: {datetime.datetime.now()}\n")
+    print(f"Neighbor IP \t\t Interface \t Timestamp \t\t\t\t\t\t Status \t\t Downtime")
+    print(f"=" * 90)
 
-            formatted_timestamp = utc_to_localtime(timestamp,location).strftime('%Y-%m-%d %H:%M:%S.%f %z')
+    for neighborIP, log, downtime in neighbor_stream_stat(event_stream, neighbor_date_stat_dict):
+        interface = interface_dict.setdefault(neighborIP, log[3])
+        stream_event_output(neighborIP, interface, log, downtime)
 
-            if downtime == 0:
-                f.write(f"{formatted_timestamp} \t\t\t {status}\n")
-            else:
-                f.write(f"{formatted_timestamp} \t\t\t {status}  \t\t\t ({downtime})\n")
-
-        f.write(f"=" *90)
-        f.write("\n")
-
-        f.write(f"Number of Downtime Incidents\n")
-        f.write(f"=" * 90)
-        f.write("\n")
-        for date, downtime in neighbor_date_stat_dict[neighborIP].items():
-            f.write(f"{date}: {downtime}\n")
-        f.write(f"-" * 90)
-        f.write("\n")
-        f.write(f"Total: {neighbor_date_total_stat_dict[neighborIP]}")
-        f.write(f"\n")
-        f.write(f"\n")
-    f.close()
+    print(f"\n")
+    stream_summary_output(neighbor_date_stat_dict, interface_dict)
 
 def main():
+    parser = argparse.ArgumentParser(description="Analyze the Junos and Cisco OSPF neighbor log")
+    parser.add_argument("filename", nargs="?", default="logfile.txt", help="log file collected from the device")
+    parser.add_argument("--hostname", help="device of the log file, for the log formats without the hostname in the line (Cisco)")
+    parser.add_argument("--stream", action="store_true", help="print the events while the log file is being read")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes to parse the log file with")
+    parser.add_argument("--decompress-thread", action="store_true",
+                        help="decompress a gzip, bz2 or xz log file in a separate thread while it is parsed")
+    parser.add_argument("--compact", action="store_true", help="keep the parsed events in a compact event store")
+    parser.add_argument("--numpy", action="store_true", help="calculate the statistics with NumPy (implies --compact)")
+    parser.add_argument("--cache", action="store_true", help="reuse the parsed events cached in log_cache/ (implies --compact)")
+    parser.add_argument("--cache-size", type=int, default=256, help="maximum size of the cache in MB")
+    parser.add_argument("--db", help="also upsert the events and incidents into this SQLite database (see ospf_db.py)")
+    parser.add_argument("--profile", action="store_true",
+                        help="time every stage and write a cProfile dump into log_result/")
+    args = parser.parse_args()
+
+    if args.stream and (args.workers > 1 or args.compact or args.numpy or args.cache or args.profile or args.db):
+        parser.error("--stream cannot be combined with --workers, --compact, --numpy, --cache, --profile or --db")
+
+    if args.db and (args.workers > 1 or args.cache):
+        parser.error("--db cannot be combined with --workers or --cache: the file is parsed once, in this process, "
+                     "for both the report and the database")
+
+    if args.cache:
+        args.compact = True
+
+    if args.numpy:
+        if not ospf_numpy_stat.numpy_available():
+            parser.error("--numpy requires the numpy package")
+        args.compact = True
+
     bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
-    log_lines = logfile_reader("logfile.txt", bad_word_list)
 
-    ospf_log_dict = junos_ospf_log_reader(log_lines)
+    if args.stream:
+        stream_output(ospf_event_stream(mmap_logfile_reader(args.filename, bad_word_list,
+                                                            decompress_thread=args.decompress_thread),
+                                        hostname=args.hostname, year_resolver=YearResolver.from_logfile(args.filename)))
+        return
+
+    # With --profile, every stage is timed and the whole run is recorded by cProfile.
+    profile = None
+    if args.profile:
+        profile = PipelineProfile()
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    def run_stage(name, function, *stage_args):
+        if profile is None:
+            return function(*stage_args)
+        return profile.run(name, function, *stage_args)
+
+    def parse(filename, parse_stat):
+        return parse_logfile(filename, bad_word_list, args.workers, args.compact, parse_stat, args.hostname, profile,
+                             args.decompress_thread)
+
+    def parse_into_db(filename, parse_stat):
+        # Parse the file once, upserting every transition into the database and
+        # collecting the events of the report on the way.
+        # Imported here, as ospf_db imports this module.
+        import ospf_db
+        log_dict = OspfEventStore() if args.compact else {}
+        log_lines = mmap_logfile_reader(filename, bad_word_list, decompress_thread=args.decompress_thread)
+        transition_stream = ospf_transition_stream(log_lines, parse_stat, args.hostname,
+                                                   year_resolver=YearResolver.from_logfile(filename))
+        connection = ospf_db.connect(args.db)
+        try:
+            ospf_db.load_transitions(connection, collect_events(transition_stream, log_dict))
+        finally:
+            connection.close()
+        return log_dict
+
+    parse_stat = {}
+    if args.db:
+        ospf_log_dict = run_stage("parse", parse_into_db, args.filename, parse_stat)
+    elif args.cache:
+        settings = {"bad_word_list": bad_word_list, "reference_date": logfile_reference_date(args.filename).isoformat(),
+                    "hostname": args.hostname, "parsers": sorted(ospf_parser_registry)}
+        ospf_log_dict = run_stage("parse", ospf_cache.cached_event_store, args.filename, settings, parse,
+                                  ospf_cache.default_cache_dir, args.cache_size * 1024 * 1024, parse_stat)
+    else:
+        ospf_log_dict = run_stage("parse", parse, args.filename, parse_stat)
     #print(ospf_log_dict)
 
+    if profile is not None:
+        cleaner_stage = profile.stage_dict.get("log_cleaner")
+        profile.count("parse", cleaner_stage and cleaner_stage["lines_out"], parse_stat.get("parsed", 0))
+
     neighbor_date_stat_dict = {}
-    neighbor_date_stat_dict = neighbor_date_stat(ospf_log_dict)
+    if args.numpy:
+        neighbor_date_stat_dict = run_stage("neighbor_date_stat", ospf_numpy_stat.numpy_date_stat, ospf_log_dict)
+    else:
+        neighbor_date_stat_dict = run_stage("neighbor_date_stat", neighbor_date_stat, ospf_log_dict)
 
     #pprint(neighbor_date_stat_dict)
     neighbor_date_total_stat_dict = {}
-    neighbor_date_total_stat_dict = neighbor_date_total_stat(neighbor_date_stat_dict)
+    neighbor_date_total_stat_dict = run_stage("neighbor_date_total_stat", neighbor_date_total_stat, neighbor_date_stat_dict)
     #print(neighbor_total_stat_dict)
 
-    neighbor_downtime_stat_dict = neighbor_downtime_stat(ospf_log_dict)
+    if args.numpy:
+        neighbor_downtime_stat_dict = run_stage("neighbor_downtime_stat", ospf_numpy_stat.numpy_downtime_stat, ospf_log_dict)
+    else:
+        neighbor_downtime_stat_dict = run_stage("neighbor_downtime_stat", neighbor_downtime_stat, ospf_log_dict)
     #pprint(neighbor_downtime_stat_dict)
 
-    print_output(ospf_log_dict,neighbor_date_stat_dict,neighbor_date_total_stat_dict,neighbor_downtime_stat_dict)
+    run_stage("report_output", report_output, ospf_log_dict,neighbor_date_stat_dict,neighbor_date_total_stat_dict,neighbor_downtime_stat_dict,"ospf-log.txt")
 
-    file_output(ospf_log_dict,neighbor_date_stat_dict,neighbor_date_total_stat_dict,neighbor_downtime_stat_dict,"ospf-log.txt")
+    if profile is not None:
+        profiler.disable()
+        dump_path = profile_dump_path()
+        profiler.dump_stats(dump_path)
+        print(f"\n")
+        for line in profile.summary_lines(parse_stat):
+            print(line)
+        print(f"cProfile dump: {dump_path}")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
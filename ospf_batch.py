@@ -0,0 +1,180 @@
+# Function:
+# To analyze many log captures of many devices in one run, e.g. a directory of the
+# logs collected from every site.
+#
+# The files are parsed in a process pool, one file per task, so a batch of files
+# keeps every core busy. The events are then grouped by device (hostname): the events
+# of a device may come from several files, and one file may hold several devices.
+# The report of every device is written by the pool again, one device per task:
+#   log_result/ospf-log-<hostname>-<time>.txt:  the report of junos_ospf_log.py for the device
+#   log_result/ospf-batch-<time>.txt:           the aggregated report, also printed, with
+#                                               the devices grouped by location
+#                                               (location_determinator) and the neighbors
+#                                               with the most DOWN events across all of them
+#
+# A file whose lines have no hostname (Cisco) is taken as the capture of the device
+# named after the file, e.g. fnlr-sg1-bursa2.txt.
+# Usage:
+# python ospf_batch.py logs/ [more directories, files or "logs/*.txt"] [--workers N] [--top 20]
+
+import os
+import glob
+import argparse
+import datetime
+import concurrent.futures
+
+from junos_ospf_log import (parse_logfile, neighbor_date_stat, neighbor_date_total_stat, neighbor_downtime_stat,
+                            report_output, location_determinator)
+from ospf_event_store import OspfEventStore, no_downtime
+
+def expand_paths(path_list):
+    # The log files of the given files, directories (every file in it) and glob patterns,
+    # in the order given, each file once.
+    filename_list = []
+    for path in path_list:
+        if os.path.isdir(path):
+            matches = sorted(os.path.join(path, name) for name in os.listdir(path))
+        elif os.path.exists(path):
+            matches = [path]
+        else:
+            matches = sorted(glob.glob(path))
+        filename_list.extend(match for match in matches if os.path.isfile(match))
+    return list(dict.fromkeys(filename_list))
+
+def file_hostname(filename):
+    return os.path.splitext(os.path.basename(filename))[0]
+
+def batch_file_reader(task):
+    # Worker of the process pool: parse one log file into an OspfEventStore.
+    filename, bad_word_list = task
+    parse_stat = {}
+    store = parse_logfile(filename, bad_word_list, compact=True, parse_stat=parse_stat,
+                          hostname=file_hostname(filename))
+    return filename, store, parse_stat
+
+def device_summary(hostname, store, neighbor_date_total_stat_dict, neighbor_downtime_stat_dict, top):
+    # {"hostname", "location", "neighbors", "down_events", "incidents", "downtime_us", "top_neighbors"}
+    incident_count = 0
+    downtime_us = 0
+    for downtime_array in neighbor_downtime_stat_dict.values():
+        for downtime in downtime_array:
+            if downtime != no_downtime:
+                incident_count += 1
+                downtime_us += downtime
+
+    neighbor_list = sorted(neighbor_date_total_stat_dict.items(), key=lambda item: (-item[1], item[0]))
+    return {
+        "hostname": hostname,
+        "location": location_determinator(hostname),
+        "neighbors": len(store),
+        "down_events": sum(neighbor_date_total_stat_dict.values()),
+        "incidents": incident_count,
+        "downtime_us": downtime_us,
+        "top_neighbors": [(neighborIP, store[neighborIP][0].interface, count)
+                          for neighborIP, count in neighbor_list[:top] if count],
+    }
+
+def device_report(task):
+    # Worker of the process pool: the statistics and the report file of one device.
+    hostname, store, output_path, top = task
+    neighbor_date_stat_dict = neighbor_date_stat(store)
+    neighbor_date_total_stat_dict = neighbor_date_total_stat(neighbor_date_stat_dict)
+    neighbor_downtime_stat_dict = neighbor_downtime_stat(store)
+    path = report_output(store, neighbor_date_stat_dict, neighbor_date_total_stat_dict, neighbor_downtime_stat_dict,
+                         f"ospf-log-{hostname}.txt", to_stdout=False, output_path=output_path)
+    summary = device_summary(hostname, store, neighbor_date_total_stat_dict, neighbor_downtime_stat_dict, top)
+    summary["report"] = path
+    return summary
+
+def group_by_hostname(file_store_list):
+    # Merge the stores of the files into one store per device, in the order the devices
+    # first show up. A device with events from several files has its events sorted by time.
+    device_dict = {}
+    file_count_dict = {}
+    for store in file_store_list:
+        for hostname, host_store in store.split_by_hostname().items():
+            device_dict.setdefault(hostname, OspfEventStore()).extend(host_store)
+            file_count_dict[hostname] = file_count_dict.get(hostname, 0) + 1
+    for hostname, count in file_count_dict.items():
+        if count > 1:
+            device_dict[hostname].sort_by_time()
+    return device_dict
+
+def batch_analyze(filename_list, bad_word_list, workers=None, output_path="log_result", top=20, parse_stat=None):
+    # Parse the files and write the report of every device; return the device summaries
+    # (see device_summary, plus the "report" path), in the order the devices first show up.
+    if parse_stat is None:
+        parse_stat = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        file_store_list = []
+        for filename, store, file_parse_stat in executor.map(
+                batch_file_reader, [(filename, bad_word_list) for filename in filename_list]):
+            file_store_list.append(store)
+            for key, count in file_parse_stat.items():
+                parse_stat[key] = parse_stat.get(key, 0) + count
+
+        device_dict = group_by_hostname(file_store_list)
+        del file_store_list
+        tasks = [(hostname, store, output_path, top) for hostname, store in device_dict.items()]
+        return list(executor.map(device_report, tasks))
+
+def batch_report_lines(summary_list, file_count, top=20):
+    # The aggregated report: one line per device, grouped by location, then the neighbors
+    # with the most DOWN events of all the devices.
+    lines = [f"OSPF batch report: {file_count} files, {len(summary_list)} devices", ""]
+    location_dict = {}
+    for summary in summary_list:
+        location_dict.setdefault(summary["location"], []).append(summary)
+
+    for location, summaries in location_dict.items():
+        lines.append(f"Location: {location}")
+        lines.append(f"Hostname \t\t\t Neighbors \t DOWN events \t Incidents \t Downtime")
+        lines.append(f"=" * 90)
+        for summary in summaries:
+            downtime = datetime.timedelta(microseconds=summary["downtime_us"])
+            lines.append(f"{summary['hostname']} \t\t {summary['neighbors']} \t\t {summary['down_events']} \t\t "
+                         f"{summary['incidents']} \t\t {downtime}")
+        lines.append("")
+
+    lines.append(f"Top flapping neighbors")
+    lines.append(f"Neighbor IP \t\t Interface \t\t Hostname \t\t\t DOWN events")
+    lines.append(f"=" * 90)
+    neighbor_list = [(count, neighborIP, interface, summary["hostname"])
+                     for summary in summary_list for neighborIP, interface, count in summary["top_neighbors"]]
+    neighbor_list.sort(key=lambda item: (-item[0], item[1], item[3]))
+    for count, neighborIP, interface, hostname in neighbor_list[:top]:
+        lines.append(f"{neighborIP} \t\t {interface} \t\t {hostname} \t\t {count}")
+    lines.append("")
+
+    lines.append(f"Device reports")
+    for summary in summary_list:
+        lines.append(f"{summary['hostname']}: {summary['report']}")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze the OSPF neighbor logs of many devices")
+    parser.add_argument("paths", nargs="+", help="log files, directories or glob patterns")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of processes (default: all cores)")
+    parser.add_argument("--top", type=int, default=20, help="number of top flapping neighbors to list")
+    parser.add_argument("--output-path", default="log_result", help="directory of the reports")
+    args = parser.parse_args()
+
+    filename_list = expand_paths(args.paths)
+    if not filename_list:
+        parser.error("no log files found")
+
+    bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+    summary_list = batch_analyze(filename_list, bad_word_list, args.workers, args.output_path, args.top)
+
+    report = "\n".join(batch_report_lines(summary_list, len(filename_list), args.top)) + "\n"
+    if not os.path.exists(args.output_path):
+        os.makedirs(args.output_path)
+    now = datetime.datetime.now()
+    batch_path = os.path.join(args.output_path, f"ospf-batch-{now:%Y%m%d-%H%M%S}.txt")
+    with open(batch_path, "w") as f:
+        f.write(report)
+    print(report)
+    print(f"Batch report: {batch_path}")
+
+if __name__ == '__main__':
+    main()
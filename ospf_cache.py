@@ -0,0 +1,157 @@
+# Function:
+# An on-disk cache of the parsed OSPF events, so analyzing the same capture again
+# (e.g. with different report options) does not parse any text.
+#
+# Every log file is cached as one OspfEventStore in a compact binary file under log_cache/,
+# keyed by the blake2b hash of the file content and the parser settings.
+# index.json remembers the size, mtime and content hash of each log file, so an unchanged
+# file is found without hashing it again.
+# The cache is bounded in size: the least recently used entries are evicted first,
+# using the mtime of the entry file as its last use time.
+#
+# Entry file:
+#   b"OSPFEV1\n", header length (4 bytes, little-endian), JSON header, then for each neighbor
+#   the raw bytes of its timestamp, status, hostname and interface arrays.
+
+import os
+import sys
+import json
+import struct
+import hashlib
+
+from ospf_event_store import OspfEventStore, NeighborEvents
+
+cache_magic = b"OSPFEV1\n"
+default_cache_dir = "log_cache"
+default_max_cache_bytes = 256 * 1024 * 1024
+
+def file_content_hash(filename, block_size=1024 * 1024):
+    content_hash = hashlib.blake2b(digest_size=20)
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            content_hash.update(block)
+    return content_hash.hexdigest()
+
+def settings_hash(settings):
+    # The parser settings (bad word list, year, ...) are part of the key, so a change
+    # of settings never returns events parsed with the old ones.
+    return hashlib.blake2b(json.dumps(settings, sort_keys=True).encode(), digest_size=8).hexdigest()
+
+def load_index(cache_dir):
+    index_path = os.path.join(cache_dir, "index.json")
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path) as f:
+        return json.load(f)
+
+def save_index(cache_dir, index):
+    index_path = os.path.join(cache_dir, "index.json")
+    with open(index_path + ".tmp", "w") as f:
+        json.dump(index, f)
+    os.replace(index_path + ".tmp", index_path)
+
+def cache_key(filename, settings, cache_dir):
+    # Return the entry name of the log file, hashing the content only when the
+    # size or mtime has changed since it was last seen.
+    stat = os.stat(filename)
+    index = load_index(cache_dir)
+    path = os.path.abspath(filename)
+
+    known = index.get(path)
+    if known is not None and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+        content_hash = known["hash"]
+    else:
+        content_hash = file_content_hash(filename)
+        index[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": content_hash}
+        save_index(cache_dir, index)
+
+    return f"{content_hash}-{settings_hash(settings)}.events"
+
+def write_event_store(entry_path, store, parse_stat):
+    neighbor_list = list(store.items())
+    header = {
+        "byteorder": sys.byteorder,
+        "hostname_list": store.hostname_list,
+        "interface_list": store.interface_list,
+        "neighbor_list": [[neighborIP, len(events)] for neighborIP, events in neighbor_list],
+        "parse_stat": parse_stat,
+    }
+    header_bytes = json.dumps(header).encode()
+
+    with open(entry_path + ".tmp", "wb") as f:
+        f.write(cache_magic)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        for neighborIP, events in neighbor_list:
+            events.timestamp_array.tofile(f)
+            events.status_array.tofile(f)
+            events.hostname_array.tofile(f)
+            events.interface_array.tofile(f)
+    os.replace(entry_path + ".tmp", entry_path)
+
+def read_event_store(entry_path):
+    # Return (store, parse_stat), or None if the entry is not a valid cache file.
+    with open(entry_path, "rb") as f:
+        if f.read(len(cache_magic)) != cache_magic:
+            return None
+        header_length, = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_length))
+        if header["byteorder"] != sys.byteorder:
+            return None
+
+        store = OspfEventStore()
+        for hostname in header["hostname_list"]:
+            store.intern_hostname(hostname)
+        for interface in header["interface_list"]:
+            store.intern_interface(interface)
+
+        for neighborIP, count in header["neighbor_list"]:
+            events = store.neighbor_dict[neighborIP] = NeighborEvents(store)
+            events.timestamp_array.fromfile(f, count)
+            events.status_array.fromfile(f, count)
+            events.hostname_array.fromfile(f, count)
+            events.interface_array.fromfile(f, count)
+    return store, header["parse_stat"]
+
+def evict_cache(cache_dir, max_cache_bytes, keep=None):
+    # Remove the least recently used entries until the cache fits in max_cache_bytes.
+    entry_list = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".events"):
+            stat = os.stat(os.path.join(cache_dir, name))
+            entry_list.append((stat.st_mtime_ns, stat.st_size, name))
+
+    total_size = sum(size for _, size, _ in entry_list)
+    for _, size, name in sorted(entry_list):
+        if total_size <= max_cache_bytes:
+            break
+        if name == keep:
+            continue
+        os.remove(os.path.join(cache_dir, name))
+        total_size -= size
+
+def cached_event_store(filename, settings, parse, cache_dir=default_cache_dir,
+                       max_cache_bytes=default_max_cache_bytes, parse_stat=None):
+    # Return the OspfEventStore of the log file from the cache, or parse it with
+    # parse(filename, parse_stat) and cache the result.
+    if parse_stat is None:
+        parse_stat = {}
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+
+    name = cache_key(filename, settings, cache_dir)
+    entry_path = os.path.join(cache_dir, name)
+
+    if os.path.exists(entry_path):
+        cached = read_event_store(entry_path)
+        if cached is not None:
+            store, cached_parse_stat = cached
+            parse_stat.update(cached_parse_stat)
+            # Mark the entry as recently used.
+            os.utime(entry_path)
+            return store
+
+    store = parse(filename, parse_stat)
+    write_event_store(entry_path, store, parse_stat)
+    evict_cache(cache_dir, max_cache_bytes, keep=name)
+    return store
@@ -0,0 +1,217 @@
+# Function:
+# A local SQLite database of the parsed OSPF events and downtime incidents of every
+# capture loaded into it, so questions across runs and devices are an indexed query
+# instead of a re-parse of every archived log.
+#
+# Tables:
+#   events:     every state change (see ospf_export.py for the fields), ts in epoch microseconds UTC
+#   incidents:  every DOWN with the first UP after it, start_ts/end_ts in epoch microseconds UTC
+# The day columns are the UTC date (YYYY-MM-DD).
+#
+# Loading is an upsert: an event already in the database (same neighbor, time, hostname
+# and transition) is not added again, so overlapping captures do not double count.
+# An incident still open at the end of one capture is closed by the first UP of the
+# neighbor on the same device in a later capture.
+# Usage:
+# python ospf_db.py load logfile.txt [more files] [--db log_result/ospf.db] [--hostname HOST]
+# python ospf_db.py top [--db log_result/ospf.db] [--days 30] [--limit 20]
+
+import os
+import sqlite3
+import argparse
+import datetime
+
+from junos_ospf_log import mmap_logfile_reader, ospf_transition_stream, YearResolver
+from ospf_event_store import time_to_epoch_us, epoch_us_to_time
+from ospf_export import export_rows
+
+default_db_path = os.path.join("log_result", "ospf.db")
+
+schema_sql = """
+CREATE TABLE IF NOT EXISTS events (
+    neighbor_ip TEXT NOT NULL,
+    ts          INTEGER NOT NULL,
+    day         TEXT NOT NULL,
+    hostname    TEXT NOT NULL,
+    interface   TEXT NOT NULL,
+    area        TEXT,
+    from_state  TEXT NOT NULL,
+    to_state    TEXT NOT NULL,
+    reason      TEXT,
+    status      TEXT,
+    UNIQUE (neighbor_ip, ts, hostname, from_state, to_state)
+);
+CREATE TABLE IF NOT EXISTS incidents (
+    neighbor_ip TEXT NOT NULL,
+    hostname    TEXT NOT NULL,
+    interface   TEXT NOT NULL,
+    start_ts    INTEGER NOT NULL,
+    end_ts      INTEGER,
+    downtime_us INTEGER,
+    day         TEXT NOT NULL,
+    UNIQUE (neighbor_ip, hostname, start_ts)
+);
+CREATE INDEX IF NOT EXISTS events_neighbor_ts ON events (neighbor_ip, ts);
+CREATE INDEX IF NOT EXISTS events_hostname_day ON events (hostname, day);
+CREATE INDEX IF NOT EXISTS events_day_status ON events (day, status, neighbor_ip, hostname);
+CREATE INDEX IF NOT EXISTS incidents_neighbor_start ON incidents (neighbor_ip, start_ts);
+CREATE INDEX IF NOT EXISTS incidents_hostname_day ON incidents (hostname, day);
+"""
+
+insert_event_sql = """
+INSERT INTO events (neighbor_ip, ts, day, hostname, interface, area, from_state, to_state, reason, status)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT DO NOTHING
+"""
+
+upsert_incident_sql = """
+INSERT INTO incidents (neighbor_ip, hostname, interface, start_ts, end_ts, downtime_us, day)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (neighbor_ip, hostname, start_ts) DO UPDATE SET
+    end_ts = COALESCE(incidents.end_ts, excluded.end_ts),
+    downtime_us = COALESCE(incidents.downtime_us, excluded.downtime_us)
+"""
+
+def connect(db_path=default_db_path):
+    db_dir = os.path.dirname(db_path)
+    if db_dir and not os.path.exists(db_dir):
+        os.makedirs(db_dir)
+    connection = sqlite3.connect(db_path)
+    connection.executescript(schema_sql)
+    return connection
+
+class SqliteRowWriter:
+    # The row writer interface of ospf_export.export_rows, inserting the rows
+    # with executemany in batches of batch_size.
+
+    def __init__(self, connection, sql, convert_row, batch_size=10000):
+        self.connection = connection
+        self.sql = sql
+        self.convert_row = convert_row
+        self.batch_size = batch_size
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(self.convert_row(row))
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.connection.executemany(self.sql, self.rows)
+            self.rows = []
+
+    def close(self):
+        self.flush()
+
+def event_row(row):
+    timestamp, neighborIP, hostname, interface, area, from_state, to_state, reason, status = row
+    return (neighborIP, time_to_epoch_us(timestamp), timestamp.date().isoformat(), hostname, interface,
+            area, from_state, to_state, reason, status)
+
+def incident_row(row):
+    neighborIP, hostname, interface, start_time, end_time, downtime_us = row
+    end_ts = None if end_time is None else time_to_epoch_us(end_time)
+    return (neighborIP, hostname, interface, time_to_epoch_us(start_time), end_ts, downtime_us,
+            start_time.date().isoformat())
+
+def close_open_incidents(connection, transition_stream):
+    # Pass the transitions through; when the first UP or DOWN event of a neighbor of a
+    # device in the capture is an UP, it closes the incident left open by an earlier capture.
+    seen_set = set()
+    for item in transition_stream:
+        neighborIP, timestamp, status, hostname, match = item
+        if status is not None and (neighborIP, hostname) not in seen_set:
+            seen_set.add((neighborIP, hostname))
+            if status == "UP":
+                ts = time_to_epoch_us(timestamp)
+                connection.execute("""
+                    UPDATE incidents SET end_ts = ?, downtime_us = ? - start_ts
+                    WHERE rowid = (SELECT rowid FROM incidents
+                                   WHERE neighbor_ip = ? AND hostname = ? AND end_ts IS NULL AND start_ts <= ?
+                                   ORDER BY start_ts DESC LIMIT 1)
+                """, (ts, ts, neighborIP, hostname, ts))
+        yield item
+
+def load_logfile(connection, filename, bad_word_list, hostname=None, parse_stat=None):
+    # Upsert the events and incidents of a log file in one transaction.
+    # Return the number of (events, incidents) read from the file; the rows already
+    # in the database are counted but not added again.
+    transition_stream = ospf_transition_stream(mmap_logfile_reader(filename, bad_word_list), parse_stat, hostname,
+                                               year_resolver=YearResolver.from_logfile(filename))
+    return load_transitions(connection, transition_stream)
+
+def load_transitions(connection, transition_stream):
+    # load_logfile for the transitions of ospf_transition_stream, e.g. of a file also
+    # parsed for the report of junos_ospf_log.py.
+    transition_stream = close_open_incidents(connection, transition_stream)
+    with connection:
+        event_writer = SqliteRowWriter(connection, insert_event_sql, event_row)
+        incident_writer = SqliteRowWriter(connection, upsert_incident_sql, incident_row)
+        counts = export_rows(transition_stream, event_writer, incident_writer)
+        event_writer.close()
+        incident_writer.close()
+    return counts
+
+def top_flapping_neighbors(connection, start_day, end_day, limit=20):
+    # The neighbors with the most DOWN events between start_day and end_day (inclusive,
+    # "YYYY-MM-DD"), across all devices: [(neighbor_ip, hostname, DOWN events)]
+    return connection.execute("""
+        SELECT neighbor_ip, hostname, COUNT(*) AS down_count
+        FROM events
+        WHERE day BETWEEN ? AND ? AND status = 'DOWN'
+        GROUP BY neighbor_ip, hostname
+        ORDER BY down_count DESC, neighbor_ip
+        LIMIT ?
+    """, (start_day, end_day, limit)).fetchall()
+
+def neighbor_incidents(connection, neighborIP, start_time=None, end_time=None):
+    # The incidents of a neighbor starting within [start_time, end_time):
+    # [(hostname, interface, start, end or None, downtime or None)]
+    start_ts = -2 ** 63 if start_time is None else time_to_epoch_us(start_time)
+    end_ts = 2 ** 63 - 1 if end_time is None else time_to_epoch_us(end_time)
+    rows = connection.execute("""
+        SELECT hostname, interface, start_ts, end_ts, downtime_us
+        FROM incidents
+        WHERE neighbor_ip = ? AND start_ts >= ? AND start_ts < ?
+        ORDER BY start_ts
+    """, (neighborIP, start_ts, end_ts)).fetchall()
+    return [(hostname, interface, epoch_us_to_time(start), None if end is None else epoch_us_to_time(end),
+             None if downtime_us is None else datetime.timedelta(microseconds=downtime_us))
+            for hostname, interface, start, end, downtime_us in rows]
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the OSPF neighbor events of every capture in SQLite")
+    parser.add_argument("--db", default=default_db_path, help="SQLite database file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    load_parser = subparsers.add_parser("load", help="upsert the events and incidents of log files")
+    load_parser.add_argument("filenames", nargs="+")
+    load_parser.add_argument("--hostname", help="device of the log files, for the log formats without the hostname in the line (Cisco)")
+
+    top_parser = subparsers.add_parser("top", help="the neighbors with the most DOWN events")
+    top_parser.add_argument("--days", type=int, default=30, help="number of days up to --until")
+    top_parser.add_argument("--until", default=datetime.date.today().isoformat(), help="last day, YYYY-MM-DD")
+    top_parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+    connection = connect(args.db)
+    try:
+        if args.command == "load":
+            for filename in args.filenames:
+                event_count, incident_count = load_logfile(connection, filename, bad_word_list, args.hostname)
+                print(f"{filename}: {event_count} events, {incident_count} incidents")
+        else:
+            end_day = datetime.date.fromisoformat(args.until)
+            start_day = end_day - datetime.timedelta(days=args.days - 1)
+            print(f"Neighbor IP \t\t Hostname \t\t\t DOWN events ({start_day} - {end_day})")
+            print(f"=" * 90)
+            for neighborIP, hostname, down_count in top_flapping_neighbors(
+                    connection, start_day.isoformat(), end_day.isoformat(), args.limit):
+                print(f"{neighborIP} \t\t {hostname} \t\t {down_count}")
+    finally:
+        connection.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+# Function:
+# A compact store for the parsed OSPF neighbor events.
+# Instead of a [timestamp,status,hostname,interface] list per event, the events of each
+# neighbor are kept in typed arrays:
+#   timestamp:  int64 epoch microseconds (UTC)
+#   status:     EventStatus code
+#   hostname:   index into the interned hostname table of the store
+#   interface:  index into the interned interface table of the store
+#
+# The store behaves like the log_dict returned by junos_ospf_log_reader,
+# {NeighborIP1 : [log_item_1,log_item_2....] ... },
+# where every log_item is an OspfEvent view that can still be indexed as
+# [timestamp,status,hostname,interface].
+
+import array
+import datetime
+import enum
+import pytz
+
+epoch = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+epoch_date = epoch.date()
+one_microsecond = datetime.timedelta(microseconds=1)
+microseconds_per_day = 86400 * 1000000
+
+# The downtime of an event without one (DOWN events and UP events without a DOWN before them)
+# in the per event downtime arrays.
+no_downtime = -1
+
+class EventStatus(enum.IntEnum):
+    DOWN = 0
+    UP = 1
+
+status_code_dict = {status.name: status.value for status in EventStatus}
+status_name_list = [status.name for status in EventStatus]
+
+def time_to_epoch_us(timeobject):
+    return (timeobject - epoch) // one_microsecond
+
+def epoch_us_to_time(timestamp_us):
+    return epoch + datetime.timedelta(microseconds=timestamp_us)
+
+def epoch_us_to_date(timestamp_us):
+    return epoch_date + datetime.timedelta(days=timestamp_us // microseconds_per_day)
+
+class OspfEvent:
+    # A read-only view of one event in the store.
+    __slots__ = ("events", "index")
+
+    def __init__(self, events, index):
+        self.events = events
+        self.index = index
+
+    @property
+    def timestamp_us(self):
+        return self.events.timestamp_array[self.index]
+
+    @property
+    def timestamp(self):
+        return epoch_us_to_time(self.events.timestamp_array[self.index])
+
+    @property
+    def status(self):
+        return status_name_list[self.events.status_array[self.index]]
+
+    @property
+    def hostname(self):
+        return self.events.store.hostname_list[self.events.hostname_array[self.index]]
+
+    @property
+    def interface(self):
+        return self.events.store.interface_list[self.events.interface_array[self.index]]
+
+    def __getitem__(self, key):
+        # Keep the log_item indexing: [timestamp,status,hostname,interface]
+        if isinstance(key, slice):
+            return [self.timestamp, self.status, self.hostname, self.interface][key]
+        return event_field_list[key].fget(self)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __len__(self):
+        return 4
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+event_field_list = [OspfEvent.timestamp, OspfEvent.status, OspfEvent.hostname, OspfEvent.interface]
+
+def event_downtime(downtime_stat, log):
+    # The downtime of one event, as used by the reports.
+    # For a log_dict, downtime_stat is the {timestamp : downtime} dict of the neighbor;
+    # for an OspfEventStore, it is the per event downtime array of the neighbor, in microseconds,
+    # which is only turned into a timedelta here.
+    if isinstance(log, OspfEvent):
+        downtime_us = downtime_stat[log.index]
+        return 0 if downtime_us == no_downtime else datetime.timedelta(microseconds=downtime_us)
+    return downtime_stat[log[0]]
+
+class NeighborEvents:
+    # The events of one neighbor, in the order they were added.
+    __slots__ = ("store", "timestamp_array", "status_array", "hostname_array", "interface_array")
+
+    def __init__(self, store):
+        self.store = store
+        self.timestamp_array = array.array("q")
+        self.status_array = array.array("B")
+        self.hostname_array = array.array("I")
+        self.interface_array = array.array("I")
+
+    def __len__(self):
+        return len(self.timestamp_array)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [OspfEvent(self, i) for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("event index out of range")
+        return OspfEvent(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield OspfEvent(self, index)
+
+    def __eq__(self, other):
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def sort_by_time(self):
+        # Put the events in timestamp order (stable), e.g. after merging several captures.
+        order = sorted(range(len(self)), key=self.timestamp_array.__getitem__)
+        if order == list(range(len(self))):
+            return
+        for name in ("timestamp_array", "status_array", "hostname_array", "interface_array"):
+            values = getattr(self, name)
+            setattr(self, name, array.array(values.typecode, (values[i] for i in order)))
+
+class OspfEventStore:
+
+    def __init__(self):
+        # Interned hostname and interface tables.
+        self.hostname_list = []
+        self.hostname_index = {}
+        self.interface_list = []
+        self.interface_index = {}
+        # {NeighborIP : NeighborEvents}
+        self.neighbor_dict = {}
+
+    @classmethod
+    def from_log_dict(cls, log_dict):
+        store = cls()
+        for neighborIP, log_items in log_dict.items():
+            for log_item in log_items:
+                store.append(neighborIP, log_item)
+        return store
+
+    def intern_hostname(self, hostname):
+        index = self.hostname_index.get(hostname)
+        if index is None:
+            index = self.hostname_index[hostname] = len(self.hostname_list)
+            self.hostname_list.append(hostname)
+        return index
+
+    def intern_interface(self, interface):
+        index = self.interface_index.get(interface)
+        if index is None:
+            index = self.interface_index[interface] = len(self.interface_list)
+            self.interface_list.append(interface)
+        return index
+
+    def neighbor_events(self, neighborIP):
+        events = self.neighbor_dict.get(neighborIP)
+        if events is None:
+            events = self.neighbor_dict[neighborIP] = NeighborEvents(self)
+        return events
+
+    def append(self, neighborIP, log_item):
+        # log_item: [timestamp,status,hostname,interface]
+        timestamp, status, hostname, interface = log_item[0], log_item[1], log_item[2], log_item[3]
+        self.append_event(neighborIP, time_to_epoch_us(timestamp), status_code_dict[status],
+                          self.intern_hostname(hostname), self.intern_interface(interface))
+
+    def append_event(self, neighborIP, timestamp_us, status_code, hostname_id, interface_id):
+        events = self.neighbor_events(neighborIP)
+        events.timestamp_array.append(timestamp_us)
+        events.status_array.append(status_code)
+        events.hostname_array.append(hostname_id)
+        events.interface_array.append(interface_id)
+
+    def extend(self, other):
+        # Append the events of another store, e.g. the store of the next file chunk.
+        hostname_map = [self.intern_hostname(hostname) for hostname in other.hostname_list]
+        interface_map = [self.intern_interface(interface) for interface in other.interface_list]
+        for neighborIP, other_events in other.neighbor_dict.items():
+            events = self.neighbor_events(neighborIP)
+            events.timestamp_array.extend(other_events.timestamp_array)
+            events.status_array.extend(other_events.status_array)
+            events.hostname_array.extend(array.array("I", (hostname_map[i] for i in other_events.hostname_array)))
+            events.interface_array.extend(array.array("I", (interface_map[i] for i in other_events.interface_array)))
+
+    def split_by_hostname(self):
+        # Return {hostname : OspfEventStore with the events of that device only}.
+        store_dict = {}
+        for neighborIP, events in self.neighbor_dict.items():
+            for index in range(len(events)):
+                hostname = self.hostname_list[events.hostname_array[index]]
+                store = store_dict.get(hostname)
+                if store is None:
+                    store = store_dict[hostname] = OspfEventStore()
+                store.append_event(neighborIP, events.timestamp_array[index], events.status_array[index],
+                                   store.intern_hostname(hostname),
+                                   store.intern_interface(self.interface_list[events.interface_array[index]]))
+        return store_dict
+
+    def sort_by_time(self):
+        for events in self.neighbor_dict.values():
+            events.sort_by_time()
+
+    def to_log_dict(self):
+        return {neighborIP: [list(event) for event in events] for neighborIP, events in self.items()}
+
+    # The dict interface of the log_dict.
+    def __len__(self):
+        return len(self.neighbor_dict)
+
+    def __iter__(self):
+        return iter(self.neighbor_dict)
+
+    def __contains__(self, neighborIP):
+        return neighborIP in self.neighbor_dict
+
+    def __getitem__(self, neighborIP):
+        return self.neighbor_dict[neighborIP]
+
+    def keys(self):
+        return self.neighbor_dict.keys()
+
+    def values(self):
+        return self.neighbor_dict.values()
+
+    def items(self):
+        return self.neighbor_dict.items()
@@ -0,0 +1,205 @@
+# Function:
+# To export the parsed OSPF events and the downtime incidents as columnar files,
+# so they can be loaded into pandas (or any SQL/dataframe tool) without scraping the
+# text report of file_output.
+#
+# Two files are written into log_result/:
+#   ospf-events-<time>.<ext>:     every state change of every neighbor
+#       timestamp_utc, neighbor_ip, hostname, interface, area, from_state, to_state, reason, status
+#       (status is UP, DOWN or empty for the transitions in between)
+#   ospf-incidents-<time>.<ext>:  every DOWN with the first UP after it
+#       neighbor_ip, hostname, interface, start_utc, end_utc, downtime_us
+#       (end_utc and downtime_us are empty for an incident still open at the end of the log)
+#
+# CSV always works. Parquet and Arrow IPC need pyarrow; "auto" picks Parquet when pyarrow
+# is installed and CSV otherwise. The log is read once, and the rows are written in
+# batches as they are parsed, so the whole log is never held in memory.
+# Usage:
+# python ospf_export.py [logfile] [--format auto|csv|parquet|arrow] [--hostname HOST] [--batch-size 65536]
+
+import os
+import csv
+import argparse
+import datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from junos_ospf_log import mmap_logfile_reader, ospf_transition_stream, YearResolver
+from ospf_event_store import time_to_epoch_us
+
+event_field_list = ["timestamp_utc", "neighbor_ip", "hostname", "interface", "area",
+                    "from_state", "to_state", "reason", "status"]
+incident_field_list = ["neighbor_ip", "hostname", "interface", "start_utc", "end_utc", "downtime_us"]
+
+export_format_list = ["auto", "csv", "parquet", "arrow"]
+file_extension_dict = {"csv": "csv", "parquet": "parquet", "arrow": "arrow"}
+
+def pyarrow_available():
+    return pa is not None
+
+def event_schema():
+    return pa.schema([
+        ("timestamp_utc", pa.timestamp("us", tz="UTC")),
+        ("neighbor_ip", pa.string()),
+        ("hostname", pa.string()),
+        ("interface", pa.string()),
+        ("area", pa.string()),
+        ("from_state", pa.string()),
+        ("to_state", pa.string()),
+        ("reason", pa.string()),
+        ("status", pa.string()),
+    ])
+
+def incident_schema():
+    return pa.schema([
+        ("neighbor_ip", pa.string()),
+        ("hostname", pa.string()),
+        ("interface", pa.string()),
+        ("start_utc", pa.timestamp("us", tz="UTC")),
+        ("end_utc", pa.timestamp("us", tz="UTC")),
+        ("downtime_us", pa.int64()),
+    ])
+
+class CsvRowWriter:
+    # Write rows (tuples in field order) to a CSV file with a header line.
+    # The timestamps are written in ISO 8601 with their UTC offset.
+
+    def __init__(self, path, field_list):
+        self.file = open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(field_list)
+
+    def write(self, row):
+        self.writer.writerow(["" if value is None else value.isoformat() if isinstance(value, datetime.datetime)
+                              else value for value in row])
+
+    def close(self):
+        self.file.close()
+
+class ArrowRowWriter:
+    # Collect the rows into column batches of batch_size rows, and write each batch
+    # as a Parquet row group or an Arrow IPC record batch.
+
+    def __init__(self, path, schema, file_format, batch_size):
+        self.schema = schema
+        self.batch_size = batch_size
+        self.columns = [[] for _ in schema]
+        if file_format == "parquet":
+            self.writer = pq.ParquetWriter(path, schema)
+        else:
+            self.writer = pa.ipc.new_file(path, schema)
+
+    def write(self, row):
+        for column, value in zip(self.columns, row):
+            column.append(value)
+        if len(self.columns[0]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.columns[0]:
+            return
+        batch = pa.record_batch([pa.array(column, type=field.type) for column, field in zip(self.columns, self.schema)],
+                                schema=self.schema)
+        if isinstance(self.writer, pq.ParquetWriter):
+            self.writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            self.writer.write_batch(batch)
+        self.columns = [[] for _ in self.schema]
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+def row_writer(path, file_format, field_list, schema_function, batch_size):
+    if file_format == "csv":
+        return CsvRowWriter(path, field_list)
+    return ArrowRowWriter(path, schema_function(), file_format, batch_size)
+
+def resolve_format(file_format):
+    if file_format == "auto":
+        return "parquet" if pyarrow_available() else "csv"
+    if file_format != "csv" and not pyarrow_available():
+        raise RuntimeError(f"the {file_format} export requires the pyarrow package")
+    return file_format
+
+def export_rows(transition_stream, event_writer, incident_writer):
+    # Write every transition to event_writer, and every incident to incident_writer
+    # as soon as its first UP event closes it; the incidents still open at the end are
+    # written last. Return the number of (events, incidents) written.
+    # {(NeighborIP, hostname) : (start time, interface)} of the open incidents,
+    # as two devices may see the same neighbor IP
+    open_incident_dict = {}
+    event_count = 0
+    incident_count = 0
+
+    for neighborIP, timestamp, status, hostname, match in transition_stream:
+        groups = match.groupdict()
+        event_writer.write((timestamp, neighborIP, hostname, groups["interface"], groups.get("area"),
+                            groups["from_state"], groups["to_state"], groups.get("reason"), status))
+        event_count += 1
+
+        key = (neighborIP, hostname)
+        if status == "DOWN":
+            open_incident_dict[key] = (timestamp, groups["interface"])
+        elif status == "UP" and key in open_incident_dict:
+            start_time, interface = open_incident_dict.pop(key)
+            downtime_us = time_to_epoch_us(timestamp) - time_to_epoch_us(start_time)
+            incident_writer.write((neighborIP, hostname, interface, start_time, timestamp, downtime_us))
+            incident_count += 1
+
+    for (neighborIP, hostname), (start_time, interface) in open_incident_dict.items():
+        incident_writer.write((neighborIP, hostname, interface, start_time, None, None))
+        incident_count += 1
+    return event_count, incident_count
+
+def export_logfile(filename, bad_word_list, file_format="auto", hostname=None, output_path="log_result",
+                   batch_size=65536, parse_stat=None):
+    # Export the events and incidents of the log file; return the (events path, incidents path).
+    file_format = resolve_format(file_format)
+    if not os.path.exists(output_path):
+        os.makedirs(output_path)
+
+    now = datetime.datetime.now()
+    extension = file_extension_dict[file_format]
+    event_path = os.path.join(output_path, f"ospf-events-{now:%Y%m%d-%H%M%S}.{extension}")
+    incident_path = os.path.join(output_path, f"ospf-incidents-{now:%Y%m%d-%H%M%S}.{extension}")
+
+    transition_stream = ospf_transition_stream(mmap_logfile_reader(filename, bad_word_list), parse_stat, hostname,
+                                               year_resolver=YearResolver.from_logfile(filename))
+    event_writer = row_writer(event_path, file_format, event_field_list, event_schema, batch_size)
+    try:
+        incident_writer = row_writer(incident_path, file_format, incident_field_list, incident_schema, batch_size)
+        try:
+            export_rows(transition_stream, event_writer, incident_writer)
+        finally:
+            incident_writer.close()
+    finally:
+        event_writer.close()
+    return event_path, incident_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the OSPF neighbor events and incidents as columnar files")
+    parser.add_argument("filename", nargs="?", default="logfile.txt", help="log file collected from the device")
+    parser.add_argument("--format", choices=export_format_list, default="auto",
+                        help="file format; parquet and arrow need pyarrow (default: parquet if available, else csv)")
+    parser.add_argument("--hostname", help="device of the log file, for the log formats without the hostname in the line (Cisco)")
+    parser.add_argument("--batch-size", type=int, default=65536, help="rows per Parquet row group / Arrow record batch")
+    args = parser.parse_args()
+
+    if args.format in ("parquet", "arrow") and not pyarrow_available():
+        parser.error(f"--format {args.format} requires the pyarrow package")
+
+    bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+    parse_stat = {}
+    event_path, incident_path = export_logfile(args.filename, bad_word_list, args.format, args.hostname,
+                                               batch_size=args.batch_size, parse_stat=parse_stat)
+    print(f"Events:    {event_path} ({parse_stat['parsed'] + parse_stat['skipped']} rows)")
+    print(f"Incidents: {incident_path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+# Function:
+# To follow a growing log file, like "tail -F", and keep the per neighbor statistics
+# up to date as new OSPF log lines arrive.
+# The byte offset of the file, the open DOWN incident of each neighbor and the
+# statistics so far are saved in a checkpoint, so a restart resumes where it stopped
+# instead of parsing the whole file again.
+# The years of the lines are inferred by one YearResolver for the whole file, anchored
+# on its PuTTY header or modification time; the date of the last event is saved too, so
+# the year keeps rolling over from Dec to Jan across batches and restarts.
+#
+# Checkpoint (JSON):
+# {
+#   "inode": inode of the file,
+#   "offset": byte offset of the next unread line,
+#   "start_time_dict": {NeighborIP : start of the open incident, epoch microseconds},
+#   "neighbor_date_stat_dict": {NeighborIP : {"2019-01-05" : number of DOWN events}},
+#   "neighbor_downtime_total_dict": {NeighborIP : [number of incidents, total downtime in microseconds]},
+#   "interface_dict": {NeighborIP : interface},
+#   "last_date": "2019-01-31", the date of the last event, or null
+# }
+
+import os
+import json
+import argparse
+import time
+import datetime
+
+from junos_ospf_log import (log_cleaner, ospf_allow_list, ospf_event_stream, neighbor_stream_stat, stream_event_output,
+                            stream_summary_output, YearResolver)
+from ospf_event_store import time_to_epoch_us, epoch_us_to_time
+
+def new_follow_state():
+    return {
+        "inode": None,
+        "offset": 0,
+        "start_time_dict": {},
+        "neighbor_date_stat_dict": {},
+        "neighbor_downtime_total_dict": {},
+        "interface_dict": {},
+        "last_date": None,
+    }
+
+def load_checkpoint(checkpoint_path):
+    state = new_follow_state()
+    if not os.path.exists(checkpoint_path):
+        return state
+
+    with open(checkpoint_path) as f:
+        checkpoint = json.load(f)
+
+    state["inode"] = checkpoint["inode"]
+    state["offset"] = checkpoint["offset"]
+    state["start_time_dict"] = {
+        neighborIP: epoch_us_to_time(start_us) for neighborIP, start_us in checkpoint["start_time_dict"].items()
+    }
+    state["neighbor_date_stat_dict"] = {
+        neighborIP: {datetime.date.fromisoformat(date): count for date, count in date_dict.items()}
+        for neighborIP, date_dict in checkpoint["neighbor_date_stat_dict"].items()
+    }
+    state["neighbor_downtime_total_dict"] = checkpoint["neighbor_downtime_total_dict"]
+    state["interface_dict"] = checkpoint["interface_dict"]
+    # Absent from the checkpoints of the versions before it.
+    if checkpoint.get("last_date") is not None:
+        state["last_date"] = datetime.date.fromisoformat(checkpoint["last_date"])
+    return state
+
+def save_checkpoint(checkpoint_path, state):
+    checkpoint = {
+        "inode": state["inode"],
+        "offset": state["offset"],
+        "start_time_dict": {
+            neighborIP: time_to_epoch_us(start_time) for neighborIP, start_time in state["start_time_dict"].items()
+        },
+        "neighbor_date_stat_dict": {
+            neighborIP: {date.isoformat(): count for date, count in date_dict.items()}
+            for neighborIP, date_dict in state["neighbor_date_stat_dict"].items()
+        },
+        "neighbor_downtime_total_dict": state["neighbor_downtime_total_dict"],
+        "interface_dict": state["interface_dict"],
+        "last_date": None if state["last_date"] is None else state["last_date"].isoformat(),
+    }
+
+    # Write to a temporary file first, so a crash never leaves a half written checkpoint.
+    checkpoint_dir = os.path.dirname(checkpoint_path)
+    if checkpoint_dir and not os.path.exists(checkpoint_dir):
+        os.makedirs(checkpoint_dir)
+    temp_path = checkpoint_path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(temp_path, checkpoint_path)
+
+def follow_batches(filename, inode, offset, poll_interval=1.0, max_batch_lines=10000):
+    # Yield (lines, inode, offset) every time complete new lines are available,
+    # at most max_batch_lines at a time, so a file far behind is caught up in steps:
+    #   lines:  the new lines, lowercased
+    #   inode:  the inode of the file the lines were read from
+    #   offset: the byte offset right after the last line
+    # The file is reopened when it is rotated (a new inode under the same name)
+    # and read from the start again when it is truncated.
+    f = None
+    try:
+        while True:
+            if f is None:
+                try:
+                    f = open(filename, "rb")
+                except FileNotFoundError:
+                    time.sleep(poll_interval)
+                    continue
+                current_inode = os.fstat(f.fileno()).st_ino
+                if current_inode != inode or os.fstat(f.fileno()).st_size < offset:
+                    inode = current_inode
+                    offset = 0
+                f.seek(offset)
+
+            lines = []
+            while len(lines) < max_batch_lines:
+                line = f.readline()
+                # An incomplete line at the end of the file is read again once it is finished.
+                if not line.endswith(b"\n"):
+                    f.seek(offset)
+                    break
+                offset += len(line)
+                lines.append(line.decode().lower())
+
+            if lines:
+                yield lines, inode, offset
+                continue
+
+            # Nothing new: check for rotation or truncation before waiting.
+            try:
+                stat = os.stat(filename)
+            except FileNotFoundError:
+                # Rotated away and not created again yet.
+                stat = None
+
+            if stat is not None and stat.st_ino != inode:
+                # Rotated: the old file has been read to the end, switch to the new one.
+                f.close()
+                f = None
+                inode = None
+                offset = 0
+                continue
+            if stat is not None and stat.st_size < offset:
+                # Truncated in place.
+                offset = 0
+                f.seek(0)
+                continue
+            time.sleep(poll_interval)
+    finally:
+        if f is not None:
+            f.close()
+
+def follow_year_resolver(filename, last_date):
+    # The YearResolver of the followed file, continuing after the event of last_date;
+    # anchored on today while the file does not exist yet.
+    try:
+        year_resolver = YearResolver.from_logfile(filename)
+    except FileNotFoundError:
+        year_resolver = YearResolver()
+    year_resolver.last_date = last_date
+    return year_resolver
+
+def follow_logfile(filename, checkpoint_path, bad_word_list, poll_interval=1.0, max_batches=None, max_batch_lines=10000):
+    # Follow the log file from the checkpoint, print every new event and save the
+    # checkpoint after each batch of lines.
+    # max_batches stops following after that many batches, e.g. to catch up and exit.
+    state = load_checkpoint(checkpoint_path)
+    neighbor_date_stat_dict = state["neighbor_date_stat_dict"]
+    neighbor_downtime_total_dict = state["neighbor_downtime_total_dict"]
+    interface_dict = state["interface_dict"]
+    year_resolver = follow_year_resolver(filename, state["last_date"])
+
+    print(f"Following {filename} from byte {state['offset']}\n")
+    print(f"Neighbor IP \t\t Interface \t Timestamp \t\t\t\t\t\t Status \t\t Downtime")
+    print(f"=" * 90)
+
+    batch_count = 0
+    try:
+        for lines, inode, offset in follow_batches(filename, state["inode"], state["offset"], poll_interval, max_batch_lines):
+            event_stream = ospf_event_stream(log_cleaner(lines, bad_word_list, ospf_allow_list), year_resolver=year_resolver)
+            for neighborIP, log, downtime in neighbor_stream_stat(event_stream, neighbor_date_stat_dict, state["start_time_dict"]):
+                interface = interface_dict.setdefault(neighborIP, log[3])
+                downtime_total = neighbor_downtime_total_dict.setdefault(neighborIP, [0, 0])
+                if downtime != 0:
+                    downtime_total[0] += 1
+                    downtime_total[1] += downtime // datetime.timedelta(microseconds=1)
+                stream_event_output(neighborIP, interface, log, downtime)
+
+            state["inode"] = inode
+            state["offset"] = offset
+            state["last_date"] = year_resolver.last_date
+            save_checkpoint(checkpoint_path, state)
+
+            batch_count += 1
+            if max_batches is not None and batch_count >= max_batches:
+                break
+    except KeyboardInterrupt:
+        pass
+
+    print(f"\n")
+    stream_summary_output(neighbor_date_stat_dict, interface_dict)
+    for neighborIP, (incident_count, downtime_us) in neighbor_downtime_total_dict.items():
+        print(f"{neighborIP} \t Incidents: {incident_count} \t Total downtime: {datetime.timedelta(microseconds=downtime_us)}")
+    return state
+
+def main():
+    parser = argparse.ArgumentParser(description="Follow a growing Junos or Cisco OSPF neighbor log")
+    parser.add_argument("filename", nargs="?", default="logfile.txt", help="log file to follow")
+    parser.add_argument("--checkpoint", default=os.path.join("log_result", "follow-checkpoint.json"),
+                        help="file to save the parser checkpoint in")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds to wait for new lines")
+    args = parser.parse_args()
+
+    bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+    follow_logfile(args.filename, args.checkpoint, bad_word_list, args.interval)
+
+if __name__ == '__main__':
+    main()
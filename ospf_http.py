@@ -0,0 +1,303 @@
+# Function:
+# A long-running mode keeping the per neighbor statistics in memory, updated event by
+# event from the syslog collector (ospf_syslog.py) and optionally preloaded from log
+# files, and serving them as JSON over a small local HTTP API for the NOC dashboard.
+#
+# Endpoints (GET):
+#   /status                     messages received and parsed, events, neighbors, version
+#   /neighbors                  every neighbor: hostname, interface, DOWN events, incidents, downtime
+#   /neighbors/<NeighborIP>     the same for one neighbor, with the DOWN events of every day
+#   /devices                    every device (hostname): neighbors, DOWN events, incidents, downtime
+#   /days                       the DOWN events of every day (UTC), all neighbors together
+#   /days/<YYYY-MM-DD>          the DOWN events of every neighbor on that day
+#   /top?n=10                   the neighbors with the most DOWN events
+#
+# The statistics are updated incrementally, and every response body is rendered at most
+# once per version of the statistics (the version goes up with each batch of events):
+# polling faster than the events arrive returns the cached bytes without any work.
+# Only the 200 responses of the known paths are cached, keyed on the normalized request
+# (e.g. ("top", 10) for /top?n=10 and /top/?n=010), so the cache holds at most one body
+# per path, neighbor, day and n, whatever the clients ask for.
+# The version is also the ETag, so a poll with If-None-Match gets a 304 without a body.
+# Usage:
+# python ospf_http.py [--port 8080] [--udp-port 514] [--tcp-port 514] [--preload logfile.txt ...]
+
+import json
+import asyncio
+import argparse
+import datetime
+import urllib.parse
+
+from junos_ospf_log import mmap_logfile_reader, ospf_event_stream, neighbor_stream_stat, YearResolver
+from ospf_syslog import SyslogCollector, start_collector
+
+one_microsecond = datetime.timedelta(microseconds=1)
+
+class LiveStat:
+
+    def __init__(self):
+        # {NeighborIP : {date : number of DOWN events}}, as neighbor_date_stat
+        self.neighbor_date_stat_dict = {}
+        # {NeighborIP : number of DOWN events}, as neighbor_date_total_stat
+        self.neighbor_date_total_stat_dict = {}
+        # {NeighborIP : start of the open incident}
+        self.start_time_dict = {}
+        # {NeighborIP : [number of incidents, total downtime in microseconds]}
+        self.neighbor_downtime_total_dict = {}
+        # {NeighborIP : (hostname, interface)} of the first event of the neighbor
+        self.neighbor_info_dict = {}
+        # {hostname : {"neighbors": set, "down_events": .., "incidents": .., "downtime_us": ..}}
+        self.device_dict = {}
+        # {date : number of DOWN events}
+        self.day_dict = {}
+        self.event_count = 0
+        self.version = 0
+        # {normalized request : (version, HTTP status, body bytes)}
+        self.response_cache = {}
+
+    def add_event(self, neighborIP, log, downtime):
+        # The on_event of SyslogCollector: neighbor_stream_stat has already counted the event
+        # into neighbor_date_stat_dict; the other statistics are updated here.
+        hostname, interface = self.neighbor_info_dict.setdefault(neighborIP, (log[2], log[3]))
+        device = self.device_dict.get(log[2])
+        if device is None:
+            device = self.device_dict[log[2]] = {"neighbors": set(), "down_events": 0, "incidents": 0, "downtime_us": 0}
+        device["neighbors"].add(neighborIP)
+        self.neighbor_date_total_stat_dict.setdefault(neighborIP, 0)
+        self.event_count += 1
+        if log[1] == "DOWN":
+            date = log[0].date()
+            self.day_dict[date] = self.day_dict.get(date, 0) + 1
+            self.neighbor_date_total_stat_dict[neighborIP] += 1
+            device["down_events"] += 1
+        if downtime != 0:
+            downtime_us = downtime // one_microsecond
+            downtime_total = self.neighbor_downtime_total_dict.setdefault(neighborIP, [0, 0])
+            downtime_total[0] += 1
+            downtime_total[1] += downtime_us
+            device["incidents"] += 1
+            device["downtime_us"] += downtime_us
+
+    def add_stream(self, event_stream):
+        # Count the events of an event stream, e.g. of a log file loaded at the start.
+        for neighborIP, log, downtime in neighbor_stream_stat(event_stream, self.neighbor_date_stat_dict,
+                                                              self.start_time_dict):
+            self.add_event(neighborIP, log, downtime)
+        self.version += 1
+
+    def neighbor_summary(self, neighborIP):
+        hostname, interface = self.neighbor_info_dict[neighborIP]
+        incident_count, downtime_us = self.neighbor_downtime_total_dict.get(neighborIP, (0, 0))
+        return {
+            "neighbor": neighborIP,
+            "hostname": hostname,
+            "interface": interface,
+            "down_events": self.neighbor_date_total_stat_dict[neighborIP],
+            "incidents": incident_count,
+            "downtime_seconds": downtime_us / 1e6,
+            "down": neighborIP in self.start_time_dict,
+        }
+
+    def request_key(self, path, query):
+        # Return the normalized request of a GET, the name of the path and its parameters
+        # (e.g. ("top", 10)), or None for an unknown path; raise ValueError for a bad parameter.
+        parts = [part for part in path.split("/") if part]
+        if parts in (["status"], ["neighbors"], ["devices"], ["days"]):
+            return (parts[0],)
+        if len(parts) == 2 and parts[0] == "neighbors":
+            return ("neighbors", parts[1])
+        if len(parts) == 2 and parts[0] == "days":
+            try:
+                return ("days", datetime.date.fromisoformat(parts[1]))
+            except ValueError:
+                raise ValueError(f"not a date: {parts[1]}") from None
+        if parts == ["top"]:
+            try:
+                n = int(query.get("n", ["10"])[0])
+            except ValueError:
+                raise ValueError("n must be a number") from None
+            return ("top", max(0, min(n, len(self.neighbor_date_total_stat_dict))))
+        return None
+
+    def render_key(self, key, status=None):
+        # Return (HTTP status, body object) of a normalized request.
+        if key == ("status",):
+            return 200, dict(status or {}, events=self.event_count, neighbors=len(self.neighbor_info_dict),
+                             version=self.version)
+        if key == ("neighbors",):
+            return 200, [self.neighbor_summary(neighborIP) for neighborIP in self.neighbor_info_dict]
+        if key[0] == "neighbors":
+            if key[1] not in self.neighbor_info_dict:
+                return 404, {"error": f"unknown neighbor {key[1]}"}
+            body = self.neighbor_summary(key[1])
+            body["days"] = {date.isoformat(): count for date, count in self.neighbor_date_stat_dict[key[1]].items()}
+            return 200, body
+        if key == ("devices",):
+            return 200, {hostname: {"neighbors": len(device["neighbors"]), "down_events": device["down_events"],
+                                    "incidents": device["incidents"], "downtime_seconds": device["downtime_us"] / 1e6}
+                         for hostname, device in self.device_dict.items()}
+        if key == ("days",):
+            return 200, {date.isoformat(): count for date, count in sorted(self.day_dict.items())}
+        if key[0] == "days":
+            return 200, {neighborIP: date_dict[key[1]] for neighborIP, date_dict in self.neighbor_date_stat_dict.items()
+                         if date_dict.get(key[1])}
+        neighbor_list = sorted(self.neighbor_date_total_stat_dict.items(), key=lambda item: (-item[1], item[0]))
+        return 200, [self.neighbor_summary(neighborIP) for neighborIP, count in neighbor_list[:key[1]]]
+
+    def render(self, path, query, status=None):
+        # Return (HTTP status, body object) of a GET request.
+        try:
+            key = self.request_key(path, query)
+        except ValueError as error:
+            return 400, {"error": str(error)}
+        if key is None:
+            return 404, {"error": f"unknown path {path}"}
+        return self.render_key(key, status)
+
+    def cacheable(self, key):
+        # /status is always rendered, as its counters move with every message; a day
+        # without events is not kept, or every date asked for would stay in the cache.
+        if key[0] == "status":
+            return False
+        return not (key[0] == "days" and len(key) == 2 and key[1] not in self.day_dict)
+
+    def response(self, target, status=None):
+        # Return (HTTP status, body bytes) of a request target, from the cache while the
+        # statistics have not changed.
+        url = urllib.parse.urlsplit(target)
+        try:
+            key = self.request_key(url.path, urllib.parse.parse_qs(url.query))
+        except ValueError as error:
+            return 400, json.dumps({"error": str(error)}).encode()
+        if key is None:
+            return 404, json.dumps({"error": f"unknown path {url.path}"}).encode()
+        cached = self.response_cache.get(key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1], cached[2]
+        code, body = self.render_key(key, status)
+        body = json.dumps(body).encode()
+        if code == 200 and self.cacheable(key):
+            self.response_cache[key] = (self.version, code, body)
+        return code, body
+
+reason_dict = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+async def read_http_request(reader):
+    # Return (request line, {header name : value}) of the next request, None at the end
+    # of the connection. The bytes are decoded as latin-1, which never fails: a target
+    # that is not UTF-8 is only a path that is not found.
+    # A line over the limit of the stream reader raises ValueError.
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    header_dict = {}
+    while True:
+        header = await reader.readline()
+        if header in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = header.decode("latin-1").partition(":")
+        header_dict[name.strip().lower()] = value.strip()
+    return request_line.decode("latin-1"), header_dict
+
+async def handle_http_client(live_stat, collector, reader, writer):
+    # A minimal HTTP/1.1 server: GET only, keep-alive, no request bodies. A request that
+    # cannot be read (a line too long, not "method target version") gets a 400 and the
+    # connection is closed.
+    try:
+        while True:
+            etag = f'"{live_stat.version}"'
+            try:
+                request = await read_http_request(reader)
+                if request is None:
+                    break
+                method, target, version = request[0].split()
+            except ValueError:
+                body = b'{"error": "bad request"}'
+                writer.write(f"HTTP/1.1 400 {reason_dict[400]}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+                await writer.drain()
+                break
+            header_dict = request[1]
+            if method != "GET":
+                code, body = 405, b'{"error": "GET only"}'
+            elif header_dict.get("if-none-match") == etag and not target.startswith("/status"):
+                code, body = 304, b""
+            else:
+                status = None if collector is None else {
+                    "received": collector.received, "processed": collector.processed,
+                    "parsed": collector.parse_stat.get("parsed", 0)}
+                code, body = live_stat.response(target, status)
+
+            keep_alive = version == "HTTP/1.1" and header_dict.get("connection", "").lower() != "close"
+            head = (f"HTTP/1.1 {code} {reason_dict[code]}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\nETag: {etag}\r\n"
+                    f"Cache-Control: no-cache\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+            writer.write(head.encode() + body)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+class LiveCollector(SyslogCollector):
+    # The syslog collector feeding a LiveStat, with a new version of the statistics
+    # after every batch of messages, also a batch that failed half way: its events
+    # already counted must not be hidden behind the cached responses.
+
+    def __init__(self, live_stat, **kwargs):
+        super().__init__(on_event=live_stat.add_event, **kwargs)
+        self.live_stat = live_stat
+        # Share the statistics, so neighbor_stream_stat updates the LiveStat directly.
+        self.neighbor_date_stat_dict = live_stat.neighbor_date_stat_dict
+        self.start_time_dict = live_stat.start_time_dict
+
+    def process_batch(self, batch):
+        try:
+            super().process_batch(batch)
+        finally:
+            self.live_stat.version += 1
+
+async def start_http_server(live_stat, collector=None, host="127.0.0.1", port=8080):
+    return await asyncio.start_server(
+        lambda reader, writer: handle_http_client(live_stat, collector, reader, writer), host, port)
+
+async def serve(args, bad_word_list):
+    live_stat = LiveStat()
+    for filename in args.preload:
+        live_stat.add_stream(ospf_event_stream(mmap_logfile_reader(filename, bad_word_list), hostname=args.hostname,
+                                               year_resolver=YearResolver.from_logfile(filename)))
+    collector = LiveCollector(live_stat)
+    udp_receiver, tcp_server, parser_task = await start_collector(collector, args.syslog_host, args.udp_port, args.tcp_port)
+    http_server = await start_http_server(live_stat, collector, args.host, args.port)
+    print(f"Serving http://{args.host}:{args.port}/ (syslog on UDP {args.udp_port}, TCP {args.tcp_port})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        parser_task.cancel()
+        http_server.close()
+        if udp_receiver is not None:
+            udp_receiver.close()
+        if tcp_server is not None:
+            tcp_server.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the live OSPF neighbor statistics as JSON")
+    parser.add_argument("--host", default="127.0.0.1", help="address of the HTTP API")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--syslog-host", default="0.0.0.0", help="address to listen for syslog on")
+    parser.add_argument("--udp-port", type=int, default=514)
+    parser.add_argument("--tcp-port", type=int, default=514)
+    parser.add_argument("--preload", nargs="*", default=[], help="log files to load at the start")
+    parser.add_argument("--hostname", help="device of the preloaded files, for the log formats without the hostname in the line (Cisco)")
+    args = parser.parse_args()
+
+    bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+    try:
+        asyncio.run(serve(args, bad_word_list))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+# Function:
+# An index of the downtime incidents (every DOWN event with the first UP event after it,
+# as in neighbor_downtime_stat) to answer time questions without scanning every event:
+#   at(time):                   the neighbors down at that time
+#   window(start, end):         the incidents overlapping [start, end)
+#   overlap_pairs(a, b):        the incidents of a overlapping an incident of b, where a and b
+#                               are neighbor IPs or interfaces, e.g. vlan.511 and vlan.513
+#   correlated_outages():       the groups of incidents of several neighbors down at the same
+#                               time, e.g. the Jan 7 20:49 flap of vlan.511 and vlan.513
+#
+# The incidents are sorted by start time, and kept as an implicit balanced search tree
+# over that order: the node of the range [low, high) is its middle incident, and
+# max_end_array holds the latest end of the incidents of every subtree. A query only
+# walks down the subtrees that can overlap it, so it takes O(log n + k) for k results.
+# overlap_pairs only searches from the incidents of a, found in key_index_dict.
+# An incident still open at the end of the log has no end: it overlaps every time after its start.
+# An incident of no length (the UP logged in the same microsecond as the DOWN) is taken as
+# down for that microsecond, so the queries still find it.
+# Usage:
+# python ospf_incident_index.py [logfile] [--hostname HOST] [--at "2019-01-07 20:49:30 +0700"]
+#                               [--window START END] [--overlap vlan.511 vlan.513] [--tolerance 0]
+
+import array
+import argparse
+import datetime
+import collections
+
+from junos_ospf_log import (mmap_logfile_reader, junos_ospf_event_store, format_localtime, location_determinator,
+                            YearResolver)
+from ospf_event_store import OspfEventStore, EventStatus, time_to_epoch_us, epoch_us_to_time
+
+# The end of an open incident, in epoch microseconds.
+open_end_us = 2 ** 63 - 1
+
+# start and end are UTC datetimes; end is None for an incident still open at the end of the log.
+Incident = collections.namedtuple("Incident", ["neighbor", "hostname", "interface", "start", "end"])
+
+def store_incident_list(store):
+    # The incidents of an OspfEventStore: [(start us, end us, neighborIP, hostname, interface)]
+    incident_list = []
+    down = EventStatus.DOWN
+    up = EventStatus.UP
+    for neighborIP, events in store.items():
+        start = None
+        for index, (timestamp_us, status_code) in enumerate(zip(events.timestamp_array, events.status_array)):
+            if status_code == down:
+                start = index
+            elif status_code == up and start is not None:
+                incident_list.append(store_incident(store, neighborIP, events, start, timestamp_us))
+                start = None
+        if start is not None:
+            incident_list.append(store_incident(store, neighborIP, events, start, open_end_us))
+    return incident_list
+
+def store_incident(store, neighborIP, events, index, end_us):
+    return (events.timestamp_array[index], end_us, neighborIP, store.hostname_list[events.hostname_array[index]],
+            store.interface_list[events.interface_array[index]])
+
+class IncidentIndex:
+
+    def __init__(self, incident_list):
+        # incident_list: [(start us, end us, neighborIP, hostname, interface)], in any order
+        incident_list = sorted(incident_list)
+        self.start_array = array.array("q", (incident[0] for incident in incident_list))
+        self.end_array = array.array("q", (incident[1] for incident in incident_list))
+        self.neighbor_list = [incident[2] for incident in incident_list]
+        self.hostname_list = [incident[3] for incident in incident_list]
+        self.interface_list = [incident[4] for incident in incident_list]
+        # {NeighborIP or interface : [indexes of its incidents]}
+        self.key_index_dict = {}
+        for index, incident in enumerate(incident_list):
+            self.key_index_dict.setdefault(incident[2], []).append(index)
+            if incident[4] != incident[2]:
+                self.key_index_dict.setdefault(incident[4], []).append(index)
+        self.max_end_array = array.array("q", self.end_array)
+        self.build(0, len(self.start_array))
+
+    @classmethod
+    def from_log_dict(cls, log_dict):
+        # From a log_dict of junos_ospf_log_reader or an OspfEventStore.
+        if not isinstance(log_dict, OspfEventStore):
+            log_dict = OspfEventStore.from_log_dict(log_dict)
+        return cls(store_incident_list(log_dict))
+
+    def covered_end_us(self, index):
+        # The end of the time the incident covers: a microsecond past the start for one of no length.
+        return max(self.end_array[index], self.start_array[index] + 1)
+
+    def build(self, low, high):
+        # Set max_end_array[middle] to the latest end of the subtree [low, high); return it.
+        if low >= high:
+            return -1
+        middle = (low + high) // 2
+        max_end = max(self.covered_end_us(middle), self.build(low, middle), self.build(middle + 1, high))
+        self.max_end_array[middle] = max_end
+        return max_end
+
+    def __len__(self):
+        return len(self.start_array)
+
+    def incident(self, index):
+        end_us = self.end_array[index]
+        return Incident(self.neighbor_list[index], self.hostname_list[index], self.interface_list[index],
+                        epoch_us_to_time(self.start_array[index]),
+                        None if end_us == open_end_us else epoch_us_to_time(end_us))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.incident(index)
+
+    def search_us(self, start_us, end_us):
+        # The indexes of the incidents overlapping [start_us, end_us), in start order.
+        result = []
+        # The [low, high) subtrees still to visit.
+        stack = [(0, len(self))]
+        while stack:
+            low, high = stack.pop()
+            if low >= high:
+                continue
+            middle = (low + high) // 2
+            # Nothing in the subtree ends after the start of the query.
+            if self.max_end_array[middle] <= start_us:
+                continue
+            stack.append((low, middle))
+            # The right subtree starts no earlier than the node.
+            if self.start_array[middle] < end_us:
+                if self.covered_end_us(middle) > start_us:
+                    result.append(middle)
+                stack.append((middle + 1, high))
+        result.sort()
+        return result
+
+    def window(self, start, end):
+        # The incidents overlapping [start, end), in start order.
+        return [self.incident(index) for index in self.search_us(time_to_epoch_us(start), time_to_epoch_us(end))]
+
+    def at(self, timestamp):
+        # The incidents in progress at timestamp: started at or before it and not yet ended.
+        timestamp_us = time_to_epoch_us(timestamp)
+        return [self.incident(index) for index in self.search_us(timestamp_us, timestamp_us + 1)]
+
+    def overlap_pairs(self, key_a, key_b):
+        # The pairs (incident of a, incident of b) that overlap in time, where a and b are
+        # neighbor IPs or interfaces.
+        pairs = []
+        index_set_b = set(self.key_index_dict.get(key_b, ()))
+        for index in self.key_index_dict.get(key_a, ()):
+            for other in self.search_us(self.start_array[index], self.covered_end_us(index)):
+                if other != index and other in index_set_b:
+                    pairs.append((self.incident(index), self.incident(other)))
+        return pairs
+
+    def correlated_outages(self, tolerance=datetime.timedelta(0)):
+        # The groups of incidents of more than one neighbor that overlap, or start within
+        # tolerance of the end of the group so far: [[Incident, ...], ...] in start order.
+        tolerance_us = tolerance // datetime.timedelta(microseconds=1)
+        group_list = []
+        group = []
+        group_end = None
+        for index in range(len(self)):
+            if group and self.start_array[index] > group_end + tolerance_us:
+                group_list.append(group)
+                group = []
+            if not group:
+                group_end = self.end_array[index]
+            group.append(index)
+            group_end = max(group_end, self.end_array[index])
+        if group:
+            group_list.append(group)
+        return [[self.incident(index) for index in group] for group in group_list
+                if len({self.neighbor_list[index] for index in group}) > 1]
+
+def format_incident(incident):
+    location = location_determinator(incident.hostname)
+    end = "still down" if incident.end is None else format_localtime(incident.end, location)
+    downtime = "" if incident.end is None else str(incident.end - incident.start)
+    return (f"{incident.neighbor} \t {incident.interface} \t {incident.hostname} \t "
+            f"{format_localtime(incident.start, location)} \t {end} \t {downtime}")
+
+def correlated_outage_report(index, tolerance=datetime.timedelta(0)):
+    # The lines of the correlated outage report.
+    lines = [f"Correlated outages (tolerance {tolerance})", f"=" * 90]
+    for number, group in enumerate(index.correlated_outages(tolerance), 1):
+        start = min(incident.start for incident in group)
+        lines.append(f"#{number}: {len(group)} incidents, {len({incident.neighbor for incident in group})} neighbors, "
+                     f"from {format_localtime(start, location_determinator(group[0].hostname))}")
+        lines.extend(f"  {format_incident(incident)}" for incident in group)
+        lines.append("")
+    return lines
+
+def parse_time(time_str):
+    # e.g. "2019-01-07 20:49:30 +0700"; UTC without an offset.
+    for time_format in ("%Y-%m-%d %H:%M:%S.%f %z", "%Y-%m-%d %H:%M:%S %z", "%Y-%m-%d %H:%M %z"):
+        try:
+            return datetime.datetime.strptime(time_str, time_format)
+        except ValueError:
+            pass
+    return datetime.datetime.fromisoformat(time_str).replace(tzinfo=datetime.timezone.utc)
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the OSPF neighbor downtime incidents by time")
+    parser.add_argument("filename", nargs="?", default="logfile.txt", help="log file collected from the device")
+    parser.add_argument("--hostname", help="device of the log file, for the log formats without the hostname in the line (Cisco)")
+    parser.add_argument("--at", type=parse_time, help='the neighbors down at this time, e.g. "2019-01-07 20:49:30 +0700"')
+    parser.add_argument("--window", type=parse_time, nargs=2, metavar=("START", "END"), help="the incidents in this window")
+    parser.add_argument("--overlap", nargs=2, metavar=("A", "B"), help="the overlapping incidents of two neighbor IPs or interfaces")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="seconds between incidents still taken as one correlated outage")
+    args = parser.parse_args()
+
+    bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+    store = junos_ospf_event_store(mmap_logfile_reader(args.filename, bad_word_list), hostname=args.hostname,
+                                   year_resolver=YearResolver.from_logfile(args.filename))
+    index = IncidentIndex.from_log_dict(store)
+
+    if args.at is not None:
+        print(f"Down at {args.at}:")
+        for incident in index.at(args.at):
+            print(format_incident(incident))
+    elif args.window is not None:
+        print(f"Incidents from {args.window[0]} to {args.window[1]}:")
+        for incident in index.window(*args.window):
+            print(format_incident(incident))
+    elif args.overlap is not None:
+        print(f"Overlapping incidents of {args.overlap[0]} and {args.overlap[1]}:")
+        for incident_a, incident_b in index.overlap_pairs(*args.overlap):
+            print(format_incident(incident_a))
+            print(format_incident(incident_b))
+            print()
+    else:
+        for line in correlated_outage_report(index, datetime.timedelta(seconds=args.tolerance)):
+            print(line)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# Function:
+# To merge the event streams of many devices into one global timeline, e.g. to see which
+# device flapped first in a fleet-wide outage, instead of concatenating the captures.
+#
+# Every stream is already in time order (the events of a log file come in the order of
+# its lines), so they are merged with a heap (heapq.merge): only the next event of each
+# stream is held, and the memory depends on the number of streams, not the number of events.
+# Events of the same time keep the order of the streams given.
+#
+#   merge_event_streams:    the k-way merge of (NeighborIP, log_item) streams
+#   log_dict_event_stream:  the events of a log_dict (or OspfEventStore) as one stream, by
+#                           merging the time ordered events of its neighbors
+#   fleet_timeline:         the downtime of every UP event of the merged stream, per device and neighbor
+#   flap_cascades:          the DOWN events of several devices following each other within
+#                           a window, the first one being what flapped first
+# Usage:
+# python ospf_merge.py logs/ [more directories, files or "logs/*.txt"] [--window 60] [--timeline]
+
+import heapq
+import argparse
+import datetime
+
+from junos_ospf_log import (mmap_logfile_reader, ospf_event_stream, format_localtime, location_determinator,
+                            YearResolver)
+from ospf_batch import expand_paths, file_hostname
+
+def event_time(event):
+    # event: (NeighborIP, [timestamp,status,hostname,interface])
+    return event[1][0]
+
+def order_checked(event_stream, merge_stat):
+    # Count the events going back in time in merge_stat["out_of_order"]: the merge still
+    # yields them, but no longer in time order.
+    last_time = None
+    for event in event_stream:
+        timestamp = event[1][0]
+        if last_time is not None and timestamp < last_time:
+            merge_stat["out_of_order"] += 1
+        else:
+            last_time = timestamp
+        yield event
+
+def merge_event_streams(event_stream_list, merge_stat=None):
+    # Yield the events of the time ordered streams in time order.
+    if merge_stat is not None:
+        merge_stat.setdefault("out_of_order", 0)
+        event_stream_list = [order_checked(event_stream, merge_stat) for event_stream in event_stream_list]
+    return heapq.merge(*event_stream_list, key=event_time)
+
+def neighbor_event_stream(neighborIP, log_items):
+    for log_item in log_items:
+        yield neighborIP, log_item
+
+def log_dict_event_stream(log_dict):
+    # The events of every neighbor of a log_dict in time order, as ospf_event_stream yields them.
+    return heapq.merge(*(neighbor_event_stream(neighborIP, log_items) for neighborIP, log_items in log_dict.items()),
+                       key=event_time)
+
+def logfile_event_stream(filename, bad_word_list):
+    # The event stream of a log file; the lines without a hostname (Cisco) are taken as
+    # logged by the device named after the file, as in ospf_batch.py.
+    return ospf_event_stream(mmap_logfile_reader(filename, bad_word_list), hostname=file_hostname(filename),
+                             year_resolver=YearResolver.from_logfile(filename))
+
+def fleet_timeline(event_stream):
+    # Yield (NeighborIP, log_item, downtime) as neighbor_stream_stat, but with the incidents
+    # kept per (hostname, NeighborIP): two devices may see the same neighbor IP.
+    start_time_dict = {}
+    for neighborIP, log_item in event_stream:
+        key = (log_item[2], neighborIP)
+        downtime = 0
+        if log_item[1] == "DOWN":
+            start_time_dict[key] = log_item[0]
+        elif key in start_time_dict:
+            downtime = log_item[0] - start_time_dict.pop(key)
+        yield neighborIP, log_item, downtime
+
+def flap_cascades(event_stream, window=datetime.timedelta(seconds=60), min_devices=2):
+    # Yield the groups of DOWN events where each one follows the one before it within
+    # window, and at least min_devices devices (hostnames) went down: [(NeighborIP, log_item)].
+    group = []
+    for neighborIP, log_item in event_stream:
+        if log_item[1] != "DOWN":
+            continue
+        if group and log_item[0] - group[-1][1][0] > window:
+            if len({log[2] for ip, log in group}) >= min_devices:
+                yield group
+            group = []
+        group.append((neighborIP, log_item))
+    if group and len({log[2] for ip, log in group}) >= min_devices:
+        yield group
+
+def cascade_report_lines(cascade_list):
+    lines = []
+    for number, cascade in enumerate(cascade_list, 1):
+        first_ip, first_log = cascade[0]
+        hostname_list = list(dict.fromkeys(log[2] for ip, log in cascade))
+        lines.append(f"#{number}: {len(cascade)} DOWN events on {len(hostname_list)} devices "
+                     f"({', '.join(hostname_list)}), first {first_log[2]} {first_ip} {first_log[3]} "
+                     f"at {format_localtime(first_log[0], location_determinator(first_log[2]))}")
+        lines.append(f"=" * 90)
+        for neighborIP, log in cascade:
+            lines.append(f"+{log[0] - first_log[0]} \t {log[2]} \t {neighborIP} \t {log[3]}")
+        lines.append("")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the OSPF neighbor logs of many devices into one timeline")
+    parser.add_argument("paths", nargs="+", help="log files, directories or glob patterns")
+    parser.add_argument("--window", type=float, default=60.0,
+                        help="seconds between the DOWN events of one cascade")
+    parser.add_argument("--min-devices", type=int, default=2, help="devices a cascade goes down on")
+    parser.add_argument("--timeline", action="store_true", help="print every event of the merged timeline")
+    args = parser.parse_args()
+
+    bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+    merge_stat = {}
+    merged = merge_event_streams([logfile_event_stream(filename, bad_word_list)
+                                  for filename in expand_paths(args.paths)], merge_stat)
+
+    if args.timeline:
+        print(f"Hostname \t\t Neighbor IP \t\t Interface \t Timestamp \t\t\t\t\t\t Status \t\t Downtime")
+        print(f"=" * 90)
+        for neighborIP, log, downtime in fleet_timeline(merged):
+            timestamp = format_localtime(log[0], location_determinator(log[2]))
+            line = f"{log[2]} \t {neighborIP} \t {log[3]} \t {timestamp} \t\t\t {log[1]}"
+            print(line if downtime == 0 else f"{line}  \t\t\t ({downtime})")
+    else:
+        window = datetime.timedelta(seconds=args.window)
+        for line in cascade_report_lines(flap_cascades(merged, window, args.min_devices)):
+            print(line)
+    if merge_stat["out_of_order"]:
+        print(f"Events out of time order in their file: {merge_stat['out_of_order']}")
+
+if __name__ == '__main__':
+    main()
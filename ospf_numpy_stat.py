@@ -0,0 +1,77 @@
+# Function:
+# Optional NumPy backend of neighbor_date_stat and neighbor_downtime_stat.
+# The timestamps and status codes of each neighbor are taken as arrays straight from
+# the OspfEventStore, and the statistics are computed without looping over the events:
+#   Daily DOWN count:   bincount over the UTC day index of the events
+#   Downtime:           the first UP event after a DOWN event is paired with the last DOWN before it
+# The results are the same as the pure-Python functions in junos_ospf_log.py.
+
+import array
+import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from ospf_event_store import EventStatus, epoch_date, microseconds_per_day, no_downtime
+
+def numpy_available():
+    return np is not None
+
+def neighbor_arrays(events):
+    # Zero-copy NumPy views of the timestamp and status arrays of a neighbor.
+    timestamps = np.frombuffer(events.timestamp_array, dtype=np.int64)
+    status_codes = np.frombuffer(events.status_array, dtype=np.uint8)
+    return timestamps, status_codes
+
+def daily_down_count(timestamps, status_codes):
+    # Return (days, counts): the UTC day index of every day with an event,
+    # in the order of their first event, and the number of DOWN events of that day.
+    days = timestamps // microseconds_per_day
+    unique_days, first_index, day_index = np.unique(days, return_index=True, return_inverse=True)
+    counts = np.bincount(day_index, weights=(status_codes == EventStatus.DOWN), minlength=len(unique_days))
+
+    order = np.argsort(first_index, kind="stable")
+    return unique_days[order], counts[order].astype(np.int64)
+
+def incident_downtime(timestamps, status_codes):
+    # Return (downtime, paired):
+    #   paired:     the UP events closing an incident: a DOWN event since the previous UP event
+    #   downtime:   for the paired UP events, UP timestamp - timestamp of the last DOWN before it,
+    #               in microseconds; 0 for every other event
+    is_down = status_codes == EventStatus.DOWN
+    is_up = status_codes == EventStatus.UP
+
+    index = np.arange(len(timestamps))
+    last_down_index = np.maximum.accumulate(np.where(is_down, index, -1)) if len(index) else index
+    last_up_index = np.maximum.accumulate(np.where(is_up, index, -1)) if len(index) else index
+    previous_up_index = np.concatenate(([-1], last_up_index[:-1]))
+
+    downtime = np.zeros(len(timestamps), dtype=np.int64)
+    paired = is_up & (last_down_index > previous_up_index)
+    downtime[paired] = timestamps[paired] - timestamps[last_down_index[paired]]
+    return downtime, paired
+
+def numpy_date_stat(store):
+    # Same result as neighbor_date_stat: {NeighborIP : {date : number of DOWN events}}
+    neighbor_date_stat_dict = {}
+    for neighborIP, events in store.items():
+        days, counts = daily_down_count(*neighbor_arrays(events))
+        neighbor_date_stat_dict[neighborIP] = {
+            epoch_date + datetime.timedelta(days=int(day)): int(count) for day, count in zip(days, counts)
+        }
+    return neighbor_date_stat_dict
+
+def numpy_downtime_stat(store):
+    # Same result as neighbor_downtime_stat on an OspfEventStore:
+    # {NeighborIP : array of the downtime of every event in microseconds, no_downtime if none}
+    # The array is filled in one vectorized pass and handed over as an array.array,
+    # which the reports index per event (see event_downtime).
+    neighbor_downtime_stat_dict = {}
+    for neighborIP, events in store.items():
+        timestamps, status_codes = neighbor_arrays(events)
+        downtime, paired = incident_downtime(timestamps, status_codes)
+        downtime[~paired] = no_downtime
+        neighbor_downtime_stat_dict[neighborIP] = array.array("q", downtime.tobytes())
+    return neighbor_downtime_stat_dict
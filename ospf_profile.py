@@ -0,0 +1,150 @@
+# Function:
+# Optional instrumentation of the pipeline stages of junos_ospf_log.py, to see whether
+# reading, cleaning, timestamp conversion, parsing, statistics or report writing is slow.
+#
+# For every stage the profile records:
+#   wall:       seconds spent in the stage itself. The stages are lazy generators feeding
+#               each other, so the time spent in a nested stage (e.g. reading, while the
+#               cleaner asks for its next line) is not counted in the outer stage.
+#   lines_in:   lines the stage was given (the lines_out of the stage feeding it; for
+#               read, every line of the file scanned for the OSPF markers)
+#   lines_out:  lines (or events) the stage produced
+#   peak_rss:   peak resident set size of the process and its workers so far, in KB
+#               (None where the resource module is not available, e.g. Windows)
+
+import os
+import time
+import datetime
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KB on Linux.
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+# The display order of the stages of junos_ospf_log.py.
+pipeline_stage_list = ["read", "log_cleaner", "timestamp", "parse", "neighbor_date_stat",
+                       "neighbor_date_total_stat", "neighbor_downtime_stat", "report_output"]
+
+class PipelineProfile:
+
+    def __init__(self):
+        # {stage : {"wall": seconds, "lines_in": count, "lines_out": count, "peak_rss": KB}},
+        # in the order first entered; the counts are None for the stages that do not count lines.
+        self.stage_dict = {}
+        # [stage, start time] of the stages being run, innermost last.
+        self.stack = []
+        self.start_time = time.perf_counter()
+
+    def record(self, name):
+        stage = self.stage_dict.get(name)
+        if stage is None:
+            stage = self.stage_dict[name] = {"wall": 0.0, "lines_in": None, "lines_out": None, "peak_rss": None}
+        return stage
+
+    def count(self, name, lines_in=None, lines_out=None):
+        # Set the line counts of a stage that does not count them itself.
+        stage = self.record(name)
+        stage["lines_in"] = lines_in
+        stage["lines_out"] = lines_out
+
+    def enter(self, name):
+        now = time.perf_counter()
+        # Pause the enclosing stage.
+        if self.stack:
+            outer = self.stack[-1]
+            self.record(outer[0])["wall"] += now - outer[1]
+        self.record(name)
+        self.stack.append([name, now])
+
+    def exit(self):
+        now = time.perf_counter()
+        name, start = self.stack.pop()
+        self.record(name)["wall"] += now - start
+        # Resume the enclosing stage.
+        if self.stack:
+            self.stack[-1][1] = now
+
+    def stage_iter(self, name, iterable, upstream=None):
+        # Pass the items of a lazy stage through, timing every step and counting the items.
+        # upstream is the stage feeding this one, whose output is the input of this one.
+        iterator = iter(iterable)
+        stage = self.record(name)
+        stage["lines_out"] = stage["lines_out"] or 0
+        while True:
+            self.enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.exit()
+                stage["peak_rss"] = peak_rss_kb()
+                if upstream is not None:
+                    stage["lines_in"] = self.stage_dict[upstream]["lines_out"]
+                return
+            self.exit()
+            stage["lines_out"] += 1
+            yield item
+
+    def timed(self, name, function):
+        # Return function wrapped so that the time spent in it is counted as a stage,
+        # e.g. the timestamp conversion called from within the parser.
+        stage = self.record(name)
+        stage["lines_out"] = stage["lines_out"] or 0
+
+        def timed_function(*args):
+            self.enter(name)
+            try:
+                return function(*args)
+            finally:
+                self.exit()
+                stage["lines_out"] += 1
+        return timed_function
+
+    def run(self, name, function, *args):
+        # Run a stage that is not lazy, e.g. a statistics function or a report.
+        self.enter(name)
+        try:
+            return function(*args)
+        finally:
+            self.exit()
+            self.record(name)["peak_rss"] = peak_rss_kb()
+
+    def summary_lines(self, parse_stat):
+        # The one-screen summary: one line per stage, then the lines dropped on the way.
+        # The stages of the pipeline come first, in pipeline order.
+        def display_order(name):
+            return pipeline_stage_list.index(name) if name in pipeline_stage_list else len(pipeline_stage_list)
+
+        def count(value):
+            return "-" if value is None else f"{value:,}"
+
+        lines = [f"{'Stage':<24} {'Wall (s)':>10} {'Lines in':>12} {'Lines out':>12} {'Peak RSS (MB)':>14}", "=" * 76]
+        for name in sorted(self.stage_dict, key=display_order):
+            stage = self.stage_dict[name]
+            peak_rss = "-" if stage["peak_rss"] is None else f"{stage['peak_rss'] / 1024:.1f}"
+            lines.append(f"{name:<24} {stage['wall']:>10.3f} {count(stage['lines_in']):>12} "
+                         f"{count(stage['lines_out']):>12} {peak_rss:>14}")
+        lines.append("-" * 76)
+        lines.append(f"{'total':<24} {time.perf_counter() - self.start_time:>10.3f}")
+
+        read_stage = self.stage_dict.get("read")
+        if read_stage is not None and read_stage["lines_in"] is not None:
+            lines.append(f"Lines dropped by the marker scan: {read_stage['lines_in'] - read_stage['lines_out']:,}")
+        if "read" in self.stage_dict and "log_cleaner" in self.stage_dict:
+            dropped = self.stage_dict["read"]["lines_out"] - self.stage_dict["log_cleaner"]["lines_out"]
+            lines.append(f"Lines dropped by log_cleaner: {dropped:,}")
+        lines.append(f"Unparseable lines: {parse_stat.get('unparsed', 0):,}")
+        lines.append(f"Lines neither UP nor DOWN: {parse_stat.get('skipped', 0):,}")
+        lines.append(f"Events: {parse_stat.get('parsed', 0):,}")
+        return lines
+
+def profile_dump_path(output_path="log_result"):
+    if not os.path.exists(output_path):
+        os.makedirs(output_path)
+    return os.path.join(output_path, f"ospf-profile-{datetime.datetime.now():%Y%m%d-%H%M%S}.prof")
@@ -0,0 +1,286 @@
+# Function:
+# Approximate statistics of the OSPF neighbor events in fixed memory, for logs of whole
+# fleets over long periods, where keeping every event per neighbor (log_dict) does not fit.
+# The events are read as a stream and only these sketches are kept:
+#   Count-Min:      the DOWN events per (neighbor, UTC day), per neighbor, and the downtime
+#                   per neighbor
+#   Space-Saving:   the top-K neighbors with the most DOWN events (heavy hitters)
+#   t-digest:       the downtime of all the incidents, for its percentiles
+# Besides them, only the set of days, the start of the incidents still open (one per
+# neighbor currently down) and the interface of the top-K neighbors are kept.
+#
+# date_stat and total_stat return the dicts of neighbor_date_stat and
+# neighbor_date_total_stat for the top-K neighbors, so the same daily and total report
+# can be written from them.
+#
+# Error bounds (N is the number of DOWN events, or the total downtime, added to the sketch):
+#   Count-Min with width w and depth d: a count is never underestimated, and is
+#       overestimated by more than e/w * N with a probability of at most e^-d.
+#       The defaults (w = 8192, d = 5) give at most 0.033% of N, except with a 0.7% chance.
+#   Space-Saving with capacity m: every neighbor with more than N/m DOWN events is in the
+#       top-K, and its count is overestimated by at most its reported error (<= N/m).
+#   t-digest with compression c: at most about c centroids. The percentiles are exact at
+#       the minimum and maximum; elsewhere the rank error is about 1/c at the median and
+#       smaller towards the tails (with the default c = 100, within 1% of the rank).
+# Usage:
+# python ospf_sketch.py logfile.txt [more files] [--top 20] [--width 8192] [--depth 5] [--compression 100]
+
+import math
+import array
+import heapq
+import hashlib
+import argparse
+import datetime
+
+from junos_ospf_log import mmap_logfile_reader, ospf_event_stream, YearResolver
+
+one_microsecond = datetime.timedelta(microseconds=1)
+
+class CountMinSketch:
+
+    def __init__(self, width=8192, depth=5, seed=0):
+        self.width = width
+        self.depth = depth
+        self.seed = seed.to_bytes(8, "little")
+        self.total = 0
+        self.row_list = [array.array("q", bytes(8 * width)) for _ in range(depth)]
+
+    @classmethod
+    def from_error(cls, epsilon, delta, seed=0):
+        # The sketch overestimating by at most epsilon * N with a probability of at least 1 - delta.
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)), seed)
+
+    def columns(self, key):
+        # One 64-bit hash per row, all from one BLAKE2 digest of the key.
+        digest = hashlib.blake2b(key.encode(), digest_size=8 * self.depth, salt=self.seed).digest()
+        return [int.from_bytes(digest[8 * row:8 * row + 8], "little") % self.width for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        self.total += count
+        for row, column in zip(self.row_list, self.columns(key)):
+            row[column] += count
+
+    def estimate(self, key):
+        return min(row[column] for row, column in zip(self.row_list, self.columns(key)))
+
+    def error_bound(self):
+        # The overestimate not exceeded with a probability of 1 - e^-depth.
+        return math.e / self.width * self.total
+
+class SpaceSaving:
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.total = 0
+        # {key : [count, error]}
+        self.counter_dict = {}
+        # (count, key) of the counters; entries of a counter counted since then are stale.
+        self.heap = []
+
+    def add(self, key, count=1):
+        # Count the key; return the key it replaced, if any.
+        self.total += count
+        counter = self.counter_dict.get(key)
+        evicted = None
+        if counter is not None:
+            counter[0] += count
+        elif len(self.counter_dict) < self.capacity:
+            counter = self.counter_dict[key] = [count, 0]
+        else:
+            # Replace the smallest counter, taking over its count as the error.
+            while True:
+                min_count, evicted = heapq.heappop(self.heap)
+                if self.counter_dict.get(evicted, (None,))[0] == min_count:
+                    break
+            del self.counter_dict[evicted]
+            counter = self.counter_dict[key] = [min_count + count, min_count]
+        heapq.heappush(self.heap, (counter[0], key))
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(counter[0], key) for key, counter in self.counter_dict.items()]
+            heapq.heapify(self.heap)
+        return evicted
+
+    def top(self, k=None):
+        # [(key, count, error)], the largest count first; the true count is within [count - error, count].
+        counter_list = sorted(self.counter_dict.items(), key=lambda item: (-item[1][0], item[0]))
+        return [(key, count, error) for key, (count, error) in counter_list[:k]]
+
+class TDigest:
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        # [[mean, weight]] sorted by mean
+        self.centroid_list = []
+        self.buffer = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.buffer.append(value)
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self.buffer) >= 10 * self.compression:
+            self.compress()
+
+    def scale(self, q):
+        # The k1 scale function: a centroid spans at most 1 of it, so there are at most about
+        # compression centroids, and they are smaller towards the tails.
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def compress(self):
+        # Merge the buffered values into the centroids.
+        points = sorted(self.centroid_list + [[value, 1] for value in self.buffer])
+        self.buffer = []
+        merged = []
+        # The weight of the centroids before the last one of merged, and its scale.
+        before = 0
+        k_left = self.scale(0)
+        for mean, weight in points:
+            if merged:
+                last_mean, last_weight = merged[-1]
+                if self.scale(min(1, (before + last_weight + weight) / self.count)) - k_left <= 1:
+                    new_weight = last_weight + weight
+                    merged[-1] = [last_mean + (mean - last_mean) * weight / new_weight, new_weight]
+                    continue
+                before += last_weight
+                k_left = self.scale(before / self.count)
+            merged.append([mean, weight])
+        self.centroid_list = merged
+
+    def quantile(self, q):
+        # The value at quantile q (0 to 1), interpolated between the centroid centers.
+        if self.buffer:
+            self.compress()
+        if not self.centroid_list:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        target = q * self.count
+        previous_center = 0
+        previous_mean = self.min
+        cumulative = 0
+        for mean, weight in self.centroid_list:
+            center = cumulative + weight / 2
+            if target <= center:
+                if center == previous_center:
+                    return mean
+                return previous_mean + (mean - previous_mean) * (target - previous_center) / (center - previous_center)
+            previous_center = center
+            previous_mean = mean
+            cumulative += weight
+        if self.count == previous_center:
+            return self.max
+        return previous_mean + (self.max - previous_mean) * (target - previous_center) / (self.count - previous_center)
+
+class ApproximateStat:
+
+    def __init__(self, top=1000, width=8192, depth=5, compression=100):
+        self.daily_sketch = CountMinSketch(width, depth, seed=1)
+        self.total_sketch = CountMinSketch(width, depth, seed=2)
+        self.downtime_sketch = CountMinSketch(width, depth, seed=3)
+        self.top_neighbors = SpaceSaving(top)
+        self.downtime_digest = TDigest(compression)
+        # The UTC days of the events, in the order first seen.
+        self.day_dict = {}
+        # {NeighborIP : start time of the open incident}
+        self.start_time_dict = {}
+        # {NeighborIP : interface} of the neighbors of top_neighbors
+        self.interface_dict = {}
+        self.event_count = 0
+        self.incident_count = 0
+
+    def add(self, neighborIP, log_item):
+        # log_item: [timestamp,status,hostname,interface]
+        timestamp, status = log_item[0], log_item[1]
+        day = timestamp.date()
+        self.day_dict[day] = None
+        self.event_count += 1
+        if status == "DOWN":
+            self.daily_sketch.add(f"{neighborIP}|{day}")
+            self.total_sketch.add(neighborIP)
+            evicted = self.top_neighbors.add(neighborIP)
+            if evicted is not None:
+                self.interface_dict.pop(evicted, None)
+            self.interface_dict[neighborIP] = log_item[3]
+            self.start_time_dict[neighborIP] = timestamp
+        elif status == "UP" and neighborIP in self.start_time_dict:
+            # The incident is closed by its first UP event, as in neighbor_downtime_stat.
+            downtime_us = (timestamp - self.start_time_dict.pop(neighborIP)) // one_microsecond
+            self.downtime_sketch.add(neighborIP, downtime_us)
+            self.downtime_digest.add(downtime_us)
+            self.incident_count += 1
+
+    def add_stream(self, event_stream):
+        for neighborIP, log_item in event_stream:
+            self.add(neighborIP, log_item)
+        return self
+
+    def date_stat(self, k=None):
+        # neighbor_date_stat of the top k neighbors: {NeighborIP : {date : DOWN events}},
+        # with the days of an estimated count of 0 left out.
+        neighbor_date_stat_dict = {}
+        for neighborIP, count, error in self.top_neighbors.top(k):
+            date_dict = {}
+            for day in self.day_dict:
+                estimate = self.daily_sketch.estimate(f"{neighborIP}|{day}")
+                if estimate:
+                    date_dict[day] = estimate
+            neighbor_date_stat_dict[neighborIP] = date_dict
+        return neighbor_date_stat_dict
+
+    def total_stat(self, k=None):
+        # neighbor_date_total_stat of the top k neighbors: {NeighborIP : DOWN events}
+        return {neighborIP: self.total_sketch.estimate(neighborIP) for neighborIP, count, error in self.top_neighbors.top(k)}
+
+    def downtime_percentile(self, percent):
+        value = self.downtime_digest.quantile(percent / 100)
+        return None if value is None else datetime.timedelta(microseconds=round(value))
+
+def approximate_report_lines(stat, k=20):
+    # The daily and total report of the top k neighbors, then the downtime percentiles.
+    lines = [f"Approximate OSPF Log Analysis: {stat.event_count} events, {stat.total_sketch.total} DOWN events, "
+             f"{stat.incident_count} incidents", ""]
+    neighbor_total_dict = stat.total_stat(k)
+    for neighborIP, date_dict in stat.date_stat(k).items():
+        downtime = datetime.timedelta(microseconds=stat.downtime_sketch.estimate(neighborIP))
+        lines.append(f"OSPF Neighbor IP: {neighborIP} \tInterface: {stat.interface_dict.get(neighborIP)}")
+        lines.append(f"=" * 90)
+        for date, count in date_dict.items():
+            lines.append(f"{date}: {count}")
+        lines.append(f"Total: {neighbor_total_dict[neighborIP]} \tDowntime: {downtime}")
+        lines.append("")
+
+    lines.append(f"Downtime percentiles")
+    lines.append(f"=" * 90)
+    for percent in (50, 90, 99, 100):
+        lines.append(f"p{percent}: {stat.downtime_percentile(percent)}")
+    lines.append("")
+    lines.append(f"Count error bound: +{stat.total_sketch.error_bound():.1f} DOWN events "
+                 f"(probability {math.exp(-stat.total_sketch.depth):.2%} of more)")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Approximate OSPF neighbor statistics in fixed memory")
+    parser.add_argument("filenames", nargs="*", default=["logfile.txt"], help="log files collected from the devices")
+    parser.add_argument("--hostname", help="device of the log files, for the log formats without the hostname in the line (Cisco)")
+    parser.add_argument("--top", type=int, default=20, help="number of neighbors to report")
+    parser.add_argument("--capacity", type=int, default=1000, help="neighbors tracked by the top-K sketch")
+    parser.add_argument("--width", type=int, default=8192, help="Count-Min width (error e/width of the DOWN events)")
+    parser.add_argument("--depth", type=int, default=5, help="Count-Min depth (error probability e^-depth)")
+    parser.add_argument("--compression", type=int, default=100, help="t-digest compression")
+    args = parser.parse_args()
+
+    bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+    stat = ApproximateStat(args.capacity, args.width, args.depth, args.compression)
+    for filename in args.filenames:
+        stat.add_stream(ospf_event_stream(mmap_logfile_reader(filename, bad_word_list), hostname=args.hostname,
+                                          year_resolver=YearResolver.from_logfile(filename)))
+    for line in approximate_report_lines(stat, args.top):
+        print(line)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+# Function:
+# To follow the OSPF adjacency state machine of every neighbor through all the logged
+# transitions (Down, Attempt, Init, 2Way, ExStart, Exchange, Loading, Full), not only the
+# UP and DOWN events, in one pass over ospf_transition_stream:
+#   dwell time:     the time spent in each state, from the transition entering it to the next one
+#   stuck:          a stay in ExStart/Exchange (the database exchange) longer than stuck_threshold,
+#                   e.g. an MTU mismatch
+#   convergence:    the time from leaving Full (a DOWN event) until Full again
+#
+# The devices do not log every transition: Junos logs Init to ExStart and then Loading
+# or Exchange to Full, Cisco only Loading to Full and Full to Down. A transition starting
+# from a later state than the one the neighbor was in is such an unlogged gap: the
+# neighbor went through the states in between, but when is not known, so the time since
+# the last transition is counted as "Unknown" instead of in any state. A gap ending in
+# Exchange (Junos ExStart, then Exchange to Full) was spent in ExStart/Exchange and is
+# still checked for stuck; one ending in Loading is not, as the Loading part is unknown.
+# A transition starting from an earlier state (a transition missing from the log, e.g.
+# a DOWN event cut from the capture) is counted in "skipped", its time also as Unknown.
+# The first transition of a neighbor only sets its state: the time before it is unknown.
+#
+# Every neighbor keeps a fixed set of counters (NeighborState), so the memory depends
+# on the number of neighbors, not the number of events, and the tracker fits the
+# streaming path (e.g. ospf_follow.py or ospf_syslog.py).
+# Usage:
+# python ospf_state_machine.py [logfile] [--hostname HOST] [--stuck 60]
+
+import array
+import argparse
+import datetime
+
+from junos_ospf_log import (mmap_logfile_reader, ospf_transition_stream, format_localtime, location_determinator,
+                            YearResolver)
+from ospf_event_store import time_to_epoch_us, epoch_us_to_time
+
+ospf_state_list = ["down", "attempt", "init", "2way", "exstart", "exchange", "loading", "full"]
+state_index_dict = {state: index for index, state in enumerate(ospf_state_list)}
+state_name_list = ["Down", "Attempt", "Init", "2Way", "ExStart", "Exchange", "Loading", "Full"]
+# The states of the database exchange, where a neighbor gets stuck.
+exchange_state_set = {state_index_dict["exstart"], state_index_dict["exchange"]}
+full_state = state_index_dict["full"]
+
+class NeighborState:
+    __slots__ = ("hostname", "interface", "state", "entered_us", "dwell_array", "exchange_start_us", "down_us",
+                 "convergence_count", "convergence_total_us", "convergence_max_us", "stuck_count", "gap_count",
+                 "skipped", "unknown_us")
+
+    def __init__(self, hostname, interface):
+        self.hostname = hostname
+        self.interface = interface
+        # The current state (index into ospf_state_list) and when it was entered; None before the first transition.
+        self.state = None
+        self.entered_us = None
+        # The microseconds spent in each state.
+        self.dwell_array = array.array("q", bytes(8 * len(ospf_state_list)))
+        # When the current stay in ExStart/Exchange started, None outside of them.
+        self.exchange_start_us = None
+        # When the neighbor left Full, None while it has not.
+        self.down_us = None
+        self.convergence_count = 0
+        self.convergence_total_us = 0
+        self.convergence_max_us = 0
+        self.stuck_count = 0
+        # The transitions after unlogged states, and those missing from the log.
+        self.gap_count = 0
+        self.skipped = 0
+        # The microseconds before the transitions of gap_count and skipped, in no known state.
+        self.unknown_us = 0
+
+class AdjacencyTracker:
+
+    def __init__(self, stuck_threshold=datetime.timedelta(seconds=60)):
+        self.stuck_threshold_us = stuck_threshold // datetime.timedelta(microseconds=1)
+        # {NeighborIP : NeighborState}
+        self.neighbor_dict = {}
+
+    def add_transition(self, neighborIP, timestamp_us, from_state, to_state, hostname, interface):
+        # Apply one transition; return the finding it completes, if any:
+        #   ("stuck", microseconds spent in ExStart/Exchange)
+        #   ("converged", microseconds from leaving Full to Full again)
+        neighbor = self.neighbor_dict.get(neighborIP)
+        if neighbor is None:
+            neighbor = self.neighbor_dict[neighborIP] = NeighborState(hostname, interface)
+        from_index = state_index_dict.get(from_state)
+        to_index = state_index_dict.get(to_state)
+        if to_index is None:
+            return None
+
+        if neighbor.state is not None:
+            elapsed_us = max(timestamp_us - neighbor.entered_us, 0)
+            if from_index == neighbor.state:
+                neighbor.dwell_array[neighbor.state] += elapsed_us
+            else:
+                if from_index is not None and from_index > neighbor.state:
+                    neighbor.gap_count += 1
+                else:
+                    neighbor.skipped += 1
+                neighbor.unknown_us += elapsed_us
+        neighbor.state = to_index
+        neighbor.entered_us = timestamp_us
+
+        finding = None
+        if to_index in exchange_state_set:
+            if neighbor.exchange_start_us is None:
+                neighbor.exchange_start_us = timestamp_us
+        elif neighbor.exchange_start_us is not None:
+            exchange_us = timestamp_us - neighbor.exchange_start_us
+            neighbor.exchange_start_us = None
+            if from_index in exchange_state_set and exchange_us > self.stuck_threshold_us:
+                neighbor.stuck_count += 1
+                finding = ("stuck", exchange_us)
+
+        if from_index == full_state and to_index != full_state:
+            neighbor.down_us = timestamp_us
+        elif to_index == full_state and neighbor.down_us is not None:
+            convergence_us = timestamp_us - neighbor.down_us
+            neighbor.down_us = None
+            neighbor.convergence_count += 1
+            neighbor.convergence_total_us += convergence_us
+            neighbor.convergence_max_us = max(neighbor.convergence_max_us, convergence_us)
+            finding = ("converged", convergence_us)
+        return finding
+
+    def track(self, transition_stream):
+        # Apply the transitions of ospf_transition_stream;
+        # yield (NeighborIP, timestamp, finding, microseconds) for every finding.
+        for neighborIP, timestamp, status, hostname, match in transition_stream:
+            finding = self.add_transition(neighborIP, time_to_epoch_us(timestamp), match["from_state"],
+                                          match["to_state"], hostname, match["interface"])
+            if finding is not None:
+                yield neighborIP, timestamp, finding[0], finding[1]
+
+    def stuck_neighbors(self, now):
+        # The neighbors in ExStart/Exchange for longer than the threshold at time now:
+        # [(NeighborIP, start of the stay)]
+        now_us = time_to_epoch_us(now)
+        return [(neighborIP, epoch_us_to_time(neighbor.exchange_start_us))
+                for neighborIP, neighbor in self.neighbor_dict.items()
+                if neighbor.exchange_start_us is not None and now_us - neighbor.exchange_start_us > self.stuck_threshold_us]
+
+    def dwell_time(self, neighborIP):
+        # {state name : timedelta} of the states the neighbor has spent time in, and
+        # "Unknown" for the time before the unlogged gaps and skipped transitions.
+        neighbor = self.neighbor_dict[neighborIP]
+        dwell_dict = {state_name_list[index]: datetime.timedelta(microseconds=dwell_us)
+                      for index, dwell_us in enumerate(neighbor.dwell_array) if dwell_us}
+        if neighbor.unknown_us:
+            dwell_dict["Unknown"] = datetime.timedelta(microseconds=neighbor.unknown_us)
+        return dwell_dict
+
+def tracker_report_lines(tracker):
+    lines = []
+    for neighborIP, neighbor in tracker.neighbor_dict.items():
+        state = "-" if neighbor.state is None else state_name_list[neighbor.state]
+        lines.append(f"OSPF Neighbor IP: {neighborIP} \tInterface: {neighbor.interface} \tState: {state}")
+        lines.append(f"=" * 90)
+        for state_name, dwell in tracker.dwell_time(neighborIP).items():
+            lines.append(f"{state_name:<10} {dwell}")
+        lines.append(f"-" * 90)
+        if neighbor.convergence_count:
+            average = datetime.timedelta(microseconds=neighbor.convergence_total_us // neighbor.convergence_count)
+            maximum = datetime.timedelta(microseconds=neighbor.convergence_max_us)
+            lines.append(f"Convergence: {neighbor.convergence_count} times, average {average}, max {maximum}")
+        lines.append(f"Stuck in ExStart/Exchange: {neighbor.stuck_count} \tUnlogged gaps: {neighbor.gap_count} "
+                     f"\tSkipped transitions: {neighbor.skipped}")
+        lines.append("")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Track the OSPF adjacency state machine of every neighbor")
+    parser.add_argument("filename", nargs="?", default="logfile.txt", help="log file collected from the device")
+    parser.add_argument("--hostname", help="device of the log file, for the log formats without the hostname in the line (Cisco)")
+    parser.add_argument("--stuck", type=float, default=60.0, help="seconds in ExStart/Exchange reported as stuck")
+    args = parser.parse_args()
+
+    bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+    tracker = AdjacencyTracker(datetime.timedelta(seconds=args.stuck))
+    transition_stream = ospf_transition_stream(mmap_logfile_reader(args.filename, bad_word_list), hostname=args.hostname,
+                                               year_resolver=YearResolver.from_logfile(args.filename))
+    for neighborIP, timestamp, finding, finding_us in tracker.track(transition_stream):
+        if finding == "stuck":
+            location = location_determinator(tracker.neighbor_dict[neighborIP].hostname)
+            print(f"{neighborIP} \t stuck in ExStart/Exchange for {datetime.timedelta(microseconds=finding_us)} "
+                  f"until {format_localtime(timestamp, location)}")
+    print()
+    for line in tracker_report_lines(tracker):
+        print(line)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+# Function:
+# To collect the OSPF neighbor log straight from the devices as syslog, instead of
+# capturing "show log messages | match RPD_OSPF_NBR" in a PuTTY session: an asyncio
+# listener on UDP and TCP that parses the Junos RPD_OSPF_NBR and Cisco %OSPF-5-ADJCHG
+# messages in batches and keeps the per neighbor statistics up to date.
+#
+# Receiving only queues the raw messages; the parser takes them in batches every
+# flush_interval seconds (or as soon as max_batch messages are waiting), so a burst of
+# thousands of messages per second during a core outage is read off the sockets first
+# and parsed right after. The UDP receive buffer is enlarged (udp_receive_buffer, capped
+# by net.core.rmem_max on Linux), as a full kernel buffer is the only place UDP loses messages.
+# TCP takes both newline framed and octet counted (RFC 6587) messages.
+# A malformed message is counted as unparsed, and a batch failing to parse for any other
+# reason in parse_stat["failed"], so the parser never stops.
+#
+# The messages are the BSD syslog format of both vendors:
+#   <28>Jan  7 20:49:27 jkf-mayb-switch1 rpd[1307]: RPD_OSPF_NBRDOWN: OSPF neighbor ...
+#   <189>123: *Jan  8 13:34:28.703 SGT: %OSPF-5-ADJCHG: Process 200, Nbr ...
+# The <PRI> header is dropped, and a time without milliseconds gets ".000".
+# A Cisco message without the hostname is taken as sent by the device named after its
+# source address.
+#
+# State (as in ospf_follow.py):
+#   neighbor_date_stat_dict:        {NeighborIP : {date : number of DOWN events}}
+#   start_time_dict:                {NeighborIP : start of the open incident}
+#   neighbor_downtime_total_dict:   {NeighborIP : [number of incidents, total downtime in microseconds]}
+#   interface_dict:                 {NeighborIP : interface}
+# Usage:
+# python ospf_syslog.py [--host 0.0.0.0] [--udp-port 514] [--tcp-port 514] [--quiet]
+
+import re
+import socket
+import asyncio
+import argparse
+import datetime
+
+from junos_ospf_log import (log_cleaner, ospf_allow_list, ospf_event_stream, neighbor_stream_stat,
+                            stream_event_output, stream_summary_output)
+
+# The <PRI> header of a syslog message.
+syslog_pri_regex = re.compile(r'<\d{1,3}>')
+# The timestamp at the start of the line (after a Cisco sequence number), without milliseconds.
+syslog_second_regex = re.compile(r'(?:\d+:\s+)?[*.]?[a-z]{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}(?![.\d])')
+
+udp_receive_buffer = 8 * 1024 * 1024
+
+def syslog_line(message):
+    # The log line of a syslog message, lowercased as the parser expects.
+    line = message.decode(errors="replace").strip().lower()
+    match = syslog_pri_regex.match(line)
+    if match:
+        line = line[match.end():]
+    match = syslog_second_regex.match(line)
+    if match:
+        line = line[:match.end()] + ".000" + line[match.end():]
+    return line
+
+class SyslogCollector:
+
+    def __init__(self, flush_interval=0.1, max_batch=1000, on_event=None):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        # function(neighborIP, log_item, downtime) called for every event, after the statistics are updated
+        self.on_event = on_event
+        self.neighbor_date_stat_dict = {}
+        self.start_time_dict = {}
+        self.neighbor_downtime_total_dict = {}
+        self.interface_dict = {}
+        self.parse_stat = {}
+        # Messages received and taken by the parser.
+        self.received = 0
+        self.processed = 0
+        # [(source, message bytes)] waiting for the parser
+        self.pending = []
+        self.wakeup = asyncio.Event()
+
+    def receive(self, message, source):
+        # Only queue the message, so the sockets are read again at once.
+        self.pending.append((source, message))
+        self.received += 1
+        if len(self.pending) >= self.max_batch:
+            self.wakeup.set()
+
+    def process_batch(self, batch):
+        # Parse a batch of messages, the messages of each source in the order received.
+        source_dict = {}
+        for source, message in batch:
+            source_dict.setdefault(source, []).append(syslog_line(message))
+        for source, lines in source_dict.items():
+            event_stream = ospf_event_stream(log_cleaner(lines, [], ospf_allow_list), self.parse_stat, source)
+            for neighborIP, log, downtime in neighbor_stream_stat(event_stream, self.neighbor_date_stat_dict,
+                                                                  self.start_time_dict):
+                self.interface_dict.setdefault(neighborIP, log[3])
+                downtime_total = self.neighbor_downtime_total_dict.setdefault(neighborIP, [0, 0])
+                if downtime != 0:
+                    downtime_total[0] += 1
+                    downtime_total[1] += downtime // datetime.timedelta(microseconds=1)
+                if self.on_event is not None:
+                    self.on_event(neighborIP, log, downtime)
+        self.processed += len(batch)
+
+    async def run_parser(self):
+        # Parse the queued messages until cancelled, at most max_batch at a time,
+        # letting the sockets be read in between.
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            while self.pending:
+                batch = self.pending[:self.max_batch]
+                del self.pending[:self.max_batch]
+                try:
+                    self.process_batch(batch)
+                except Exception:
+                    self.parse_stat["failed"] = self.parse_stat.get("failed", 0) + len(batch)
+                    self.processed += len(batch)
+                await asyncio.sleep(0)
+
+    async def drain(self):
+        # Wait until every message received so far has been parsed.
+        while self.processed < self.received:
+            self.wakeup.set()
+            await asyncio.sleep(0.001)
+
+class SyslogUdpReceiver:
+    # Every time the socket is readable, all the datagrams waiting are read, where the
+    # datagram transport of asyncio reads one per event loop iteration; so a burst is
+    # taken off the kernel buffer before it overflows, even while the parser is busy.
+    # (add_reader needs a selector event loop, the default on Linux and macOS.)
+
+    def __init__(self, collector, host, port):
+        self.collector = collector
+        self.sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, udp_receive_buffer)
+        except OSError:
+            pass
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+        self.loop = asyncio.get_running_loop()
+        self.loop.add_reader(self.sock.fileno(), self.read_ready)
+
+    def read_ready(self):
+        while True:
+            try:
+                data, address = self.sock.recvfrom(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            # A datagram may hold several messages, one per line.
+            for message in data.splitlines():
+                if message:
+                    self.collector.receive(message, address[0])
+
+    def close(self):
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+# The longest octet counted message taken; a longer length is not a frame header.
+max_octet_count = 65536
+
+async def read_tcp_message(reader):
+    # Read one message: octet counted when it starts with "<length> <", e.g. "112 <28>Jan  7 ...",
+    # newline framed otherwise, including the Cisco lines starting with a sequence number
+    # ("123: *Jan  8 ..."). Return None at the end of the stream.
+    head = b""
+    while True:
+        byte = await reader.read(1)
+        if not byte.isdigit() or len(head) > 5:
+            break
+        head += byte
+    if not byte:
+        return head or None
+    if byte == b"\n":
+        return head
+    if head and byte == b" ":
+        byte = await reader.read(1)
+        if byte == b"<" and 0 < int(head) <= max_octet_count:
+            return byte + await reader.readexactly(int(head) - 1)
+        head += b" "
+        if not byte or byte == b"\n":
+            return head
+    return head + byte + await reader.readline()
+
+async def handle_tcp_client(collector, reader, writer):
+    source = writer.get_extra_info("peername")[0]
+    try:
+        while True:
+            try:
+                message = await read_tcp_message(reader)
+            except ValueError:
+                # A line over the stream limit: it is dropped, and the connection kept.
+                continue
+            if message is None:
+                break
+            message = message.strip()
+            if message:
+                collector.receive(message, source)
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def start_collector(collector, host="0.0.0.0", udp_port=514, tcp_port=514):
+    # Start the listeners (a port of None is not listened on) and the parser.
+    # Return (udp receiver, tcp server, parser task); the bound ports are in their sockets.
+    udp_receiver = None
+    tcp_server = None
+    if udp_port is not None:
+        udp_receiver = SyslogUdpReceiver(collector, host, udp_port)
+    if tcp_port is not None:
+        tcp_server = await asyncio.start_server(
+            lambda reader, writer: handle_tcp_client(collector, reader, writer), host, tcp_port)
+    parser_task = asyncio.create_task(collector.run_parser())
+    return udp_receiver, tcp_server, parser_task
+
+async def serve(host, udp_port, tcp_port, quiet=False):
+    on_event = None
+    if not quiet:
+        on_event = lambda neighborIP, log, downtime: stream_event_output(
+            neighborIP, collector.interface_dict[neighborIP], log, downtime)
+    collector = SyslogCollector(on_event=on_event)
+    udp_receiver, tcp_server, parser_task = await start_collector(collector, host, udp_port, tcp_port)
+    print(f"Listening for syslog on {host} (UDP {udp_port}, TCP {tcp_port})\n")
+    print(f"Neighbor IP \t\t Interface \t Timestamp \t\t\t\t\t\t Status \t\t Downtime")
+    print(f"=" * 90)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await collector.drain()
+        parser_task.cancel()
+        if udp_receiver is not None:
+            udp_receiver.close()
+        if tcp_server is not None:
+            tcp_server.close()
+        print(f"\n")
+        stream_summary_output(collector.neighbor_date_stat_dict, collector.interface_dict)
+        print(f"Messages: {collector.received} \t Events: {collector.parse_stat.get('parsed', 0)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect the Junos and Cisco OSPF neighbor log over syslog")
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on")
+    parser.add_argument("--udp-port", type=int, default=514)
+    parser.add_argument("--tcp-port", type=int, default=514)
+    parser.add_argument("--quiet", action="store_true", help="do not print every event")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.udp_port, args.tcp_port, args.quiet))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
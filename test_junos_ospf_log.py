@@ -0,0 +1,223 @@
+import os
+import datetime
+
+import pytest
+import pytz
+
+import junos_ospf_log
+from junos_ospf_log import (
+    junos_ospf_log_reader, logfile_reader, mmap_logfile_reader, parallel_ospf_log_reader, str_to_time,
+)
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+
+def serial_parse(filename, parse_stat=None):
+    return junos_ospf_log_reader(logfile_reader(filename, bad_word_list), parse_stat,
+                                 year_resolver=junos_ospf_log.YearResolver.from_logfile(filename))
+
+def test_parallel_matches_serial():
+    serial_stat = {}
+    serial = serial_parse("logfile.txt", serial_stat)
+    for workers in (2, 3, 7):
+        parallel_stat = {}
+        parallel = parallel_ospf_log_reader("logfile.txt", bad_word_list, workers, parallel_stat)
+        assert parallel == serial
+        assert list(parallel) == list(serial)
+        assert parallel_stat == serial_stat
+
+def test_parallel_compact_merges_parse_stat():
+    serial_stat = {}
+    serial = serial_parse("logfile.txt", serial_stat)
+    parallel_stat = {}
+    store = parallel_ospf_log_reader("logfile.txt", bad_word_list, 3, parallel_stat, compact=True)
+    assert store.to_log_dict() == serial
+    assert parallel_stat == serial_stat
+    assert parallel_stat["parsed"] == 264
+
+def test_mmap_reader_keeps_only_marker_lines():
+    cleaned = [line for line in logfile_reader("logfile.txt", bad_word_list)
+               if "rpd_ospf_nbr" in line or "%ospf-5-adjchg" in line]
+    assert list(mmap_logfile_reader("logfile.txt", bad_word_list)) == cleaned
+
+def test_mmap_byte_ranges_read_every_line_once():
+    whole = list(mmap_logfile_reader("logfile.txt", bad_word_list))
+    size = os.path.getsize("logfile.txt")
+    for step in (13, 100, 4096):
+        lines = []
+        for start in range(0, size, step):
+            lines += mmap_logfile_reader("logfile.txt", bad_word_list, start, min(start + step, size))
+        assert lines == whole
+
+def test_mmap_reader_empty_file(tmp_path):
+    empty = tmp_path / "empty.txt"
+    empty.write_text("")
+    assert list(mmap_logfile_reader(str(empty), bad_word_list)) == []
+
+def reference_str_to_time(timestamp_str, timezone_str):
+    # The original strptime + localize conversion.
+    date_time_obj = datetime.datetime.strptime(timestamp_str, '%d-%b %H:%M:%S.%f')
+    date_time_obj = date_time_obj.replace(year=datetime.datetime.now().year)
+    return junos_ospf_log.get_timezone(timezone_str).localize(date_time_obj).astimezone(pytz.utc)
+
+def test_str_to_time_matches_strptime():
+    for timezone_str in ("hk", "sg", "bk", "jk", "mu", "UTC"):
+        for timestamp_str in ("5-Jan 11:48:14.571", "31-Dec 23:59:59.999", "1-Mar 00:00:00.000001"):
+            assert str_to_time(timestamp_str, timezone_str) == reference_str_to_time(timestamp_str, timezone_str)
+
+def test_str_to_time_dst_day_fallback():
+    # Sydney changes its UTC offset in the first week of April and October,
+    # so some of these days have a DST change and are localized per timestamp.
+    for day in range(1, 8):
+        for month in ("Apr", "Oct"):
+            for time_str in ("00:30:00.000", "02:30:00.500", "03:30:00.250", "23:59:59.999"):
+                timestamp_str = f"{day}-{month} {time_str}"
+                assert str_to_time(timestamp_str, "sy") == reference_str_to_time(timestamp_str, "sy")
+
+def junos_log_line(date, status):
+    change = "from Full to Init due to 1WayRcvd" if status == "DOWN" else "from Loading to Full due to LoadDone"
+    return (f"{date:%b} {date.day:2d} 11:48:14.571  jkf-mayb-switch1 rpd[1307]: RPD_OSPF_NBRDOWN: OSPF neighbor "
+            f"10.132.43.105 (realm ospf-v2 vlan.514 area 0.0.0.0) state changed {change}\n")
+
+def test_year_resolver_rolls_over_the_year_boundary():
+    # A capture of Dec 30 holding the log of the previous months, without a year in the lines.
+    resolver = junos_ospf_log.YearResolver(datetime.date(2018, 12, 30))
+    assert [resolver.resolve(month, day) for month, day in
+            [("mar", "1"), ("dec", "31"), ("jan", "1"), ("dec", "31"), ("jan", "2"), ("feb", "29"), ("mar", "1")]] == \
+        [2018, 2018, 2019, 2018, 2019, 2020, 2020]
+    # A monitored capture may run a little past its start.
+    assert junos_ospf_log.YearResolver(datetime.date(2018, 12, 30)).resolve("jan", "2") == 2019
+
+def test_logfile_years_from_putty_header_or_mtime(tmp_path):
+    assert junos_ospf_log.logfile_reference_date("logfile.txt") == datetime.date(2019, 1, 26)
+    log_dict = serial_parse("logfile.txt")
+    assert log_dict["10.132.43.41"][0][0] == str_to_time("7-Jan 20:49:27.596", "jk", 2019)
+
+    # Two years of log, sparse at first: the first lines of the chunks are more than a
+    # year apart, so the chunks after a year boundary are parsed again in the right year.
+    dates = [datetime.date(2019, 1, 5) + datetime.timedelta(days=30 * month) for month in range(24)]
+    dates += [dates[-1]] * 400
+    logfile = tmp_path / "capture.log"
+    logfile.write_text("".join(junos_log_line(date, status) for date in dates for status in ("DOWN", "UP")))
+    os.utime(logfile, (0, datetime.datetime(2019, 1, 6).timestamp()))
+    assert junos_ospf_log.logfile_reference_date(str(logfile)) == datetime.date(2019, 1, 6)
+
+    serial = serial_parse(str(logfile))
+    assert [log_item[0].date() for log_item in serial["10.132.43.105"][::2]] == dates
+    assert parallel_ospf_log_reader(str(logfile), bad_word_list, 2) == serial
+
+def test_cisco_parser_reads_cisco_logfile():
+    parse_stat = {}
+    log_dict = junos_ospf_log_reader(logfile_reader("cisco_logfile.txt", bad_word_list), parse_stat,
+                                     hostname="fnlr-sg1-bursa2")
+    assert list(log_dict) == ["10.132.1.106"]
+    events = log_dict["10.132.1.106"]
+    assert parse_stat["parsed"] == len(events)
+    # "from init to down" is neither an UP nor a DOWN event.
+    assert parse_stat["skipped"] == 1
+    assert events[1][1:] == ["DOWN", "fnlr-sg1-bursa2", "tunnel1"]
+    # The SGT timestamps are read as Singapore time.
+    assert events[1][0].strftime("%m-%d %H:%M:%S.%f") == "01-08 05:34:28.703000"
+
+def test_cisco_parser_takes_the_hostname_from_the_line():
+    line = "*jan  8 13:34:28.703: sg-edge1: %ospf-5-adjchg: process 1, nbr 10.0.0.1 on gi0/1 from full to down, neighbor down: dead timer expired"
+    assert junos_ospf_log.detect_log_format([line]) == "cisco"
+    (neighborIP, log_item), = junos_ospf_log.ospf_event_stream([line], hostname="other")
+    assert neighborIP == "10.0.0.1"
+    assert log_item[1:] == ["DOWN", "sg-edge1", "gi0/1"]
+
+def test_mixed_vendor_file_in_one_pass():
+    junos_lines = list(logfile_reader("logfile.txt", bad_word_list))
+    cisco_lines = list(logfile_reader("cisco_logfile.txt", bad_word_list))
+    mixed = [line for pair in zip(junos_lines, cisco_lines) for line in pair]
+    mixed += junos_lines[len(cisco_lines):]
+
+    assert junos_ospf_log.detect_log_format(junos_lines) == "junos"
+    assert junos_ospf_log.detect_log_format(cisco_lines) == "cisco"
+    assert junos_ospf_log.detect_log_format(["no ospf here"]) is None
+
+    log_dict = junos_ospf_log_reader(mixed, hostname="fnlr-sg1-bursa2")
+    expected = junos_ospf_log_reader(junos_lines)
+    expected.update(junos_ospf_log_reader(cisco_lines, hostname="fnlr-sg1-bursa2"))
+    assert log_dict == expected
+    # The Junos only stream leaves the Cisco lines out.
+    assert dict(junos_ospf_log.junos_ospf_event_stream(cisco_lines)) == {}
+
+def reference_log_cleaner(log_lines, bad_word_list):
+    bad_word_list = [x.lower() for x in bad_word_list]
+    for line in log_lines:
+        if not any(bad_word in line for bad_word in bad_word_list):
+            line = line.strip()
+            if len(line) > 0:
+                yield line
+
+def test_log_cleaner_matches_the_word_by_word_scan(monkeypatch):
+    lines = [line.lower() for line in open("logfile.txt")] + ["  \n", "it's a 'quote'\n", "back\\slash\n"]
+    long_list = bad_word_list + ["'quote'", "back\\slash"] + [f"word{i}" for i in range(20)]
+    for words in (bad_word_list, long_list, []):
+        assert list(junos_ospf_log.log_cleaner(lines, words)) == list(reference_log_cleaner(lines, words))
+
+    # The same without the Aho-Corasick automaton.
+    monkeypatch.setattr(junos_ospf_log, "ahocorasick", None)
+    monkeypatch.setattr(junos_ospf_log, "word_matcher_cache", {})
+    assert list(junos_ospf_log.log_cleaner(lines, long_list)) == list(reference_log_cleaner(lines, long_list))
+
+def test_log_cleaner_allow_list():
+    lines = [line.lower() for line in open("logfile.txt")]
+    allowed = list(junos_ospf_log.log_cleaner(lines, bad_word_list, junos_ospf_log.ospf_allow_list))
+    assert allowed == [line for line in reference_log_cleaner(lines, bad_word_list)
+                       if "rpd_ospf_nbr" in line or "%ospf-5-adjchg" in line]
+    assert len(allowed) == 400
+
+def test_format_localtime_matches_strftime():
+    start = datetime.datetime(2019, 4, 6, 15, 0, 0, 123456, tzinfo=pytz.utc)
+    for location in ("sy", "sg", "mu", "utc"):
+        for minutes in range(0, 24 * 60, 7):
+            timestamp = start + datetime.timedelta(minutes=minutes, seconds=minutes % 60)
+            assert junos_ospf_log.format_localtime(timestamp, location) == \
+                junos_ospf_log.utc_to_localtime(timestamp, location).strftime('%Y-%m-%d %H:%M:%S.%f %z')
+
+def test_report_output_writes_stdout_and_file_from_one_render(tmp_path, monkeypatch, capsys):
+    log_dict = serial_parse("logfile.txt")
+    date_stat = junos_ospf_log.neighbor_date_stat(log_dict)
+    stat_args = (log_dict, date_stat, junos_ospf_log.neighbor_date_total_stat(date_stat),
+                 junos_ospf_log.neighbor_downtime_stat(log_dict))
+    monkeypatch.chdir(tmp_path)
+    junos_ospf_log.report_output(*stat_args, "ospf-log.txt")
+
+    stdout = capsys.readouterr().out
+    (report_file,) = (tmp_path / "log_result").iterdir()
+    report = report_file.read_text()
+    # The same report, with the extra blank lines of the stdout layout.
+    assert stdout.replace("\n\n\n", "\n\n").replace(" \n\nCreation", " \nCreation") == report
+    assert "-01-05 11:48:14.571000 +0700 \t\t\t DOWN\n" in report
+    assert report.count("OSPF Neighbor IP:") == len(log_dict)
+
+@pytest.mark.parametrize("compression", ["gzip", "bz2", "xz"])
+def test_compressed_logfile_is_streamed(tmp_path, monkeypatch, compression):
+    data = open("logfile.txt", "rb").read()
+    compressed = tmp_path / "logfile.txt.z"
+    compressed.write_bytes(junos_ospf_log.compression_dict[compression][1].compress(data))
+    assert junos_ospf_log.detect_compression(str(compressed)) == compression
+    assert junos_ospf_log.detect_compression("logfile.txt") is None
+
+    expected = list(junos_ospf_log.mmap_logfile_reader("logfile.txt", bad_word_list))
+    assert list(junos_ospf_log.logfile_reader(str(compressed), bad_word_list)) == \
+        list(junos_ospf_log.logfile_reader("logfile.txt", bad_word_list))
+    # Small blocks, so that lines are cut by the block boundaries.
+    monkeypatch.setattr(junos_ospf_log, "decompress_block_size", 333)
+    for decompress_thread in (False, True):
+        assert list(junos_ospf_log.mmap_logfile_reader(str(compressed), bad_word_list,
+                                                       decompress_thread=decompress_thread)) == expected
+    # Not split into byte ranges for the workers.
+    assert junos_ospf_log.parse_logfile(str(compressed), bad_word_list, workers=2) == serial_parse("logfile.txt")
+
+def test_threaded_iter_raises_and_stops():
+    def failing():
+        yield 1
+        raise ValueError("broken")
+    with pytest.raises(ValueError):
+        list(junos_ospf_log.threaded_iter(failing()))
+    # Stopping early ends the thread.
+    iterator = junos_ospf_log.threaded_iter(iter(range(1000)), queue_size=2)
+    assert next(iterator) == 0
+    iterator.close()
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark"))
+
+from junos_ospf_log import junos_ospf_log_reader, logfile_reader
+from log_generator import generate_logfile, parse_size
+from pipeline_benchmark import find_regressions
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+
+@pytest.mark.parametrize("vendor", ["junos", "cisco", "mixed"])
+def test_generated_capture_parses_back(tmp_path, vendor):
+    filename = str(tmp_path / "capture.txt")
+    stat = generate_logfile(filename, 200000, neighbor_count=20, vendor=vendor, noise_rate=0.3)
+    assert os.path.getsize(filename) >= 200000
+    assert stat["noise_lines"] > 0
+
+    clean_lines = list(logfile_reader(filename, bad_word_list))
+    assert len(clean_lines) == stat["ospf_lines"]
+
+    parse_stat = {}
+    log_dict = junos_ospf_log_reader(clean_lines, parse_stat, hostname="fnlr-sg1-bursa2")
+    # Every flap is one DOWN and one UP event.
+    assert parse_stat["parsed"] == 2 * stat["flaps"]
+    assert parse_stat["unparsed"] == 0
+    assert len(log_dict) <= 20
+
+def test_parse_size():
+    assert parse_size("2G") == 2 * 1024 ** 3
+    assert parse_size("1.5m") == 1536 * 1024
+    assert parse_size("1000") == 1000
+
+def test_find_regressions():
+    history = [{"input": {"size": "1M"}, "stages": {"read": 1.0, "log_cleaner": 1.0}},
+               {"input": {"size": "2M"}, "stages": {"read": 0.1, "log_cleaner": 0.1}}]
+    run = {"input": {"size": "1M"}, "stages": {"read": 1.1, "log_cleaner": 1.5, "file_output": 9.0}}
+    assert find_regressions(run, history, 0.2) == [("log_cleaner", 1.0, 1.5)]
+    assert find_regressions({"input": {"size": "3M"}, "stages": {}}, history, 0.2) == []
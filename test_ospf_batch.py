@@ -0,0 +1,59 @@
+import shutil
+
+from junos_ospf_log import junos_ospf_log_reader, logfile_reader, report_hostname_list
+from ospf_batch import batch_analyze, batch_report_lines, expand_paths
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+
+def log_dir(tmp_path):
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    shutil.copy("logfile.txt", logs / "junos.txt")
+    # The Cisco lines have no hostname: the file name is the device.
+    shutil.copy("cisco_logfile.txt", logs / "fnlr-sg1-bursa2.txt")
+    return logs
+
+def test_expand_paths(tmp_path):
+    logs = log_dir(tmp_path)
+    filenames = [str(logs / "fnlr-sg1-bursa2.txt"), str(logs / "junos.txt")]
+    assert expand_paths([str(logs)]) == filenames
+    assert expand_paths([str(logs / "*.txt"), str(logs / "junos.txt")]) == filenames
+    assert expand_paths([str(logs / "missing*.txt")]) == []
+
+def test_batch_groups_by_hostname(tmp_path):
+    logs = log_dir(tmp_path)
+    # The same device in two files: the second half of the capture first.
+    lines = open("logfile.txt").readlines()
+    (logs / "junos.txt").write_text("".join(lines[len(lines) // 2:]))
+    (logs / "junos-older.txt").write_text("".join(lines[:len(lines) // 2]))
+
+    parse_stat = {}
+    output_path = tmp_path / "out"
+    summary_list = batch_analyze(expand_paths([str(logs)]), bad_word_list, 2, str(output_path), parse_stat=parse_stat)
+    summary_dict = {summary["hostname"]: summary for summary in summary_list}
+    assert list(summary_dict) == ["fnlr-sg1-bursa2", "jkf-mayb-switch1"]
+    assert summary_dict["fnlr-sg1-bursa2"]["location"] == "sg"
+    assert summary_dict["fnlr-sg1-bursa2"]["down_events"] == 9
+
+    junos = summary_dict["jkf-mayb-switch1"]
+    log_dict = junos_ospf_log_reader(logfile_reader("logfile.txt", bad_word_list))
+    assert junos["neighbors"] == len(log_dict)
+    assert junos["down_events"] == sum(log[1] == "DOWN" for log_items in log_dict.values() for log in log_items)
+    assert junos["top_neighbors"][0][2] == 62
+
+    # One report per device, each with only the device in the title.
+    report = open(junos["report"]).read()
+    assert report.startswith("OSPF Log Analysis for jkf-mayb-switch1 \n")
+    assert report.count("OSPF Neighbor IP:") == len(log_dict)
+    assert sorted(path.name.rsplit("-", 2)[0] for path in output_path.iterdir()) == \
+        ["ospf-log-fnlr-sg1-bursa2", "ospf-log-jkf-mayb-switch1"]
+
+    lines = batch_report_lines(summary_list, 3, top=3)
+    assert lines[0] == "OSPF batch report: 3 files, 2 devices"
+    assert "Location: sg" in lines and "Location: jk" in lines
+
+def test_report_title_names_every_device():
+    log_dict = junos_ospf_log_reader(logfile_reader("logfile.txt", bad_word_list))
+    cisco_dict = junos_ospf_log_reader(logfile_reader("cisco_logfile.txt", bad_word_list), hostname="fnlr-sg1-bursa2")
+    assert report_hostname_list(log_dict) == ["jkf-mayb-switch1"]
+    assert report_hostname_list({**log_dict, **cisco_dict}) == ["jkf-mayb-switch1", "fnlr-sg1-bursa2"]
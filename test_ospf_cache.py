@@ -0,0 +1,47 @@
+import os
+import shutil
+
+from junos_ospf_log import parse_logfile
+from ospf_cache import cached_event_store
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+settings = {"bad_word_list": bad_word_list}
+
+def counting_parse(calls):
+    def parse(filename, parse_stat):
+        calls.append(filename)
+        return parse_logfile(filename, bad_word_list, compact=True, parse_stat=parse_stat)
+    return parse
+
+def test_second_run_loads_without_parsing(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    calls = []
+    first_stat, second_stat = {}, {}
+    first = cached_event_store("logfile.txt", settings, counting_parse(calls), cache_dir, parse_stat=first_stat)
+    second = cached_event_store("logfile.txt", settings, counting_parse(calls), cache_dir, parse_stat=second_stat)
+    assert calls == ["logfile.txt"]
+    assert second.to_log_dict() == first.to_log_dict()
+    assert second_stat == first_stat
+
+def test_changed_file_or_settings_is_parsed_again(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    log = str(tmp_path / "log.txt")
+    shutil.copy("logfile.txt", log)
+    calls = []
+    cached_event_store(log, settings, counting_parse(calls), cache_dir)
+    cached_event_store(log, {"bad_word_list": []}, counting_parse(calls), cache_dir)
+    with open(log, "a") as f:
+        f.write("\n")
+    cached_event_store(log, settings, counting_parse(calls), cache_dir)
+    assert len(calls) == 3
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    calls = []
+    for n in range(3):
+        log = str(tmp_path / f"log{n}.txt")
+        with open("logfile.txt") as f, open(log, "w") as g:
+            g.write(f.read() * (n + 1))
+        cached_event_store(log, settings, counting_parse(calls), cache_dir, max_cache_bytes=1)
+    entries = [name for name in os.listdir(cache_dir) if name.endswith(".events")]
+    assert len(entries) == 1
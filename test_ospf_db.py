@@ -0,0 +1,73 @@
+import datetime
+
+import ospf_db
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+
+def write_capture(path, lines):
+    path.write_text("".join(lines))
+    return str(path)
+
+def test_overlapping_captures_are_not_double_counted(tmp_path):
+    lines = open("logfile.txt").readlines()[:-1]
+    first = write_capture(tmp_path / "first.txt", lines[:250])
+    # Each capture is a PuTTY log of its own, dated by its header.
+    second = write_capture(tmp_path / "second.txt", lines[:1] + lines[150:])
+    whole = write_capture(tmp_path / "whole.txt", lines)
+
+    connection = ospf_db.connect(str(tmp_path / "ospf.db"))
+    ospf_db.load_logfile(connection, first, bad_word_list)
+    ospf_db.load_logfile(connection, second, bad_word_list)
+    ospf_db.load_logfile(connection, second, bad_word_list)
+
+    reference = ospf_db.connect(str(tmp_path / "reference.db"))
+    event_count, incident_count = ospf_db.load_logfile(reference, whole, bad_word_list)
+
+    def table(db, sql):
+        return sorted(db.execute(sql).fetchall(), key=repr)
+
+    assert table(connection, "SELECT * FROM events") == table(reference, "SELECT * FROM events")
+    assert len(table(connection, "SELECT * FROM events")) == event_count == 400
+    assert table(connection, "SELECT * FROM incidents") == table(reference, "SELECT * FROM incidents")
+
+def test_open_incident_closed_by_a_later_capture(tmp_path):
+    lines = open("logfile.txt").readlines()
+    # The DOWN of 10.132.43.105 on Jan 5 in one capture, its UP in the next one.
+    first = write_capture(tmp_path / "first.txt", lines[7:8])
+    second = write_capture(tmp_path / "second.txt", lines[8:10])
+    connection = ospf_db.connect(str(tmp_path / "ospf.db"))
+    ospf_db.load_logfile(connection, first, bad_word_list)
+    (incident,) = ospf_db.neighbor_incidents(connection, "10.132.43.105")
+    assert incident[3] is None
+
+    ospf_db.load_logfile(connection, second, bad_word_list)
+    (incident,) = ospf_db.neighbor_incidents(connection, "10.132.43.105")
+    assert incident[4] == datetime.timedelta(microseconds=116000)
+
+def test_top_flapping_neighbors_uses_the_day_index(tmp_path):
+    connection = ospf_db.connect(str(tmp_path / "ospf.db"))
+    ospf_db.load_logfile(connection, "logfile.txt", bad_word_list)
+    ospf_db.load_logfile(connection, "cisco_logfile.txt", bad_word_list, hostname="fnlr-sg1-bursa2")
+
+    (day_min, day_max), = connection.execute("SELECT MIN(day), MAX(day) FROM events").fetchall()
+    top = ospf_db.top_flapping_neighbors(connection, day_min, day_max, limit=3)
+    assert len(top) == 3
+    assert [row[2] for row in top] == sorted((row[2] for row in top), reverse=True)
+    total = connection.execute("SELECT COUNT(*) FROM events WHERE status = 'DOWN'").fetchone()[0]
+    assert sum(row[2] for row in ospf_db.top_flapping_neighbors(connection, day_min, day_max, 1000)) == total
+
+    plan = " ".join(row[3] for row in connection.execute(
+        "EXPLAIN QUERY PLAN SELECT neighbor_ip, hostname, COUNT(*) FROM events "
+        "WHERE day BETWEEN '2019-01-01' AND '2019-01-31' AND status = 'DOWN' GROUP BY neighbor_ip, hostname"))
+    assert "events_day_status" in plan
+
+def test_one_parse_feeds_the_report_and_the_database(tmp_path):
+    from junos_ospf_log import (collect_events, junos_ospf_log_reader, logfile_reader, mmap_logfile_reader,
+                                ospf_transition_stream, YearResolver)
+    year_resolver = YearResolver.from_logfile("logfile.txt")
+    log_dict = {}
+    connection = ospf_db.connect(str(tmp_path / "ospf.db"))
+    transition_stream = ospf_transition_stream(mmap_logfile_reader("logfile.txt", bad_word_list), year_resolver=year_resolver)
+    assert ospf_db.load_transitions(connection, collect_events(transition_stream, log_dict)) == (400, 132)
+    assert log_dict == junos_ospf_log_reader(logfile_reader("logfile.txt", bad_word_list),
+                                             year_resolver=YearResolver.from_logfile("logfile.txt"))
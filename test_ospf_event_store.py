@@ -0,0 +1,64 @@
+import pickle
+
+from junos_ospf_log import (
+    junos_ospf_event_store, junos_ospf_log_reader, logfile_reader, neighbor_date_stat, neighbor_downtime_stat,
+)
+from ospf_event_store import OspfEventStore, event_downtime
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+
+def parse(filename):
+    log_lines = list(logfile_reader(filename, bad_word_list))
+    return junos_ospf_log_reader(log_lines), junos_ospf_event_store(log_lines)
+
+def test_store_round_trip():
+    log_dict, store = parse("logfile.txt")
+    assert store.to_log_dict() == log_dict
+    assert list(store) == list(log_dict)
+    assert OspfEventStore.from_log_dict(log_dict).to_log_dict() == log_dict
+    assert len(store.hostname_list) == 1
+
+def test_store_events_index_like_log_items():
+    log_dict, store = parse("logfile.txt")
+    for neighborIP, log_items in log_dict.items():
+        events = store[neighborIP]
+        assert len(events) == len(log_items)
+        assert events[-1] == log_items[-1]
+        for event, log_item in zip(events, log_items):
+            assert [event[0], event[1], event[2], event[3]] == log_item
+
+def test_store_extend_and_pickle():
+    log_dict, store = parse("logfile.txt")
+    merged = OspfEventStore()
+    merged.extend(store)
+    merged.extend(pickle.loads(pickle.dumps(store)))
+    for neighborIP, log_items in log_dict.items():
+        assert [list(event) for event in merged[neighborIP]] == log_items + log_items
+
+def test_store_statistics_match_log_dict():
+    log_dict, store = parse("logfile.txt")
+    assert neighbor_date_stat(store) == neighbor_date_stat(log_dict)
+
+    dict_downtime = neighbor_downtime_stat(log_dict)
+    store_downtime = neighbor_downtime_stat(store)
+    for neighborIP, log_items in log_dict.items():
+        for event, log_item in zip(store[neighborIP], log_items):
+            assert event_downtime(store_downtime[neighborIP], event) == event_downtime(dict_downtime[neighborIP], log_item)
+
+def test_store_split_by_hostname_and_sort_by_time():
+    log_dict, store = parse("logfile.txt")
+    cisco_dict, cisco_store = parse("cisco_logfile.txt")
+    merged = OspfEventStore()
+    merged.extend(cisco_store)
+    merged.extend(store)
+    split = merged.split_by_hostname()
+    assert list(split) == cisco_store.hostname_list + store.hostname_list
+    assert split[store.hostname_list[0]].to_log_dict() == log_dict
+
+    # The later capture first: sorting puts every neighbor back in time order.
+    reordered = OspfEventStore()
+    for neighborIP, log_items in log_dict.items():
+        for log_item in log_items[len(log_items) // 2:] + log_items[:len(log_items) // 2]:
+            reordered.append(neighborIP, log_item)
+    reordered.sort_by_time()
+    assert reordered.to_log_dict() == log_dict
@@ -0,0 +1,90 @@
+import csv
+import datetime
+
+import pytest
+
+import ospf_export
+from junos_ospf_log import junos_ospf_log_reader, logfile_reader, neighbor_downtime_stat
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+
+def expected_incidents(filename, hostname=None):
+    log_dict = junos_ospf_log_reader(logfile_reader(filename, bad_word_list), hostname=hostname)
+    downtime_dict = neighbor_downtime_stat(log_dict)
+    return sorted((neighborIP, downtime // datetime.timedelta(microseconds=1))
+                  for neighborIP, downtime_stat in downtime_dict.items()
+                  for downtime in downtime_stat.values() if downtime != 0)
+
+def test_csv_export(tmp_path):
+    parse_stat = {}
+    event_path, incident_path = ospf_export.export_logfile("logfile.txt", bad_word_list, "csv",
+                                                           output_path=str(tmp_path), parse_stat=parse_stat)
+    with open(event_path, newline="") as f:
+        events = list(csv.DictReader(f))
+    with open(incident_path, newline="") as f:
+        incidents = list(csv.DictReader(f))
+
+    # Every state change is exported, not only UP and DOWN.
+    assert len(events) == parse_stat["parsed"] + parse_stat["skipped"] == 400
+    assert events[0] == {
+        "timestamp_utc": events[0]["timestamp_utc"], "neighbor_ip": "10.132.43.105", "hostname": "jkf-mayb-switch1",
+        "interface": "vlan.514", "area": "0.0.0.0", "from_state": "full", "to_state": "init",
+        "reason": "1wayrcvd (event reason: neighbor is in one-way mode)", "status": "DOWN",
+    }
+    assert events[0]["timestamp_utc"].endswith("-01-05T04:48:14.571000+00:00")
+    assert events[1]["status"] == ""
+
+    closed = sorted((row["neighbor_ip"], int(row["downtime_us"])) for row in incidents if row["end_utc"])
+    assert closed == expected_incidents("logfile.txt")
+
+def test_cisco_csv_export_has_no_area(tmp_path):
+    event_path, incident_path = ospf_export.export_logfile("cisco_logfile.txt", bad_word_list, "csv",
+                                                           hostname="fnlr-sg1-bursa2", output_path=str(tmp_path))
+    with open(event_path, newline="") as f:
+        events = list(csv.DictReader(f))
+    assert {row["area"] for row in events} == {""}
+    assert events[1]["reason"] == "neighbor down: dead timer expired"
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_pyarrow_export(tmp_path, file_format):
+    pa = pytest.importorskip("pyarrow")
+    event_path, incident_path = ospf_export.export_logfile("logfile.txt", bad_word_list, file_format,
+                                                           output_path=str(tmp_path), batch_size=64)
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        events = pq.read_table(event_path)
+        incidents = pq.read_table(incident_path)
+        assert pq.ParquetFile(event_path).num_row_groups == 7
+    else:
+        events = pa.ipc.open_file(event_path).read_all()
+        incidents = pa.ipc.open_file(incident_path).read_all()
+
+    assert events.num_rows == 400
+    assert events.schema.field("timestamp_utc").type == pa.timestamp("us", tz="UTC")
+    closed = incidents.filter(incidents["end_utc"].is_valid())
+    assert sorted(zip(closed["neighbor_ip"].to_pylist(), closed["downtime_us"].to_pylist())) == \
+        expected_incidents("logfile.txt")
+
+def test_pyarrow_formats_need_pyarrow(monkeypatch):
+    monkeypatch.setattr(ospf_export, "pa", None)
+    assert ospf_export.resolve_format("auto") == "csv"
+    with pytest.raises(RuntimeError):
+        ospf_export.resolve_format("parquet")
+
+class ListRowWriter:
+    def __init__(self):
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(row)
+
+def test_incidents_are_kept_per_device():
+    # The same neighbor IP seen from two devices: each UP closes the incident of its own device.
+    lines = [line.lower() for line in open("logfile.txt") if "rpd_ospf_nbr" in line.lower()][0:3:2]
+    switch2 = [line.replace("jkf-mayb-switch1", "jkf-mayb-switch2").replace(".571", ".600").replace(".687", ".900")
+               for line in lines]
+    stream = ospf_export.ospf_transition_stream([lines[0], switch2[0], lines[1], switch2[1]])
+    incident_writer = ListRowWriter()
+    assert ospf_export.export_rows(stream, ListRowWriter(), incident_writer) == (4, 2)
+    assert [(row[0], row[1], row[5]) for row in incident_writer.rows] == \
+        [("10.132.43.105", "jkf-mayb-switch1", 116000), ("10.132.43.105", "jkf-mayb-switch2", 300000)]
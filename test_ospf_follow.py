@@ -0,0 +1,105 @@
+import os
+import contextlib
+import io
+import datetime
+
+from junos_ospf_log import ospf_event_stream, logfile_reader, neighbor_stream_stat, YearResolver
+from ospf_follow import follow_batches, follow_logfile, load_checkpoint
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+
+down_line = ("Jan  7 20:49:27.232  jkf-mayb-switch1 rpd[1307]: RPD_OSPF_NBRDOWN: OSPF neighbor 10.132.43.45 "
+             "(realm ospf-v2 vlan.513 area 0.0.0.0) state changed from Full to Init due to 1WayRcvd "
+             "(event reason: neighbor is in one-way mode)\n")
+up_line = ("Jan  7 20:49:32.733  jkf-mayb-switch1 rpd[1307]: RPD_OSPF_NBRUP: OSPF neighbor 10.132.43.45 "
+           "(realm ospf-v2 vlan.513 area 0.0.0.0) state changed from Exchange to Full due to ExchangeDone "
+           "(event reason: DBD exchange of master completed)\n")
+
+def follow(filename, checkpoint, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return follow_logfile(str(filename), str(checkpoint), bad_word_list, 0.01, max_batches=1, **kwargs)
+
+def read_lines(lines):
+    return [line.strip() for line in lines]
+
+def test_resume_from_checkpoint(tmp_path):
+    log = tmp_path / "log.txt"
+    checkpoint = tmp_path / "checkpoint.json"
+    # The capture ends with an unfinished prompt line, which is never read.
+    lines = open("logfile.txt").readlines()[:-1]
+
+    log.write_text("".join(lines[:200]))
+    follow(log, checkpoint)
+    # An unfinished line is left for the next run.
+    with open(log, "a") as f:
+        f.write("".join(lines[200:]) + down_line[:40])
+    state = follow(log, checkpoint)
+    assert state["offset"] == len("".join(lines).encode())
+
+    whole = {}
+    list(neighbor_stream_stat(ospf_event_stream(logfile_reader("logfile.txt", bad_word_list),
+                                                year_resolver=YearResolver.from_logfile("logfile.txt")), whole))
+    state = load_checkpoint(str(checkpoint))
+    # The years come from the PuTTY header of the capture.
+    assert state["neighbor_date_stat_dict"] == whole
+    assert state["last_date"] == max(max(date_dict) for date_dict in whole.values())
+    assert state["last_date"].year == 2019
+
+def test_incident_closed_by_first_up(tmp_path):
+    log = tmp_path / "log.txt"
+    checkpoint = tmp_path / "checkpoint.json"
+    log.write_text(down_line + up_line)
+    follow(log, checkpoint)
+    with open(log, "a") as f:
+        f.write(up_line)
+    follow(log, checkpoint)
+
+    state = load_checkpoint(str(checkpoint))
+    assert state["start_time_dict"] == {}
+    assert state["neighbor_downtime_total_dict"] == {"10.132.43.45": [1, 5501000]}
+
+def test_year_rolls_over_across_restarts(tmp_path):
+    log = tmp_path / "log.txt"
+    checkpoint = tmp_path / "checkpoint.json"
+    log.write_text(down_line.replace("Jan  7", "Dec 31"))
+    follow(log, checkpoint)
+    # The Jan 1 line is read by another run, from the date saved in the checkpoint.
+    with open(log, "a") as f:
+        f.write(up_line.replace("Jan  7", "Jan  1"))
+    follow(log, checkpoint)
+
+    state = load_checkpoint(str(checkpoint))
+    downtime = datetime.timedelta(days=1, seconds=5, microseconds=501000)
+    assert state["neighbor_downtime_total_dict"] == {"10.132.43.45": [1, downtime // datetime.timedelta(microseconds=1)]}
+    assert (state["last_date"].month, state["last_date"].day) == (1, 1)
+
+def test_batches_are_capped(tmp_path):
+    log = tmp_path / "log.txt"
+    log.write_text(down_line * 25)
+    batches = follow_batches(str(log), None, 0, 0.01, max_batch_lines=10)
+    assert [len(next(batches)[0]) for _ in range(3)] == [10, 10, 5]
+    batches.close()
+
+def test_rotation_and_truncation(tmp_path):
+    log = tmp_path / "log.txt"
+    # The capture ends with an unfinished prompt line, which is never read.
+    lines = open("logfile.txt").readlines()[:-1]
+    log.write_text("".join(lines[:300]))
+
+    batches = follow_batches(str(log), None, 0, 0.01)
+    first, first_inode, _ = next(batches)
+    # Lines added to the old file before the rotation are still read.
+    with open(log, "a") as f:
+        f.write("".join(lines[300:350]))
+    os.rename(log, tmp_path / "log.txt.1")
+    log.write_text("".join(lines[350:]))
+    second, _, _ = next(batches)
+    third, third_inode, offset = next(batches)
+    assert third_inode != first_inode
+    assert read_lines(first + second + third) == read_lines(line.lower() for line in lines)
+    assert offset == len("".join(lines[350:]).encode())
+
+    log.write_text("".join(lines[:5]))
+    truncated, _, offset = next(batches)
+    assert read_lines(truncated) == read_lines(line.lower() for line in lines[:5])
+    batches.close()
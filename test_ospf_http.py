@@ -0,0 +1,147 @@
+import json
+import socket
+import asyncio
+import urllib.error
+import urllib.request
+
+import pytest
+
+from junos_ospf_log import (junos_ospf_log_reader, logfile_reader, neighbor_date_stat, neighbor_date_total_stat,
+                            ospf_event_stream)
+from ospf_http import LiveCollector, LiveStat, start_http_server
+from ospf_syslog import start_collector
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+
+def preloaded_stat():
+    live_stat = LiveStat()
+    live_stat.add_stream(ospf_event_stream(logfile_reader("logfile.txt", bad_word_list)))
+    return live_stat
+
+def get(port, path, headers=None):
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", headers=headers or {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers["ETag"], json.loads(response.read() or b"null")
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers["ETag"], json.loads(error.read() or b"null")
+
+def test_live_stat_matches_the_batch_statistics():
+    live_stat = preloaded_stat()
+    log_dict = junos_ospf_log_reader(logfile_reader("logfile.txt", bad_word_list))
+    date_stat = neighbor_date_stat(log_dict)
+    assert live_stat.neighbor_date_stat_dict == date_stat
+    assert live_stat.neighbor_date_total_stat_dict == neighbor_date_total_stat(date_stat)
+    assert live_stat.render("/devices", {})[1]["jkf-mayb-switch1"]["down_events"] == 132
+
+def test_responses_are_cached_per_version():
+    live_stat = preloaded_stat()
+    code, body = live_stat.response("/top?n=2")
+    assert code == 200 and [neighbor["down_events"] for neighbor in json.loads(body)] == [62, 62]
+    assert live_stat.response("/top?n=2")[1] is body
+    live_stat.version += 1
+    assert live_stat.response("/top?n=2")[1] is not body
+
+def test_cache_is_bounded_by_the_known_requests():
+    live_stat = preloaded_stat()
+    body = live_stat.response("/top?n=2")[1]
+    assert live_stat.response("/top/?n=02")[1] is body
+    # n past the number of neighbors is the same request as all of them.
+    assert live_stat.response("/top?n=1000")[1] is live_stat.response("/top?n=99999")[1]
+    for number in range(100):
+        assert live_stat.response(f"/unknown/{number}")[0] == 404
+        assert live_stat.response(f"/neighbors/10.0.0.{number}")[0] == 404
+        assert live_stat.response(f"/top?n=x{number}")[0] == 400
+        assert live_stat.response(f"/days/2020-01-{number % 28 + 1:02}")[0] == 200
+    assert set(live_stat.response_cache) == {("top", 2), ("top", len(live_stat.neighbor_date_total_stat_dict))}
+
+def test_http_api_follows_the_syslog_collector():
+    down = (b"<28>Jan  7 20:49:27 jkf-mayb-switch1 rpd[1307]: RPD_OSPF_NBRDOWN: OSPF neighbor 10.132.99.1 "
+            b"(realm ospf-v2 vlan.599 area 0.0.0.0) state changed from Full to Init due to 1WayRcvd "
+            b"(event reason: neighbor is in one-way mode)")
+
+    async def run():
+        live_stat = preloaded_stat()
+        collector = LiveCollector(live_stat, flush_interval=0.01)
+        udp_receiver, tcp_server, parser_task = await start_collector(collector, "127.0.0.1", 0, None)
+        http_server = await start_http_server(live_stat, collector, "127.0.0.1", 0)
+        port = http_server.sockets[0].getsockname()[1]
+        try:
+            results = {}
+            results["top"] = await asyncio.to_thread(get, port, "/top?n=1")
+            etag = results["top"][1]
+            results["not_modified"] = await asyncio.to_thread(get, port, "/top?n=1", {"If-None-Match": etag})
+            results["day"] = await asyncio.to_thread(get, port, "/days/2026-13-01")
+            results["missing"] = await asyncio.to_thread(get, port, "/neighbors/10.132.99.1")
+
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp:
+                udp.sendto(down, udp_receiver.sock.getsockname())
+            while collector.processed < 1:
+                await asyncio.sleep(0.01)
+            results["neighbor"] = await asyncio.to_thread(get, port, "/neighbors/10.132.99.1")
+            results["modified"] = await asyncio.to_thread(get, port, "/top?n=1", {"If-None-Match": etag})
+            results["status"] = await asyncio.to_thread(get, port, "/status")
+            return results
+        finally:
+            parser_task.cancel()
+            http_server.close()
+            udp_receiver.close()
+
+    results = asyncio.run(run())
+    assert results["top"][0] == 200 and results["top"][2][0]["down_events"] == 62
+    assert results["not_modified"][0] == 304
+    assert results["day"][0] == 400
+    assert results["missing"][0] == 404
+    code, etag, neighbor = results["neighbor"]
+    assert code == 200 and neighbor["down"] and neighbor["interface"] == "vlan.599"
+    assert list(neighbor["days"].values()) == [1]
+    assert results["modified"][0] == 200
+    assert results["status"][2]["received"] == 1
+
+def test_bad_requests_and_batches_keep_the_server_serving():
+    good = (b"<28>Jan  7 20:49:27 jkf-mayb-switch1 rpd[1307]: RPD_OSPF_NBRDOWN: OSPF neighbor 10.132.99.1 "
+            b"(realm ospf-v2 vlan.599 area 0.0.0.0) state changed from Full to Init due to 1WayRcvd "
+            b"(event reason: neighbor is in one-way mode)")
+
+    def raw_request(port, request):
+        with socket.create_connection(("127.0.0.1", port)) as connection:
+            connection.sendall(request)
+            return connection.makefile("rb").read()
+
+    async def run():
+        live_stat = LiveStat()
+        collector = LiveCollector(live_stat, flush_interval=0.01)
+        parser_task = asyncio.create_task(collector.run_parser())
+        collector.receive(good.replace(b"Jan  7", b"Feb 30"), "127.0.0.1")
+        collector.receive(good, "127.0.0.1")
+        await collector.drain()
+
+        http_server = await start_http_server(live_stat, collector, "127.0.0.1", 0)
+        port = http_server.sockets[0].getsockname()[1]
+        try:
+            results = {}
+            results["long"] = await asyncio.to_thread(raw_request, port, b"GET /" + b"x" * 100000 + b" HTTP/1.1\r\n\r\n")
+            results["words"] = await asyncio.to_thread(raw_request, port, b"GET\r\n\r\n")
+            results["latin"] = await asyncio.to_thread(
+                raw_request, port, b"GET /neighbors/\xff\xfe HTTP/1.1\r\nConnection: close\r\n\r\n")
+            results["neighbor"] = await asyncio.to_thread(get, port, "/neighbors/10.132.99.1")
+            return results
+        finally:
+            parser_task.cancel()
+            http_server.close()
+
+    results = asyncio.run(run())
+    assert results["long"].startswith(b"HTTP/1.1 400 ")
+    assert results["words"].startswith(b"HTTP/1.1 400 ")
+    assert results["latin"].startswith(b"HTTP/1.1 404 ")
+    code, etag, neighbor = results["neighbor"]
+    assert code == 200 and neighbor["down"]
+
+def test_failed_batch_still_makes_a_new_version():
+    live_stat = preloaded_stat()
+    collector = LiveCollector(live_stat)
+    collector.on_event = None
+    version = live_stat.version
+    with pytest.raises(AttributeError):
+        collector.process_batch([("127.0.0.1", None)])
+    assert live_stat.version == version + 1
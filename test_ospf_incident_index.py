@@ -0,0 +1,70 @@
+import random
+import datetime
+
+from junos_ospf_log import junos_ospf_event_store, junos_ospf_log_reader, logfile_reader, str_to_time
+from ospf_incident_index import IncidentIndex, correlated_outage_report, open_end_us
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+
+def logfile_index():
+    return IncidentIndex.from_log_dict(junos_ospf_event_store(logfile_reader("logfile.txt", bad_word_list)))
+
+def test_point_window_and_overlap_queries():
+    index = logfile_index()
+    down_at = index.at(str_to_time("7-Jan 20:49:30.000", "jk"))
+    assert [(incident.neighbor, incident.interface) for incident in down_at] == \
+        [("10.132.43.45", "vlan.513"), ("10.132.43.41", "vlan.511")]
+    assert down_at[0].end - down_at[0].start == datetime.timedelta(seconds=5, microseconds=501000)
+
+    # Both neighbors were back up at 20:49:33.2; the window still sees them.
+    assert index.at(str_to_time("7-Jan 20:49:33.200", "jk")) == []
+    assert index.window(str_to_time("7-Jan 20:49:00.000", "jk"), str_to_time("7-Jan 20:50:00.000", "jk")) == down_at
+
+    pairs = index.overlap_pairs("vlan.511", "vlan.513")
+    assert pairs[0] == (down_at[1], down_at[0])
+    assert all(a.interface == "vlan.511" and b.interface == "vlan.513" for a, b in pairs)
+    assert index.overlap_pairs("10.132.43.41", "10.132.43.45") == pairs
+
+def test_correlated_outages():
+    index = logfile_index()
+    group_list = index.correlated_outages()
+    assert {incident.interface for incident in group_list[0]} == {"vlan.511", "vlan.513"}
+    assert group_list[0][0].start == str_to_time("7-Jan 20:49:27.232", "jk")
+    # A wider tolerance only merges groups.
+    assert len(index.correlated_outages(datetime.timedelta(minutes=10))) <= len(group_list)
+    assert correlated_outage_report(index)[2].startswith("#1: 2 incidents, 2 neighbors")
+
+def test_log_dict_and_open_incidents():
+    log_lines = list(logfile_reader("logfile.txt", bad_word_list))
+    # The capture cut right after a DOWN: the incident is still open.
+    last_down = max(i for i, line in enumerate(log_lines) if "rpd_ospf_nbrdown" in line)
+    index = IncidentIndex.from_log_dict(junos_ospf_log_reader(log_lines[:last_down + 1]))
+    open_incidents = [incident for incident in index if incident.end is None]
+    assert open_incidents[-1].neighbor in log_lines[last_down]
+    assert index.at(open_incidents[-1].start + datetime.timedelta(days=365)) == open_incidents
+
+def test_search_matches_a_scan():
+    rng = random.Random(1)
+    incident_list = []
+    for n in range(500):
+        start = rng.randrange(10 ** 6)
+        end = open_end_us if n % 50 == 0 else start + rng.randrange(1, 20000)
+        incident_list.append((start, end, f"10.0.0.{n % 7}", "host", f"vlan.{n % 5}"))
+    index = IncidentIndex(incident_list)
+    for _ in range(200):
+        start = rng.randrange(10 ** 6)
+        end = start + rng.randrange(1, 50000)
+        expected = sorted(i for i in range(len(index)) if index.start_array[i] < end and index.end_array[i] > start)
+        assert index.search_us(start, end) == expected
+
+def test_incidents_of_no_length():
+    # The UP logged in the same microsecond as the DOWN.
+    index = IncidentIndex([(100, 100, "10.0.0.1", "host", "vlan.1"), (50, 200, "10.0.0.2", "host", "vlan.2"),
+                           (100, 100, "10.0.0.3", "host", "vlan.3"), (101, 300, "10.0.0.4", "host", "vlan.4")])
+    # Sorted by start: 10.0.0.2, 10.0.0.1, 10.0.0.3, 10.0.0.4
+    assert index.search_us(100, 101) == [0, 1, 2]
+    assert index.search_us(101, 102) == [0, 3]
+    assert [(a.neighbor, b.neighbor) for a, b in index.overlap_pairs("vlan.1", "vlan.2")] == [("10.0.0.1", "10.0.0.2")]
+    assert [(a.neighbor, b.neighbor) for a, b in index.overlap_pairs("10.0.0.1", "10.0.0.3")] == [("10.0.0.1", "10.0.0.3")]
+    assert index.overlap_pairs("10.0.0.1", "vlan.4") == []
+    assert index.key_index_dict["vlan.2"] == [0]
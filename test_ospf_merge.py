@@ -0,0 +1,55 @@
+import datetime
+
+from junos_ospf_log import junos_ospf_log_reader, logfile_reader, ospf_event_stream, YearResolver
+from ospf_merge import (merge_event_streams, log_dict_event_stream, logfile_event_stream, fleet_timeline,
+                        flap_cascades, cascade_report_lines)
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+
+def test_merge_keeps_each_stream_in_order():
+    junos = list(logfile_event_stream("logfile.txt", bad_word_list))
+    cisco = list(logfile_event_stream("cisco_logfile.txt", bad_word_list))
+    merge_stat = {}
+    merged = list(merge_event_streams([iter(junos), iter(cisco)], merge_stat))
+    assert merge_stat == {"out_of_order": 0}
+    assert len(merged) == len(junos) + len(cisco)
+    assert [event[1][0] for event in merged] == sorted(event[1][0] for event in merged)
+    assert [event for event in merged if event[1][2] == "jkf-mayb-switch1"] == junos
+    assert [event for event in merged if event[1][2] == "cisco_logfile"] == cisco
+
+    # Events of the same time keep the order of the streams.
+    tie = [event for event in merge_event_streams([iter(junos[:2]), iter(junos[:2])])]
+    assert tie == [junos[0], junos[0], junos[1], junos[1]]
+
+    merge_stat = {}
+    list(merge_event_streams([reversed(junos[:3])], merge_stat))
+    assert merge_stat == {"out_of_order": 2}
+
+def test_log_dict_event_stream_is_the_file_order():
+    log_lines = list(logfile_reader("logfile.txt", bad_word_list))
+    log_dict = junos_ospf_log_reader(log_lines, year_resolver=YearResolver.from_logfile("logfile.txt"))
+    assert list(log_dict_event_stream(log_dict)) == \
+        list(ospf_event_stream(log_lines, year_resolver=YearResolver.from_logfile("logfile.txt")))
+
+def test_flap_cascades_across_devices():
+    switch1 = list(logfile_event_stream("logfile.txt", bad_word_list))
+    # The same neighbors seen by a second switch a second later.
+    switch2 = [(neighborIP, [log[0] + datetime.timedelta(seconds=1), log[1], "jkf-mayb-switch2", log[3]])
+               for neighborIP, log in switch1]
+
+    timeline = list(fleet_timeline(merge_event_streams([iter(switch2), iter(switch1)])))
+    assert [(log[2], str(downtime)) for neighborIP, log, downtime in timeline[:4]] == \
+        [("jkf-mayb-switch1", "0"), ("jkf-mayb-switch1", "0:00:00.116000"),
+         ("jkf-mayb-switch2", "0"), ("jkf-mayb-switch2", "0:00:00.116000")]
+
+    cascade_list = list(flap_cascades(merge_event_streams([iter(switch2), iter(switch1)]),
+                                      datetime.timedelta(seconds=5)))
+    # The Jan 7 20:49 flap of vlan.511 and vlan.513 went down on switch1 first.
+    (cascade,) = [cascade for cascade in cascade_list
+                  if cascade[0][1][0] == datetime.datetime(2019, 1, 7, 13, 49, 27, 232000, tzinfo=datetime.timezone.utc)]
+    assert [(log[2], log[3]) for neighborIP, log in cascade] == \
+        [("jkf-mayb-switch1", "vlan.513"), ("jkf-mayb-switch1", "vlan.511"),
+         ("jkf-mayb-switch2", "vlan.513"), ("jkf-mayb-switch2", "vlan.511")]
+    assert cascade_report_lines([cascade])[0].startswith(
+        "#1: 4 DOWN events on 2 devices (jkf-mayb-switch1, jkf-mayb-switch2), first jkf-mayb-switch1 10.132.43.45 vlan.513 at 2019-01-07 20:49:27.232000 +0700")
+    assert list(flap_cascades(iter(switch1), datetime.timedelta(seconds=5))) == []
@@ -0,0 +1,38 @@
+import datetime
+
+import pytest
+import pytz
+
+pytest.importorskip("numpy")
+
+from junos_ospf_log import junos_ospf_event_store, logfile_reader, neighbor_date_stat, neighbor_downtime_stat
+from ospf_event_store import OspfEventStore, event_downtime
+from ospf_numpy_stat import numpy_date_stat, numpy_downtime_stat
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+
+def assert_same_statistics(store):
+    assert numpy_date_stat(store) == neighbor_date_stat(store)
+    assert numpy_downtime_stat(store) == neighbor_downtime_stat(store)
+
+def test_numpy_matches_python_on_logfile():
+    assert_same_statistics(junos_ospf_event_store(logfile_reader("logfile.txt", bad_word_list)))
+
+def test_numpy_unpaired_and_repeated_events():
+    def t(second):
+        return datetime.datetime(2019, 1, 1, 23, 59, second, tzinfo=pytz.utc)
+    log_dict = {
+        "10.0.0.1": [[t(1), "UP", "h", "i"], [t(2), "DOWN", "h", "i"], [t(2), "UP", "h", "i"],
+                     [t(3), "UP", "h", "i"], [t(3), "DOWN", "h", "i"], [t(5), "UP", "h", "i"]],
+        "10.0.0.2": [[t(1), "UP", "h", "i"]],
+    }
+    store = OspfEventStore.from_log_dict(log_dict)
+    assert_same_statistics(store)
+
+    downtime = numpy_downtime_stat(store)
+    assert [event_downtime(downtime["10.0.0.1"], event) for event in store["10.0.0.1"]] == [
+        0, 0, datetime.timedelta(0), 0, 0, datetime.timedelta(seconds=2)]
+    assert numpy_date_stat(store)["10.0.0.1"] == {datetime.date(2019, 1, 1): 2}
+
+def test_numpy_empty_store():
+    assert_same_statistics(OspfEventStore())
@@ -0,0 +1,54 @@
+import time
+
+import gzip
+
+from junos_ospf_log import parse_logfile, mmap_marker_lines
+from ospf_profile import PipelineProfile
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+
+def test_profiled_parse_counts_every_stage():
+    profile = PipelineProfile()
+    parse_stat = {}
+    log_dict = parse_logfile("logfile.txt", bad_word_list, parse_stat=parse_stat, profile=profile)
+    assert log_dict == parse_logfile("logfile.txt", bad_word_list)
+
+    stage_dict = profile.stage_dict
+    # Every line of the file is scanned, and only the OSPF lines are read on.
+    assert stage_dict["read"]["lines_in"] == len(open("logfile.txt", "rb").read().split(b"\n")) == 411
+    assert stage_dict["read"]["lines_out"] == 400
+    assert stage_dict["log_cleaner"]["lines_in"] == 400
+    assert stage_dict["timestamp"]["lines_out"] == parse_stat["parsed"] == 264
+    assert not profile.stack
+    summary = "\n".join(profile.summary_lines(parse_stat))
+    assert "Lines dropped by the marker scan: 11" in summary
+    assert "Lines dropped by log_cleaner: 0" in summary
+
+def test_marker_scan_counts_the_lines_of_every_range(tmp_path, monkeypatch):
+    size = len(open("logfile.txt", "rb").read())
+    scan_stat = {}
+    for start in range(0, size, 1000):
+        list(mmap_marker_lines("logfile.txt", start, start + 1000, scan_stat=scan_stat))
+    assert scan_stat == {"scanned": 411}
+
+    compressed = tmp_path / "logfile.txt.gz"
+    compressed.write_bytes(gzip.compress(open("logfile.txt", "rb").read()))
+    monkeypatch.setattr("junos_ospf_log.decompress_block_size", 333)
+    scan_stat = {}
+    assert len(list(mmap_marker_lines(str(compressed), scan_stat=scan_stat))) == 400
+    assert scan_stat == {"scanned": 411}
+
+def test_nested_stage_time_is_not_counted_twice():
+    profile = PipelineProfile()
+
+    def slow_lines():
+        for line in ["a", "b"]:
+            time.sleep(0.02)
+            yield line
+
+    lines = profile.stage_iter("read", slow_lines())
+    assert profile.run("parse", lambda: list(profile.stage_iter("log_cleaner", lines, upstream="read"))) == ["a", "b"]
+    assert profile.stage_dict["read"]["wall"] >= 0.04
+    assert profile.stage_dict["log_cleaner"]["wall"] < 0.02
+    assert profile.stage_dict["parse"]["wall"] < 0.02
+    assert profile.stage_dict["log_cleaner"]["lines_in"] == 2
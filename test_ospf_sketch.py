@@ -0,0 +1,69 @@
+import math
+import random
+
+from junos_ospf_log import (junos_ospf_event_stream, junos_ospf_log_reader, logfile_reader, neighbor_date_stat,
+                            neighbor_date_total_stat, neighbor_downtime_stat)
+from ospf_sketch import ApproximateStat, CountMinSketch, SpaceSaving, TDigest, approximate_report_lines
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+
+def test_matches_the_exact_statistics_of_a_small_log():
+    stat = ApproximateStat().add_stream(junos_ospf_event_stream(logfile_reader("logfile.txt", bad_word_list)))
+    log_dict = junos_ospf_log_reader(logfile_reader("logfile.txt", bad_word_list))
+    date_stat = neighbor_date_stat(log_dict)
+    exact_date_stat = {neighborIP: {date: count for date, count in date_dict.items() if count}
+                       for neighborIP, date_dict in date_stat.items()}
+    exact_total_stat = neighbor_date_total_stat(date_stat)
+
+    approximate_date_stat = stat.date_stat()
+    assert approximate_date_stat == {neighborIP: exact_date_stat[neighborIP] for neighborIP in approximate_date_stat}
+    assert stat.total_stat() == {neighborIP: exact_total_stat[neighborIP] for neighborIP in approximate_date_stat}
+    assert neighbor_date_total_stat(approximate_date_stat) == stat.total_stat()
+    assert list(stat.total_stat(2).values()) == [62, 62]
+
+    downtime_list = sorted(downtime for downtime_dict in neighbor_downtime_stat(log_dict).values()
+                           for downtime in downtime_dict.values() if downtime)
+    assert stat.incident_count == len(downtime_list)
+    assert stat.downtime_percentile(100) == downtime_list[-1]
+    assert stat.downtime_percentile(0) == downtime_list[0]
+    assert approximate_report_lines(stat, 2)[2].startswith("OSPF Neighbor IP: 10.132.43.41")
+
+def test_count_min_never_underestimates_and_stays_within_the_bound():
+    rng = random.Random(0)
+    sketch = CountMinSketch.from_error(0.01, 0.01)
+    exact = {}
+    for _ in range(20000):
+        key = f"10.0.{rng.randrange(40)}.{int(rng.paretovariate(1.2)) % 256}"
+        exact[key] = exact.get(key, 0) + 1
+        sketch.add(key)
+    errors = [sketch.estimate(key) - count for key, count in exact.items()]
+    assert min(errors) >= 0
+    assert sum(error > sketch.error_bound() for error in errors) <= 0.01 * len(errors) + 1
+
+def test_space_saving_keeps_the_heavy_hitters():
+    rng = random.Random(0)
+    top = SpaceSaving(50)
+    exact = {}
+    for _ in range(20000):
+        key = str(int(rng.paretovariate(1.0)))
+        exact[key] = exact.get(key, 0) + 1
+        top.add(key)
+    counter_dict = {key: (count, error) for key, count, error in top.top()}
+    for key, count in exact.items():
+        if count > top.total / top.capacity:
+            assert counter_dict[key][0] - counter_dict[key][1] <= count <= counter_dict[key][0]
+    assert len(counter_dict) == 50
+
+def test_t_digest_percentiles():
+    rng = random.Random(0)
+    digest = TDigest(100)
+    values = [rng.lognormvariate(0, 2) for _ in range(20000)]
+    for value in values:
+        digest.add(value)
+    values.sort()
+    assert len(digest.centroid_list) <= 100
+    for q in (0.01, 0.1, 0.5, 0.9, 0.99, 0.999):
+        # Within 1% of the rank.
+        rank = sum(value <= digest.quantile(q) for value in values) / len(values)
+        assert math.isclose(rank, q, abs_tol=0.01)
+    assert digest.quantile(1) == values[-1]
@@ -0,0 +1,79 @@
+import datetime
+
+from junos_ospf_log import mmap_logfile_reader, ospf_transition_stream, str_to_time
+from ospf_event_store import time_to_epoch_us
+from ospf_state_machine import AdjacencyTracker, tracker_report_lines
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+
+def track_file(filename, hostname=None, stuck_threshold=datetime.timedelta(seconds=60)):
+    tracker = AdjacencyTracker(stuck_threshold)
+    finding_list = list(tracker.track(ospf_transition_stream(mmap_logfile_reader(filename, bad_word_list), hostname=hostname)))
+    return tracker, finding_list
+
+def test_dwell_stuck_and_convergence():
+    tracker = AdjacencyTracker(datetime.timedelta(seconds=60))
+    start_us = time_to_epoch_us(str_to_time("7-Jan 20:49:30.000", "jk"))
+    second = 1000000
+    transition_list = [("full", "down", 0), ("down", "init", 10), ("init", "exstart", 12),
+                       ("exstart", "exchange", 50), ("exchange", "loading", 100), ("loading", "full", 101)]
+    finding_list = [tracker.add_transition("10.0.0.1", start_us + offset * second, from_state, to_state, "r1", "ge-0/0/0.0")
+                    for from_state, to_state, offset in transition_list]
+    assert finding_list == [None, None, None, None, ("stuck", 88 * second), ("converged", 101 * second)]
+    assert tracker.dwell_time("10.0.0.1") == {
+        "Down": datetime.timedelta(seconds=10), "Init": datetime.timedelta(seconds=2),
+        "ExStart": datetime.timedelta(seconds=38), "Exchange": datetime.timedelta(seconds=50),
+        "Loading": datetime.timedelta(seconds=1)}
+    neighbor = tracker.neighbor_dict["10.0.0.1"]
+    assert (neighbor.stuck_count, neighbor.skipped, neighbor.convergence_count) == (1, 0, 1)
+
+    # A neighbor still in ExStart is reported once it is past the threshold.
+    tracker.add_transition("10.0.0.2", start_us, "init", "exstart", "r1", "ge-0/0/1.0")
+    assert tracker.stuck_neighbors(str_to_time("7-Jan 20:50:00.000", "jk")) == []
+    assert tracker.stuck_neighbors(str_to_time("7-Jan 20:50:31.000", "jk")) == \
+        [("10.0.0.2", str_to_time("7-Jan 20:49:30.000", "jk"))]
+
+def test_unlogged_gaps():
+    tracker = AdjacencyTracker(datetime.timedelta(seconds=5))
+    start_us = time_to_epoch_us(str_to_time("7-Jan 20:49:30.000", "jk"))
+    second = 1000000
+    # Junos: ExStart, then Exchange to Full; the whole stay was in ExStart/Exchange.
+    assert tracker.add_transition("10.0.0.1", start_us, "init", "exstart", "r1", "ge-0/0/0.0") is None
+    assert tracker.add_transition("10.0.0.1", start_us + 8 * second, "exchange", "full", "r1", "ge-0/0/0.0") == \
+        ("stuck", 8 * second)
+    # Then Loading to Full: how long of it was Loading is unknown, so it is not stuck.
+    tracker.add_transition("10.0.0.1", start_us + 20 * second, "full", "init", "r1", "ge-0/0/0.0")
+    tracker.add_transition("10.0.0.1", start_us + 21 * second, "init", "exstart", "r1", "ge-0/0/0.0")
+    assert tracker.add_transition("10.0.0.1", start_us + 30 * second, "loading", "full", "r1", "ge-0/0/0.0") == \
+        ("converged", 10 * second)
+    assert tracker.dwell_time("10.0.0.1") == {
+        "Full": datetime.timedelta(seconds=12), "Init": datetime.timedelta(seconds=1),
+        "Unknown": datetime.timedelta(seconds=17)}
+    neighbor = tracker.neighbor_dict["10.0.0.1"]
+    assert (neighbor.stuck_count, neighbor.gap_count, neighbor.skipped) == (1, 2, 0)
+
+    # A Full to Init missing from the log.
+    tracker.add_transition("10.0.0.1", start_us + 40 * second, "init", "exstart", "r1", "ge-0/0/0.0")
+    assert (neighbor.gap_count, neighbor.skipped) == (2, 1)
+
+def test_junos_logfile():
+    tracker, finding_list = track_file("logfile.txt")
+    # Every Full to Init/Down of the log is followed by a Full again.
+    assert sum(neighbor.convergence_count for neighbor in tracker.neighbor_dict.values()) == 132
+    assert [finding for finding in finding_list if finding[2] == "stuck"] == []
+    neighbor = tracker.neighbor_dict["10.132.43.41"]
+    assert neighbor.convergence_count == 62
+    assert neighbor.convergence_max_us == 14217000
+    # Junos does not log ExStart to Exchange: Exchange to Full is an unlogged gap, not a skipped transition.
+    assert (neighbor.skipped, neighbor.gap_count) == (0, 80)
+    assert "Unknown" in tracker.dwell_time("10.132.43.41")
+
+    tracker, finding_list = track_file("logfile.txt", stuck_threshold=datetime.timedelta(seconds=5))
+    assert [(neighborIP, finding_us) for neighborIP, timestamp, finding, finding_us in finding_list if finding == "stuck"] == \
+        [("10.132.43.45", 6821000), ("10.132.43.41", 7476000)]
+
+def test_cisco_logfile():
+    tracker, finding_list = track_file("cisco_logfile.txt", hostname="r1")
+    neighbor = tracker.neighbor_dict["10.132.1.106"]
+    assert (neighbor.interface, neighbor.convergence_count) == ("tunnel1", 9)
+    assert tracker_report_lines(tracker)[0] == "OSPF Neighbor IP: 10.132.1.106 \tInterface: tunnel1 \tState: Full"
@@ -0,0 +1,139 @@
+import socket
+import asyncio
+
+from junos_ospf_log import logfile_reader, neighbor_stream_stat, ospf_event_stream
+from ospf_syslog import SyslogCollector, start_collector, syslog_line
+
+bad_word_list = ['UI_CMDLINE_READ_LINE', '---(more', 'master:', '@', 'PuTTY']
+
+def syslog_messages(filename, pri):
+    return [f"<{pri}>{line.strip()}".encode() for line in open(filename) if "OSPF" in line]
+
+def file_date_stat(filename):
+    neighbor_date_stat_dict = {}
+    list(neighbor_stream_stat(ospf_event_stream(logfile_reader(filename, bad_word_list)), neighbor_date_stat_dict))
+    return neighbor_date_stat_dict
+
+def test_syslog_line():
+    assert syslog_line(b"<28>Jan  7 20:49:27 jkf-mayb-switch1 rpd[1307]: RPD_OSPF_NBRDOWN: x") == \
+        "jan  7 20:49:27.000 jkf-mayb-switch1 rpd[1307]: rpd_ospf_nbrdown: x"
+    assert syslog_line(b"<189>123: *Jan  8 13:34:28.703 SGT: %OSPF-5-ADJCHG: x") == \
+        "123: *jan  8 13:34:28.703 sgt: %ospf-5-adjchg: x"
+
+async def collect(send, **kwargs):
+    collector = SyslogCollector(flush_interval=0.01, **kwargs)
+    udp_receiver, tcp_server, parser_task = await start_collector(collector, "127.0.0.1", 0, 0)
+    udp_port = udp_receiver.sock.getsockname()[1]
+    tcp_port = tcp_server.sockets[0].getsockname()[1]
+    # The loopback sender runs in its own thread, while the loop keeps reading.
+    sent = await asyncio.to_thread(send, udp_port, tcp_port)
+    while collector.received < sent:
+        await asyncio.sleep(0.01)
+    await collector.drain()
+    parser_task.cancel()
+    udp_receiver.close()
+    tcp_server.close()
+    return collector
+
+def test_udp_and_tcp_feed_the_statistics():
+    junos = syslog_messages("logfile.txt", 28)
+    cisco = syslog_messages("cisco_logfile.txt", 189)
+
+    def send(udp_port, tcp_port):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp:
+            for message in junos:
+                udp.sendto(message, ("127.0.0.1", udp_port))
+        with socket.create_connection(("127.0.0.1", tcp_port)) as tcp:
+            # Octet counted and newline framed.
+            tcp.sendall(b"".join(b"%d %s" % (len(message), message) for message in cisco[:5]))
+            tcp.sendall(b"".join(message + b"\n" for message in cisco[5:]))
+        return len(junos) + len(cisco)
+
+    events = []
+    collector = asyncio.run(collect(send, on_event=lambda *event: events.append(event)))
+    expected = file_date_stat("logfile.txt")
+    expected.update(file_date_stat("cisco_logfile.txt"))
+    assert collector.neighbor_date_stat_dict == expected
+    assert collector.processed == len(junos) + len(cisco)
+    assert collector.interface_dict["10.132.1.106"] == "tunnel1"
+    # The Cisco lines have no hostname: the device is the sender.
+    assert {log[2] for neighborIP, log, downtime in events if neighborIP == "10.132.1.106"} == {"127.0.0.1"}
+    assert collector.neighbor_downtime_total_dict["10.132.43.41"][0] == 62
+
+def test_burst_without_loss():
+    messages = syslog_messages("logfile.txt", 28) * 20
+
+    def send(udp_port, tcp_port):
+        with socket.create_connection(("127.0.0.1", tcp_port)) as tcp:
+            tcp.sendall(b"".join(message + b"\n" for message in messages))
+        return len(messages)
+
+    collector = asyncio.run(collect(send, max_batch=500))
+    assert collector.processed == len(messages)
+    assert collector.parse_stat["parsed"] == 20 * len(list(ospf_event_stream(logfile_reader("logfile.txt", bad_word_list))))
+
+def test_bad_messages_do_not_stop_the_parser():
+    good = syslog_messages("logfile.txt", 28)
+    bad = [good[0].replace(b"Jan", b"Foo"), good[0].replace(b"Jan  5", b"Feb 30")]
+
+    def send(udp_port, tcp_port):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp:
+            for message in bad + good[:1]:
+                udp.sendto(message, ("127.0.0.1", udp_port))
+        return 3
+
+    collector = asyncio.run(collect(send))
+    assert collector.processed == 3
+    assert collector.parse_stat["unparsed"] == 2
+    assert collector.neighbor_date_stat_dict["10.132.43.105"]
+
+    # Any other failure of a batch is counted, and the next batch is still parsed.
+    def on_event(neighborIP, log, downtime):
+        if log[1] == "DOWN":
+            raise RuntimeError("bug in on_event")
+
+    async def two_batches():
+        collector = SyslogCollector(flush_interval=0.01, on_event=on_event)
+        parser_task = asyncio.create_task(collector.run_parser())
+        collector.receive(good[0], "127.0.0.1")
+        await collector.drain()
+        collector.receive(good[2], "127.0.0.1")
+        await collector.drain()
+        parser_task.cancel()
+        return collector
+
+    collector = asyncio.run(two_batches())
+    assert collector.processed == 2
+    assert collector.parse_stat["failed"] == 1
+    assert collector.parse_stat["parsed"] == 2
+
+def test_tcp_framing():
+    junos = syslog_messages("logfile.txt", 28)[:3]
+    # A Cisco line without <PRI>, starting with its sequence number, and an empty line.
+    cisco = b"123: *Jan  8 13:34:28.703 SGT: %OSPF-5-ADJCHG: Process 200, Nbr 10.132.1.106 on Tunnel1 from FULL to DOWN, Neighbor Down: Dead timer expired"
+
+    def send(udp_port, tcp_port):
+        with socket.create_connection(("127.0.0.1", tcp_port)) as tcp:
+            tcp.sendall(b"%d %s" % (len(junos[0]), junos[0]))
+            tcp.sendall(cisco + b"\n\n")
+            # A line over the limit of the stream reader is dropped, not the connection.
+            tcp.sendall(b"x" * 200000 + b"\n")
+            tcp.sendall(b"".join(message + b"\n" for message in junos[1:]))
+        return 4
+
+    collector = asyncio.run(collect(send))
+    assert collector.parse_stat["parsed"] == 3
+    assert collector.parse_stat["skipped"] == 1
+    assert collector.interface_dict == {"10.132.43.105": "vlan.514", "10.132.1.106": "tunnel1"}
+
+def test_udp_burst_without_loss():
+    messages = syslog_messages("logfile.txt", 28) * 10
+
+    def send(udp_port, tcp_port):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp:
+            for message in messages:
+                udp.sendto(message, ("127.0.0.1", udp_port))
+        return len(messages)
+
+    collector = asyncio.run(collect(send, max_batch=500))
+    assert collector.received == collector.processed == len(messages)